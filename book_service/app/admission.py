@@ -0,0 +1,312 @@
+# book_service/app/admission.py
+"""
+Admission control: per-client rate limits and per-route bulkheads.
+
+Two checks run before a request reaches its endpoint:
+
+1. Token bucket per client (JWT subject, else client IP). Buckets live in
+   process memory or in Redis (shared by every replica). An empty bucket
+   answers 429 with Retry-After. BOOK_RATE_LIMIT_PER_SECOND=0 disables it.
+2. Concurrency bulkhead per route class (cheap reads, heavy queries and
+   exports, writes). A full bulkhead answers 503 with Retry-After at once instead of
+   queueing on the threadpool / DB pool. Bulkheads guard this process's
+   resources, so they are always process-local. A slot is held until the
+   response body has been sent, so streamed exports count for as long as
+   they run.
+
+Health and metrics endpoints are never limited.
+"""
+
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+import jwt
+import redis.asyncio as redis
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CLASSES = ("read", "heavy", "write")
+EXEMPT_PATHS = frozenset({"/healthz", "/livez", "/readyz", "/metrics", "/docs", "/redoc", "/openapi.json"})
+HEAVY_PATHS = ("/books/search", "/books/stats", "/books/changes", "/books/bulk", "/books/export", "/books/analytics")
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+READ_POSTS = frozenset({"/books/batch-get"})  # POST only because the id list can be long
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Bulkhead a request belongs to, or None when it is exempt."""
+    if path in EXEMPT_PATHS:
+        return None
+    if path.startswith(HEAVY_PATHS):
+        return "heavy"
+    if method in WRITE_METHODS and path not in READ_POSTS:
+        return "write"
+    return "read"
+
+
+class RateLimiter(Protocol):
+    async def hit(self, key: str, rate: float, burst: int) -> float: ...
+
+
+class MemoryRateLimiter:
+    """
+    Token buckets in process memory. `hit` returns 0 when the request may
+    proceed, otherwise the seconds until the next token is available.
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        # Least recently seen clients are forgotten first.
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# KEYS[1] bucket hash; ARGV: rate, burst, now (seconds). Returns the wait in ms.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets shared by every API replica."""
+
+    def __init__(self, client: redis.Redis, *, prefix: str = "ratelimit") -> None:
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        wait_ms = await self._script(keys=[f"{self.prefix}:{key}"], args=[rate, burst, time.time()])
+        return int(wait_ms) / 1000
+
+
+class Bulkhead:
+    """Non-blocking concurrency limit (single event loop, so no lock needed)."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+class _HeldUntilSent:
+    """
+    Keeps a bulkhead slot until the response has been sent. call_next
+    returns as soon as the headers are ready; a streamed body (exports)
+    does its work after that. Releasing when the send ends, however it
+    ends, also covers a client that disconnects before the body starts.
+    """
+
+    def __init__(self, response, bulkhead: Bulkhead) -> None:
+        self.response = response
+        self.bulkhead = bulkhead
+
+    def __getattr__(self, name: str):
+        return getattr(self.response, name)  # status_code, headers, ...
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.bulkhead.release()
+
+
+def _retry_after(seconds: float) -> dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class AdmissionController:
+    def __init__(self, settings: Settings, limiter: RateLimiter, max_tokens: int = 10_000) -> None:
+        self.settings = settings
+        self.limiter = limiter
+        # Raw bearer token -> "sub:<subject>" (None when it does not verify), so
+        # a client's token is decoded once, not on every request.
+        self.max_tokens = max_tokens
+        self._token_keys: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.bulkheads = {
+            "read": Bulkhead(settings.bulkhead_read),
+            "heavy": Bulkhead(settings.bulkhead_heavy),
+            "write": Bulkhead(settings.bulkhead_write),
+        }
+        self.rate_limited = 0
+        self.limiter_errors = 0
+
+    def _token_key(self, token: str) -> Optional[str]:
+        if token in self._token_keys:
+            self._token_keys.move_to_end(token)
+            return self._token_keys[token]
+        try:
+            claims = jwt.decode(
+                token,
+                self.settings.jwt_secret,
+                algorithms=["HS256"],
+                audience=self.settings.jwt_audience,
+                issuer=self.settings.jwt_issuer,
+                # Only picks the bucket; endpoints still check expiry themselves.
+                options={"verify_exp": False},
+            )
+        except jwt.PyJWTError:
+            key = None
+        else:
+            key = f"sub:{claims['sub']}" if claims.get("sub") else None
+        self._token_keys[token] = key
+        while len(self._token_keys) > self.max_tokens:
+            self._token_keys.popitem(last=False)
+        return key
+
+    def client_key(self, request: Request) -> str:
+        """JWT subject when the bearer token verifies, else the client IP."""
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            key = self._token_key(auth[7:])
+            if key is not None:
+                return key
+        host = request.client.host if request.client else "unknown"
+        return f"ip:{host}"
+
+    async def _rate_limit_wait(self, request: Request) -> float:
+        try:
+            return await self.limiter.hit(
+                self.client_key(request),
+                self.settings.rate_limit_per_second,
+                self.settings.rate_limit_burst,
+            )
+        except redis.RedisError:
+            # An unavailable limiter must not take the API down with it.
+            self.limiter_errors += 1
+            logger.warning("admission.limiter_unavailable", exc_info=True)
+            return 0.0
+
+    async def dispatch(self, request: Request, call_next):
+        kind = route_class(request.method, request.url.path)
+        if kind is None:
+            return await call_next(request)
+
+        wait = await self._rate_limit_wait(request) if self.settings.rate_limit_per_second > 0 else 0.0
+        if wait > 0:
+            self.rate_limited += 1
+            return JSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers=_retry_after(wait),
+            )
+
+        bulkhead = self.bulkheads[kind]
+        if not bulkhead.try_acquire():
+            return JSONResponse(
+                {"detail": f"Too many concurrent {kind} requests"},
+                status_code=503,
+                headers=_retry_after(self.settings.bulkhead_retry_after),
+            )
+        try:
+            response = await call_next(request)
+        except BaseException:
+            bulkhead.release()
+            raise
+        return _HeldUntilSent(response, bulkhead)
+
+    def metrics(self) -> dict:
+        return {
+            "rate_limited": self.rate_limited,
+            "limiter_errors": self.limiter_errors,
+            "bulkheads": {
+                kind: {"limit": b.limit, "in_flight": b.in_flight, "rejected": b.rejected}
+                for kind, b in self.bulkheads.items()
+            },
+        }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_config: Optional[tuple] = None
+
+
+def _config(settings: Settings) -> tuple:
+    return (
+        settings.admission_backend,
+        settings.redis_url,
+        settings.rate_limit_per_second,
+        settings.rate_limit_burst,
+        settings.bulkhead_read,
+        settings.bulkhead_heavy,
+        settings.bulkhead_write,
+        settings.bulkhead_retry_after,
+    )
+
+
+def get_admission_controller(settings: Settings) -> Optional[AdmissionController]:
+    """The controller for the current settings (rebuilt when they change)."""
+    global _controller, _controller_config
+    if not settings.admission_enabled:
+        return None
+    config = _config(settings)
+    if _controller is None or config != _controller_config:
+        if settings.admission_backend == "redis":
+            limiter: RateLimiter = RedisRateLimiter(
+                redis.from_url(settings.redis_url, decode_responses=True)
+            )
+        elif settings.admission_backend == "memory":
+            limiter = MemoryRateLimiter()
+        else:
+            raise ValueError(f"Invalid BOOK_ADMISSION_BACKEND: {settings.admission_backend}")
+        _controller = AdmissionController(settings, limiter)
+        _controller_config = config
+    return _controller
+
+
+def _reset_after_fork() -> None:
+    # The Redis pool (and bucket state) of a preloading parent is not ours.
+    global _controller, _controller_config
+    _controller = None
+    _controller_config = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def admission_metrics() -> dict:
+    return _controller.metrics() if _controller is not None else {}
@@ -0,0 +1,262 @@
+# book_service/app/analytics.py
+"""
+Columnar in-memory snapshot of the catalogue for vectorized analytics.
+
+One row per book slot:
+- `ids` (int64) and `years` (int32) as NumPy arrays,
+- `genres` / `authors` as int32 codes into a Categories table,
+- titles casefolded, UTF-8 encoded and concatenated into one byte buffer,
+  addressed by per-row `title_start` / `title_len`,
+- an `alive` mask (deletes only clear it; once dead slots outnumber live
+  ones the rows are packed, like the title buffer).
+
+Filters become boolean masks and group-bys become `bincount` / `unique`,
+so answers cost a few passes over contiguous arrays instead of a Python
+loop or a table scan. The snapshot is a FeedIndex and follows the change
+feed like the search index.
+
+NumPy is optional (`pip install .[analytics]`); without it the analytics
+endpoint answers 501.
+"""
+
+from typing import Any, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None
+
+from .feed_index import FeedIndex, built_indexes, current_index, field_value
+
+_INITIAL_CAPACITY = 1024
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """NumPy is not installed."""
+
+
+class Categories:
+    """Value <-> int32 code table; lookups are case-insensitive."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: str) -> int:
+        key = value.casefold()
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._codes.get(value.casefold())
+
+
+class ColumnarSnapshot(FeedIndex):
+    """Column arrays for one catalogue, appended to / patched from the change feed."""
+
+    def _reset(self) -> None:
+        if np is None:
+            raise AnalyticsUnavailable("analytics needs numpy; install the 'analytics' extra")
+        self.size = 0
+        self.ids = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.years = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self.genres = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self.authors = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self.title_start = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.title_len = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self.alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self.titles = bytearray()
+        self.genre_codes = Categories()
+        self.author_codes = Categories()
+        self._rows: dict[int, int] = {}  # book id -> row
+        self._title_order = None  # live rows sorted by title_start, rebuilt lazily
+        self._garbage = 0  # title bytes no live row points at
+        self._dead_rows = 0  # slots below `size` whose book was deleted
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _grow(self) -> None:
+        capacity = len(self.ids) * 2
+        for name in ("ids", "years", "genres", "authors", "title_start", "title_len", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            setattr(self, name, grown)
+
+    def _add(self, book_id: int, book: Any) -> None:
+        row = self._rows.get(book_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self._rows[book_id] = row
+        else:
+            self._garbage += int(self.title_len[row])
+        title = str(field_value(book, "title")).casefold().encode()
+        self.ids[row] = book_id
+        self.years[row] = field_value(book, "year")
+        self.genres[row] = self.genre_codes.code(field_value(book, "genre"))
+        self.authors[row] = self.author_codes.code(field_value(book, "author"))
+        self.title_start[row] = len(self.titles)
+        self.title_len[row] = len(title)
+        self.titles += title
+        self.alive[row] = True
+        self._title_order = None
+        if self._garbage > len(self.titles) // 2:
+            self._compact_titles()
+
+    def _remove(self, book_id: int) -> None:
+        row = self._rows.pop(book_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self._garbage += int(self.title_len[row])
+            self._dead_rows += 1
+            self._title_order = None
+            if self._dead_rows > self.size // 2:
+                self._compact_rows()
+
+    def _compact_rows(self) -> None:
+        """Move live rows down over deleted slots, then repack their titles."""
+        rows = np.flatnonzero(self.alive[: self.size])
+        live = len(rows)
+        for name in ("ids", "years", "genres", "authors", "title_start", "title_len", "alive"):
+            column = getattr(self, name)
+            column[:live] = column[rows]
+            column[live : self.size] = 0
+        self.size = live
+        self._rows = dict(zip(self.ids[:live].tolist(), range(live)))
+        self._dead_rows = 0
+        self._compact_titles()
+
+    def _compact_titles(self) -> None:
+        """Rewrite the title buffer without bytes left behind by updates/deletes."""
+        rows = np.flatnonzero(self.alive[: self.size])
+        packed = bytearray()
+        for row in rows:
+            start = int(self.title_start[row])
+            self.title_start[row] = len(packed)
+            packed += self.titles[start : start + int(self.title_len[row])]
+        self.titles = packed
+        self._garbage = 0
+        self._title_order = None
+
+    def _occurrences(self, pattern: bytes):
+        """
+        Byte offsets of every occurrence of `pattern` in the title buffer.
+        Candidates start as the offsets holding its first byte and are
+        narrowed one byte at a time, so each step is one vectorized compare
+        over the survivors rather than a Python call per hit.
+        """
+        buffer = np.frombuffer(self.titles, dtype=np.uint8)
+        if len(buffer) < len(pattern):
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.flatnonzero(buffer[: len(buffer) - len(pattern) + 1] == pattern[0])
+        for offset in range(1, len(pattern)):
+            if not len(candidates):
+                break
+            candidates = candidates[buffer[candidates + offset] == pattern[offset]]
+        return candidates
+
+    def _title_mask(self, needle: str):
+        """Rows whose title contains `needle` (case-insensitive)."""
+        size = self.size
+        mask = np.zeros(size, dtype=bool)
+        pattern = needle.casefold().encode()
+        if not pattern or not size:
+            return mask
+        hits = self._occurrences(pattern)
+        if not len(hits):
+            return mask
+        # Map byte offsets back to rows with one searchsorted.
+        if self._title_order is None:
+            live = np.flatnonzero(self.alive[:size])
+            self._title_order = live[np.argsort(self.title_start[live], kind="stable")]
+        order = self._title_order
+        if not len(order):
+            return mask
+        starts = self.title_start[order]
+        slots = np.searchsorted(starts, hits, side="right") - 1
+        hits, rows = hits[slots >= 0], order[slots[slots >= 0]]
+        inside = hits + len(pattern) <= self.title_start[rows] + self.title_len[rows]
+        mask[rows[inside]] = True
+        return mask
+
+    def query(
+        self,
+        *,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        genre: Optional[str] = None,
+        author: Optional[str] = None,
+        title: Optional[str] = None,
+        group_by: Optional[str] = None,
+        top: Optional[int] = None,
+    ) -> tuple[int, dict]:
+        """Count books matching every filter, optionally grouped."""
+        with self._lock:
+            size = self.size
+            mask = self.alive[:size].copy()
+            if year_from is not None:
+                mask &= self.years[:size] >= year_from
+            if year_to is not None:
+                mask &= self.years[:size] <= year_to
+            for column, table, value in (
+                (self.genres, self.genre_codes, genre),
+                (self.authors, self.author_codes, author),
+            ):
+                if value is None:
+                    continue
+                code = table.lookup(value)
+                if code is None:
+                    return 0, {}
+                mask &= column[:size] == code
+            if title:
+                mask &= self._title_mask(title)
+
+            total = int(np.count_nonzero(mask))
+            if group_by is None or total == 0:
+                return total, {}
+            if group_by == "year":
+                keys, counts = np.unique(self.years[:size][mask], return_counts=True)
+                groups = {str(key): int(count) for key, count in zip(keys.tolist(), counts.tolist())}
+            else:
+                table = self.genre_codes if group_by == "genre" else self.author_codes
+                column = self.genres if group_by == "genre" else self.authors
+                counts = np.bincount(column[:size][mask], minlength=len(table))
+                codes = np.flatnonzero(counts)
+                groups = {table.values[code]: int(counts[code]) for code in codes.tolist()}
+        ranked = sorted(groups.items(), key=lambda kv: (-kv[1], kv[0]))
+        return total, dict(ranked[:top] if top else ranked)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            columns = (self.ids, self.years, self.genres, self.authors, self.title_start, self.title_len, self.alive)
+            return {
+                "books": len(self),
+                "seq": self.seq,
+                "bytes": sum(column.nbytes for column in columns) + len(self.titles),
+            }
+
+
+def analytics_available() -> bool:
+    return np is not None
+
+
+def analytics_metrics() -> list[dict]:
+    if np is None:
+        return []
+    return [index.metrics() for index in built_indexes(ColumnarSnapshot)]
+
+
+def analytics_query(repository, *, max_lag: float = 2.0, **filters) -> tuple[int, dict]:
+    if np is None:
+        raise AnalyticsUnavailable("analytics needs numpy; install the 'analytics' extra")
+    return current_index(ColumnarSnapshot, repository, max_lag).query(**filters)
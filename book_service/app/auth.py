@@ -7,8 +7,9 @@ from pydantic import BaseModel
 
 from .database import SettingsDep
 from .security import hash_password, create_access_token, verify_password
+from .timing import TimedRoute
 
-router = APIRouter(prefix="/token", tags=["auth"])
+router = APIRouter(prefix="/token", tags=["auth"], route_class=TimedRoute)
 
 USERS = {
     "teacher": {
@@ -14,13 +14,93 @@ class Settings(BaseSettings):
     database_echo: bool = False
     pool_size: int = 5
     pool_timeout: int = 30
+    # Postgres only: range-partition `books` by year (alembic upgrade, or scripts.partition_books online)
+    pg_partition_by_year: bool = False
+    pg_partition_span: int = 10  # years per partition
+
+    # ---- Durable memory mode (snapshot + append-only log; unset = nothing survives a restart) ----
+    memory_data_dir: str | None = None
+    memory_snapshot_interval: float = 300.0  # seconds between background compactions
+    memory_log_fsync: bool = False  # fsync every logged write (survives power loss, slower writes)
+    memory_changes_retained: int = 1_000_000  # change-feed entries kept after a snapshot; older `since` gets 410
+
+    # ---- Shared memory catalogue (one copy for all worker processes; e.g. /dev/shm/books-catalogue) ----
+    memory_shared_path: str | None = None
+    memory_shared_max_books: int = 4_000_000  # highest book id; sizes the (sparse) slot table
+    memory_shared_heap_mb: int = 2048  # record heap, allocated only as it is written
+    memory_shared_max_changes: int = 8_000_000  # change-feed ring (24 bytes each); older `since` gets 410
+
+    # ---- Group commit (batch concurrent POST /books into one transaction) ----
+    group_commit_enabled: bool = False
+    group_commit_max_batch: int = 64
+    group_commit_max_delay_ms: float = 5.0
+
+    # ---- Single flight: concurrent identical get/list/search calls share one query ----
+    singleflight_enabled: bool = True
+
+    # ---- In-memory catalogue views (fuzzy search, suggest, analytics) ----
+    search_index_warm: bool = True  # build at startup instead of on the first query
+    search_index_max_lag: float = 2.0  # seconds before catching up with other replicas' writes
+
+    # ---- Admission control (rate limits per client, bulkheads per route class) ----
+    admission_enabled: bool = False
+    admission_backend: str = "memory"  # memory | redis (buckets shared across replicas)
+    rate_limit_per_second: float = 20.0  # 0 = no rate limit (bulkheads only)
+    rate_limit_burst: int = 40
+    bulkhead_read: int = 64  # concurrent cheap reads per process
+    bulkhead_heavy: int = 8  # search / stats / changes / bulk
+    bulkhead_write: int = 16
+    bulkhead_retry_after: int = 1  # seconds, sent with 503 when a bulkhead is full
+
+    # ---- Health probes (/readyz reports what a background monitor last saw) ----
+    health_check_interval: float = 5.0  # seconds between dependency checks
+    health_check_timeout: float = 2.0  # per check (DB connect, Redis ping)
+    health_pool_saturation: float = 0.9  # in-use/capacity ratio reported as saturated
+
+    # ---- Logging (JSON through a bounded queue; request threads never wait on the sink) ----
+    log_level: str = "INFO"
+    log_format: str = "json"  # json | text
+    log_queue_size: int = 10_000  # records buffered for the sink; overflow is dropped and counted
+    log_info_sample_rate: float = 1.0  # fraction of INFO records kept; warnings and errors always are
+    log_sample_rates: dict[str, float] = {}  # per event, e.g. {"book.created": 0.01}
+
+    # ---- Server-Timing (per-request stage timings in a request.timing log line; the header only for admins) ----
+    server_timing_enabled: bool = False
+
+    # ---- On-demand profiling (X-Profile: 1 with an admin token, or sampled) ----
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0  # fraction of requests profiled without asking
+    profile_interval_ms: float = 2.0  # stack sampling period
+    profile_dir: str = "./data/profiles"
+    profile_keep: int = 200  # newest profiles kept on disk
+
+    # ---- Multi-process serving (python -m book_service.serve) ----
+    web_bind: str = "0.0.0.0:8000"
+    web_workers: int = 0  # 0 = one per CPU core
+    web_max_requests: int = 10_000  # recycle a worker after this many requests (0 = never)
+    web_max_requests_jitter: int = 1_000  # so workers do not all recycle at once
+    web_timeout: int = 60  # seconds before a stuck worker is killed and replaced
+    web_graceful_timeout: int = 30  # seconds to finish in-flight requests on reload/stop
 
     # ---- JWT settings ----
     jwt_secret: str = "dev-secret"
     jwt_issuer: str = "book-service"
     jwt_audience: str = "book-clients"
     jwt_expiry_minutes: int = 30
-   
+
+    # ---- Redis / worker settings ----
+    redis_url: str = "redis://redis:6379/0"
+    worker_queue_backend: str = "redis"  # redis | memory
+    worker_concurrency: int = 4
+    worker_max_attempts: int = 5
+    worker_backoff_base: float = 0.5
+    worker_backoff_max: float = 60.0
+    worker_visibility_timeout: float = 30.0  # seconds without a heartbeat before a replica's jobs are requeued
+    worker_refresh_interval: float = 60.0  # seconds between scheduled refresh jobs
+    worker_refresh_fanout: int = 4  # refresh jobs per run; each one joins the sharded refresh
+    refresh_shard_size: int = 10_000  # book ids per shard
+    refresh_parallelism: int = 2  # shards processed concurrently per participating job
+    refresh_lease_ttl: float = 30.0
 
 
     @property
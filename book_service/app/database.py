@@ -1,5 +1,6 @@
 # book_service/app/database.py
 
+import os
 from collections.abc import Generator
 from typing import Annotated
 
@@ -48,6 +49,15 @@ def _build_engine(settings: Settings):
 engine = _build_engine(_settings)
 
 
+def _dispose_after_fork() -> None:
+    # Pooled connections inherited from a preloading parent belong to it;
+    # drop them without closing so the parent's sockets stay intact.
+    engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
 def init_db() -> None:
     """
     Initializes the database schema.
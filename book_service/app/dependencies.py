@@ -1,13 +1,21 @@
 # filepath: book_service/app/dependencies.py
 
 
+import os
+import threading
 from typing import Annotated, Protocol
 
 from fastapi import Depends
 
+from .config import Settings
 from .database import SessionDep, SettingsDep
+from .group_commit import GroupCommitRepository, get_group_committer
+from .memory_store import DurableBookRepository
 from .repository import BookRepository as InMemoryRepository
 from .repository_db import BookRepository as SqlRepository
+from .shared_catalogue import SharedBookRepository
+from .singleflight import SingleFlightRepository
+from .timing import TimedRepository, stage
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
@@ -19,45 +27,132 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 def require_role(*allowed_roles: str):
     def inner(settings: SettingsDep, token: str = Security(oauth2_scheme)):
-        try:
-            payload = jwt.decode(
-                token,
-                settings.jwt_secret,
-                algorithms=["HS256"],
-                audience=settings.jwt_audience,
-                issuer=settings.jwt_issuer,
-            )
-        except jwt.PyJWTError as exc:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
-
-        roles = set(payload.get("roles", []))
-        if not roles.intersection(allowed_roles):
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-        return payload
+        with stage("auth"):
+            try:
+                payload = jwt.decode(
+                    token,
+                    settings.jwt_secret,
+                    algorithms=["HS256"],
+                    audience=settings.jwt_audience,
+                    issuer=settings.jwt_issuer,
+                )
+            except jwt.PyJWTError as exc:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
+
+            roles = set(payload.get("roles", []))
+            if not roles.intersection(allowed_roles):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+            return payload
 
     return inner
 
 
 class BookRepositoryProtocol(Protocol):
-    def list(self, *, skip: int = 0, limit: int = 100): ...
+    def list(self, *, skip: int = 0, limit: int = 100, after_id: int | None = None): ...
     def create(self, payload): ...
+    def create_many(self, payloads): ...
     def get(self, book_id: int): ...
+    def update(self, book_id: int, payload): ...
     def delete(self, book_id: int): ...
     def delete_all(self) -> int: ...
-    def search(self, query: str, *, skip: int = 0, limit: int = 100): ...
+    def get_many(self, book_ids): ...
+    def search(self, title=None, author=None, year=None, genre=None, year_from=None, year_to=None): ...
+    def count(self, *, estimated: bool = False) -> int: ...
+    def latest_seq(self) -> int: ...
+    def iter_batches(self, columns, *, batch_size: int = 10_000): ...
+    def stats(self, *, top: int | None = None): ...
+    def rebuild_stats(self) -> int: ...
+    def changes(self, *, since: int = 0, limit: int = 500): ...
+
+
+# singleton in-memory repo: state (books and their stats) must outlive a request
+_memory_repo: InMemoryRepository | SharedBookRepository | None = None
+_memory_repo_lock = threading.Lock()
+
+
+def get_memory_repository(settings: Settings) -> InMemoryRepository | SharedBookRepository:
+    """
+    The process-wide memory repo: shared by all worker processes when
+    BOOK_MEMORY_SHARED_PATH is set, durable when BOOK_MEMORY_DATA_DIR is set.
+    """
+    global _memory_repo
+    with _memory_repo_lock:
+        if _memory_repo is None:
+            if settings.memory_shared_path:
+                _memory_repo = SharedBookRepository(
+                    settings.memory_shared_path,
+                    max_books=settings.memory_shared_max_books,
+                    heap_mb=settings.memory_shared_heap_mb,
+                    max_changes=settings.memory_shared_max_changes,
+                )
+            elif settings.memory_data_dir:
+                _memory_repo = DurableBookRepository(
+                    settings.memory_data_dir,
+                    fsync=settings.memory_log_fsync,
+                    retain_changes=settings.memory_changes_retained,
+                )
+            else:
+                _memory_repo = InMemoryRepository()
+        return _memory_repo
+
+
+def close_memory_repository() -> None:
+    """Durable mode: write a final snapshot and release the data directory."""
+    global _memory_repo
+    with _memory_repo_lock:
+        if not isinstance(_memory_repo, DurableBookRepository):
+            return
+        repository, _memory_repo = _memory_repo, None
+    repository.close()
+
+
+def _reset_after_fork() -> None:
+    # flock() locks belong to the open file description, which a forked
+    # child shares with its parent: reopen the shared catalogue so workers
+    # really exclude each other.
+    global _memory_repo, _memory_repo_lock
+    _memory_repo_lock = threading.Lock()
+    if isinstance(_memory_repo, InMemoryRepository):
+        _memory_repo._lock = threading.RLock()  # another thread may have held it at fork time
+    if isinstance(_memory_repo, SharedBookRepository):
+        _memory_repo.close()
+        _memory_repo = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def memory_store_metrics() -> dict:
+    repository = _memory_repo
+    if isinstance(repository, (DurableBookRepository, SharedBookRepository)):
+        return repository.metrics()
+    return {}
 
 
-# singleton in-memory repo
-# _memory_repo = InMemoryRepository()
-
 def get_repository(settings: SettingsDep, session: SessionDep) -> BookRepositoryProtocol:
+    repository = _build_repository(settings, session)
+    if settings.server_timing_enabled:
+        return TimedRepository(repository)
+    return repository
+
+
+def _build_repository(settings: Settings, session) -> BookRepositoryProtocol:
     if settings.db_mode == "memory":
-        return InMemoryRepository()
-    # if settings.db_mode == "memory":
-    #     return _memory_repo  # always return the same instance
+        return get_memory_repository(settings)  # always the same instance
     if session is None:
         raise RuntimeError("Database session required for non-memory modes")
-    return SqlRepository(session)
+    if settings.group_commit_enabled:
+        committer = get_group_committer(
+            session.get_bind(),
+            max_batch=settings.group_commit_max_batch,
+            max_delay=settings.group_commit_max_delay_ms / 1000,
+        )
+        repository = GroupCommitRepository(session, committer)
+    else:
+        repository = SqlRepository(session)
+    if settings.singleflight_enabled:
+        return SingleFlightRepository(repository, session)
+    return repository
 
 
 RepositoryDep = Annotated[BookRepositoryProtocol, Depends(get_repository)]
\ No newline at end of file
@@ -0,0 +1,208 @@
+# book_service/app/feed_index.py
+"""
+Base class for in-process views of the catalogue (search index, columnar
+analytics snapshot) that are built once and then kept current from the
+change feed.
+
+A view is built by paging through the repository and replaying the
+changes made while it scanned. Afterwards it catches up from the feed
+when a local commit marked it stale, or when it is older than the
+caller's `max_lag` (writes made by other replicas). If the feed no
+longer reaches back to the view's sequence number, the view is rebuilt.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Hashable
+from typing import Any, TypeVar
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ChangesExpired(RuntimeError):
+    """`changes(since=...)` asked for history the repository no longer keeps."""
+
+    def __init__(self, since: int, oldest: int) -> None:
+        super().__init__(f"changes after seq {since} are gone (oldest kept: after seq {oldest}); resync")
+        self.since = since
+        self.oldest = oldest
+
+
+class FeedIndex:
+    """Subclasses implement `_reset`, `_add`, `_remove` and `__len__`."""
+
+    def __init__(self) -> None:
+        self._reset()
+        self.seq = 0
+        self.built = False
+        self.stale = True
+        self.synced_at = 0.0
+        self._lock = threading.RLock()
+
+    def _reset(self) -> None:
+        raise NotImplementedError
+
+    def _add(self, book_id: int, book: Any) -> None:
+        """Insert or replace a book (a Book, or the change feed's dict)."""
+        raise NotImplementedError
+
+    def _remove(self, book_id: int) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _start_bulk(self) -> None:
+        """Hook: the initial scan is about to `_add` every book."""
+
+    def _finish_bulk(self) -> None:
+        """Hook: the initial scan is done (e.g. sort what was appended)."""
+
+    def apply(self, change: Any) -> None:
+        if change.op == "delete":
+            self._remove(change.book_id)
+        else:
+            self._add(change.book_id, change.book)
+        self.seq = max(self.seq, change.seq)
+
+    def build(self, repository, *, page_size: int = 5000) -> int:
+        """Index every book, then replay changes made while scanning."""
+        with self._lock:
+            self._reset()
+            self.seq = repository.latest_seq()
+            after_id = 0
+            self._start_bulk()
+            try:
+                while True:
+                    page = list(repository.list(after_id=after_id, limit=page_size))
+                    for book in page:
+                        self._add(book.id, book)
+                    if len(page) < page_size:
+                        break
+                    after_id = page[-1].id
+            finally:
+                self._finish_bulk()
+            self.built = True
+            self.catch_up(repository)
+            return len(self)
+
+    def catch_up(self, repository, *, page_size: int = 5000) -> int:
+        with self._lock:
+            applied = 0
+            while True:
+                try:
+                    changes = repository.changes(since=self.seq, limit=page_size)
+                except ChangesExpired:
+                    logger.warning("feed_index.resync index=%s seq=%s", type(self).__name__, self.seq)
+                    return self.build(repository, page_size=page_size)
+                for change in changes:
+                    self.apply(change)
+                applied += len(changes)
+                if len(changes) < page_size:
+                    break
+            self.stale = False
+            self.synced_at = time.monotonic()
+            return applied
+
+    def ensure_current(self, repository, max_lag: float) -> None:
+        with self._lock:
+            if not self.built:
+                self.build(repository)
+            elif self.stale or time.monotonic() - self.synced_at > max_lag:
+                self.catch_up(repository)
+
+
+def field_value(book: Any, field: str) -> Any:
+    return book[field] if isinstance(book, dict) else getattr(book, field)
+
+
+IndexT = TypeVar("IndexT", bound=FeedIndex)
+
+_indexes: dict[tuple[type, Hashable], FeedIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def index_key(repository) -> Hashable:
+    """SQL repositories share one view per database; in-memory ones per instance."""
+    repository = getattr(repository, "wrapped", repository)  # timing.TimedRepository
+    session = getattr(repository, "session", None)
+    return session.get_bind() if session is not None else repository
+
+
+def get_index(cls: type[IndexT], key: Hashable) -> IndexT:
+    with _registry_lock:
+        index = _indexes.get((cls, key))
+        if index is None:
+            index = _indexes[(cls, key)] = cls()
+        return index
+
+
+def current_index(cls: type[IndexT], repository, max_lag: float) -> IndexT:
+    """The `cls` view of `repository`'s catalogue, caught up if needed."""
+    index = get_index(cls, index_key(repository))
+    index.ensure_current(repository, max_lag)
+    return index
+
+
+def built_indexes(cls: type[IndexT]) -> list[IndexT]:
+    with _registry_lock:
+        return [index for (kind, _), index in _indexes.items() if kind is cls and index.built]
+
+
+def mark_stale(key: Hashable) -> None:
+    with _registry_lock:
+        indexes = [index for (_, index_key_), index in _indexes.items() if index_key_ is key]
+    for index in indexes:
+        index.stale = True
+
+
+def reset_indexes() -> None:
+    with _registry_lock:
+        _indexes.clear()
+
+
+def _reset_after_fork() -> None:
+    # Views built before a fork are inherited (copy-on-write) and kept;
+    # only locks that another thread might have held are replaced.
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    for index in _indexes.values():
+        index._lock = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def warm(cls: type[FeedIndex], repository) -> None:
+    """
+    Build the `cls` view of `repository` ahead of the first query. A view
+    already built (e.g. inherited from a preloading parent) only catches up.
+    """
+    try:
+        index = get_index(cls, index_key(repository))
+        if index.built:
+            index.catch_up(repository)
+        else:
+            index.build(repository)
+    except Exception:
+        logger.warning("feed_index.warm_failed index=%s", cls.__name__, exc_info=True)
+    else:
+        logger.info("feed_index.built index=%s books=%s", cls.__name__, len(index))
+
+
+# The SQL repository flags sessions that wrote books (session.info); once
+# such a session commits, the views of its database have to catch up.
+@event.listens_for(Session, "after_commit")
+def _books_committed(session: Session) -> None:
+    if session.info.pop("books_changed", False):
+        mark_stale(session.get_bind())
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _books_rolled_back(session: Session, previous_transaction) -> None:
+    session.info.pop("books_changed", None)
@@ -0,0 +1,192 @@
+# book_service/app/group_commit.py
+"""
+Group commit for single-book creates.
+
+With BOOK_GROUP_COMMIT_ENABLED=true, concurrent `POST /books` calls do not
+commit one by one. Each request thread hands its payload to a per-engine
+GroupCommitter and waits; a background thread collects whatever arrived
+within `max_delay` (or up to `max_batch` items) and writes the whole batch
+through `create_many`, i.e. one transaction and one fsync.
+
+Every caller still gets its own Book back. If the shared transaction fails,
+the batch is replayed one create per transaction, so a bad row only fails
+its own request.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .models import Book, BookCreate
+from .repository_db import BookRepository
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    """Batches creates submitted from many threads into shared transactions."""
+
+    def __init__(self, engine: Engine, *, max_batch: int = 64, max_delay: float = 0.005) -> None:
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[tuple[BookCreate, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self.largest_batch = 0
+
+    def submit(self, payload: BookCreate, timeout: Optional[float] = None) -> Book:
+        """Queue one create and block until its batch is committed."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("group committer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((payload, future))
+        return future.result(timeout)
+
+    def close(self) -> None:
+        """Flush what is queued and stop the background thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            self._flush(batch)
+        # Requests that raced with close() must not hang.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._flush([item])
+
+    def _flush(self, batch: list[tuple[BookCreate, Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            with Session(self.engine) as session:
+                books = BookRepository(session).create_many([payload for payload, _ in batch])
+        except Exception:
+            logger.warning("group_commit.fallback size=%s", len(batch), exc_info=True)
+            self.fallbacks += 1
+        else:
+            for (_, future), book in zip(batch, books):
+                future.set_result(book)
+            return
+        # Replay one transaction per item so each caller sees its own outcome.
+        for payload, future in batch:
+            try:
+                with Session(self.engine) as session:
+                    future.set_result(BookRepository(session).create(payload))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "fallbacks": self.fallbacks,
+            "largest_batch": self.largest_batch,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class GroupCommitRepository(BookRepository):
+    """SQL repository whose `create` goes through a GroupCommitter."""
+
+    def __init__(self, session: Session, committer: GroupCommitter) -> None:
+        super().__init__(session)
+        self.committer = committer
+
+    def create(self, payload: BookCreate) -> Book:
+        return self.committer.submit(payload)
+
+
+_committers: dict[Engine, GroupCommitter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_group_committer(engine: Engine, *, max_batch: int, max_delay: float) -> GroupCommitter:
+    """One committer per engine, created on first use."""
+    with _registry_lock:
+        committer = _committers.get(engine)
+        if committer is None:
+            committer = _committers[engine] = GroupCommitter(
+                engine, max_batch=max_batch, max_delay=max_delay
+            )
+        return committer
+
+
+def shutdown_group_committers() -> None:
+    with _registry_lock:
+        committers = list(_committers.values())
+        _committers.clear()
+    for committer in committers:
+        committer.close()
+
+
+def _reset_after_fork() -> None:
+    # Committer threads do not survive a fork; start fresh ones on demand.
+    global _registry_lock
+    _registry_lock = threading.Lock()
+    _committers.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def group_commit_metrics() -> dict[str, float]:
+    """Metrics summed over every active committer."""
+    with _registry_lock:
+        committers = list(_committers.values())
+    totals = {"batches": 0, "items": 0, "fallbacks": 0, "largest_batch": 0}
+    for committer in committers:
+        snapshot = committer.metrics()
+        for key in ("batches", "items", "fallbacks"):
+            totals[key] += snapshot[key]
+        totals["largest_batch"] = max(totals["largest_batch"], snapshot["largest_batch"])
+    totals["mean_batch"] = round(totals["items"] / totals["batches"], 2) if totals["batches"] else 0.0
+    return totals
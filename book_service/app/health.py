@@ -0,0 +1,208 @@
+# book_service/app/health.py
+"""
+Background health monitor behind /readyz.
+
+Probes only read the last result, so however often Kubernetes asks, the
+dependencies see one check per BOOK_HEALTH_CHECK_INTERVAL per process:
+
+- database: `SELECT 1` on the monitor's own connection (outside the app's
+  pool, so a saturated pool cannot starve the check and the check never
+  takes a slot from a request);
+- pool: connections checked out vs. capacity, read from the pool object;
+- redis: PING, when the API uses Redis (admission or worker queue);
+- catalogue: heap fill and change-feed range of the shared memory
+  catalogue, when BOOK_MEMORY_SHARED_PATH is set.
+
+Readiness fails when a dependency the API needs is down, or when the
+monitor itself has stopped reporting. A saturated pool or a nearly full
+catalogue heap is reported but does not fail readiness: taking busy pods
+out of rotation only moves their load onto the others, and a full heap
+still serves reads.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import redis
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from .config import Settings
+from .database import engine
+from .dependencies import memory_store_metrics
+
+logger = logging.getLogger(__name__)
+
+# Readiness turns false when the newest report is older than this many intervals.
+STALE_INTERVALS = 3
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+class HealthMonitor:
+    """Checks dependencies on a daemon thread and caches the report."""
+
+    def __init__(self, settings: Settings, app_engine=engine) -> None:
+        self.app_engine = app_engine
+        self.interval = settings.health_check_interval
+        self.saturation = settings.health_pool_saturation
+        timeout = settings.health_check_timeout
+        self._db_engine = None
+        self._db = None
+        if settings.db_mode != "memory":
+            postgres = app_engine.dialect.name == "postgresql"
+            connect_args = {"connect_timeout": max(int(timeout), 1)} if postgres else {}
+            self._db_engine = create_engine(app_engine.url, poolclass=NullPool, connect_args=connect_args)
+        self._redis = None
+        if "redis" in (settings.admission_backend, settings.worker_queue_backend):
+            self._redis = redis.Redis.from_url(
+                settings.redis_url, socket_timeout=timeout, socket_connect_timeout=timeout
+            )
+        self._catalogue = settings.db_mode == "memory" and bool(settings.memory_shared_path)
+        self._report: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -----------------------
+    # Checks
+    # -----------------------
+    def _check_database(self) -> dict:
+        start = time.perf_counter()
+        try:
+            if self._db is None:
+                self._db = self._db_engine.connect()
+            self._db.execute(text("SELECT 1"))
+            self._db.rollback()
+            return {"ok": True, "latency_ms": _elapsed_ms(start)}
+        except Exception as exc:
+            self._reset_database()
+            return {"ok": False, "latency_ms": _elapsed_ms(start), "error": type(exc).__name__}
+
+    def _reset_database(self) -> None:
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+    def _check_pool(self) -> dict:
+        pool = self.app_engine.pool
+        in_use = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0) if hasattr(pool, "size") else 0
+        saturated = bool(capacity) and in_use >= capacity * self.saturation
+        return {"ok": True, "in_use": in_use, "capacity": capacity, "saturated": saturated}
+
+    def _check_redis(self) -> dict:
+        start = time.perf_counter()
+        try:
+            self._redis.ping()
+            return {"ok": True, "latency_ms": _elapsed_ms(start)}
+        except redis.RedisError as exc:
+            return {"ok": False, "latency_ms": _elapsed_ms(start), "error": type(exc).__name__}
+
+    def _check_catalogue(self) -> dict:
+        metrics = memory_store_metrics()
+        if not metrics:
+            return {"ok": True}  # not opened yet
+        return {
+            "ok": True,
+            "heap_fill": metrics["heap_fill"],
+            "saturated": metrics["heap_fill"] >= self.saturation,
+            "seq": metrics["seq"],
+            "oldest_seq": metrics["oldest_seq"],
+        }
+
+    def check_once(self) -> dict:
+        checks = {}
+        if self._db_engine is not None:
+            checks["database"] = self._check_database()
+            checks["pool"] = self._check_pool()
+        if self._redis is not None:
+            checks["redis"] = self._check_redis()
+        if self._catalogue:
+            checks["catalogue"] = self._check_catalogue()
+        self._report = {
+            "ready": all(check["ok"] for check in checks.values()),
+            "checked_at": time.time(),
+            "checks": checks,
+        }
+        return self._report
+
+    # -----------------------
+    # Probes (no I/O)
+    # -----------------------
+    def readiness(self) -> tuple[bool, dict]:
+        report = self._report
+        if report is None:
+            return False, {"ready": False, "reason": "starting"}
+        age = time.time() - report["checked_at"]
+        if age > self.interval * STALE_INTERVALS:
+            return False, {**report, "ready": False, "reason": "monitor stalled", "age_s": round(age, 1)}
+        return report["ready"], {**report, "age_s": round(age, 1)}
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                report = self.check_once()
+                if not report["ready"]:
+                    logger.warning("health.not_ready checks=%s", report["checks"])
+            except Exception:
+                logger.exception("health.check_failed")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self._reset_database()
+        if self._db_engine is not None:
+            self._db_engine.dispose()
+        if self._redis is not None:
+            self._redis.close()
+
+
+_monitor: Optional[HealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor(settings: Settings) -> HealthMonitor:
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = HealthMonitor(settings)
+    return _monitor
+
+
+def stop_health_monitor() -> None:
+    global _monitor
+    with _monitor_lock:
+        if _monitor is not None:
+            _monitor.stop()
+            _monitor = None
+
+
+def _reset_after_fork() -> None:
+    # The thread, connection and Redis socket belong to the parent; the
+    # child's lifespan builds its own monitor.
+    global _monitor, _monitor_lock
+    _monitor = None
+    _monitor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,216 @@
+# book_service/app/logs.py
+"""
+Non-blocking structured logging.
+
+Request threads only put records on a bounded queue (QueueHandler); a
+QueueListener thread formats them as JSON and writes to the sink. A slow
+or stuck stdout therefore never stalls a request: when the queue is full
+the record is dropped and counted instead.
+
+On the caller's side a record costs a level check, the sampling filter,
+`getMessage()` and one `put_nowait` - a few microseconds. JSON encoding
+happens on the listener thread.
+
+Each record carries the request's `trace_id` (set by the add_trace_id
+middleware through a context variable, which also reaches threadpool
+workers). The leading "event.name" of the message and its `key=value`
+pairs become fields:
+
+    logger.info("book.created id=%s title=%s", 7, "Dune")
+    {"ts": ..., "level": "INFO", "logger": "book-service", "event": "book.created",
+     "id": "7", "title": "Dune", "trace_id": "req-1a2b3c4d", "msg": "book.created id=7 title=Dune"}
+
+INFO records (and below) can be sampled, per event or globally; warnings
+and errors are always kept. Kept sampled records report `sample_rate`
+so counts can be scaled back up.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from .config import Settings
+
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+_EVENT = re.compile(r"^([a-z_]+(?:\.[a-z_]+)+)\b")
+_FIELD = re.compile(r"(\w+)=(.*?)(?=\s+\w+=|$)")
+_RESERVED = frozenset({"ts", "level", "logger", "event", "msg", "trace_id", "sample_rate", "exc"})
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO-and-below records; runs in the calling thread."""
+
+    def __init__(self, default_rate: float = 1.0, rates: Optional[dict[str, float]] = None) -> None:
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = trace_id_var.get()
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.default_rate
+        if self.rates and isinstance(record.msg, str):
+            event = record.msg.split(" ", 1)[0]
+            rate = self.rates.get(event, rate)
+        if rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking or raising when full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change after the call returns) but leave
+        # all formatting to the listener; no copy, the record is ours.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs on the listener thread."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        match = _EVENT.match(message)
+        if match:
+            entry["event"] = match.group(1)
+            for key, value in _FIELD.findall(message[match.end() :]):
+                if key not in _RESERVED:
+                    entry[key] = value
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        if hasattr(record, "sample_rate"):
+            entry["sample_rate"] = record.sample_rate
+        entry["msg"] = message
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _Listener(QueueListener):
+    STOP_TIMEOUT = 5.0
+
+    def stop(self) -> None:
+        # Let the thread drain the queue, but never hang the process on exit
+        # because the sink is stuck: give up after STOP_TIMEOUT.
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(self._sentinel, timeout=self.STOP_TIMEOUT)
+        except queue.Full:
+            pass
+        self._thread.join(self.STOP_TIMEOUT)
+        self._thread = None
+
+
+class LogPipeline:
+    """Queue handler for the callers, listener thread + sink handler behind it."""
+
+    def __init__(self, settings: Settings, sink: Optional[logging.Handler] = None) -> None:
+        self.sink = sink or logging.StreamHandler(sys.stdout)
+        if settings.log_format == "json":
+            self.sink.setFormatter(JsonFormatter())
+        else:
+            self.sink.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.queue_size = settings.log_queue_size
+        self.sampler = SamplingFilter(settings.log_info_sample_rate, settings.log_sample_rates)
+        self.handler = BoundedQueueHandler(queue.Queue(self.queue_size))
+        self.handler.addFilter(self.sampler)
+        self.listener: Optional[_Listener] = None
+
+    def start(self) -> None:
+        self.listener = _Listener(self.handler.queue, self.sink, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Flush what is queued and stop the listener thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self) -> None:
+        # The listener thread did not survive the fork, and the queue's lock
+        # may have been held by it; start over with fresh ones.
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.listener = None
+        self.start()
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure_logging(settings: Settings) -> None:
+    """
+    Route the root logger through the queue pipeline. Like basicConfig, this
+    does nothing when the root logger already has handlers (e.g. under a
+    test runner or a server that configured logging itself).
+    """
+    global _pipeline
+    root = logging.getLogger()
+    if _pipeline is not None or root.handlers:
+        return
+    _pipeline = LogPipeline(settings)
+    root.addHandler(_pipeline.handler)
+    root.setLevel(settings.log_level.upper())
+    _pipeline.start()
+
+
+def shutdown_logging() -> None:
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def logging_metrics() -> dict:
+    return _pipeline.metrics() if _pipeline is not None else {}
+
+
+def _restart_after_fork() -> None:
+    if _pipeline is not None and _pipeline.listener is not None:
+        _pipeline.restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(shutdown_logging)
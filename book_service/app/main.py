@@ -3,24 +3,101 @@
 from __future__ import annotations
 import uuid
 import logging
+import random
+import threading
+from contextlib import asynccontextmanager
+from typing import Literal
 
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy import text
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
-from .database import engine, SettingsDep
-from .dependencies import RepositoryDep, require_role
-from .models import Book, BookCreate
+from .admission import admission_metrics, get_admission_controller
+from .config import Settings
+from .database import engine, get_settings, SettingsDep
+from .dependencies import (
+    RepositoryDep,
+    close_memory_repository,
+    get_memory_repository,
+    memory_store_metrics,
+    require_role,
+)
+from .models import Book, BookAnalytics, BookBatch, BookChangesPage, BookCreate, BookStats, Suggestion
 from .auth import router as auth_router
-from fastapi import Query
+from .group_commit import group_commit_metrics, shutdown_group_committers
+from .health import get_health_monitor, stop_health_monitor
+from .logs import configure_logging, logging_metrics, trace_id_var
+from .profiling import PROFILE_ROLE, StackSampler, admin_opt_in, get_profile_store, safe_name
+from .repository_db import BookRepository as SqlRepository
+from .analytics import (
+    AnalyticsUnavailable,
+    ColumnarSnapshot,
+    analytics_available,
+    analytics_metrics,
+    analytics_query,
+)
+from .export import COLUMNS as EXPORT_COLUMNS
+from .export import DEFAULT_BATCH_SIZE, EXTENSIONS, MEDIA_TYPES, ExportUnavailable, stream_export
+from .feed_index import ChangesExpired
+from .feed_index import warm as warm_index
+from .search_index import SearchIndex, fuzzy_search, search_index_metrics, suggest
+from .singleflight import flights
+from .timing import RequestTimings, TimedRoute, timings_var
+from fastapi import Body, Query
 from fastapi import Depends
 # from .deps import require_role
 
 
+MAX_PAGE_SIZE = 1000
+MAX_BULK_SIZE = 1000
+MAX_BATCH_GET = 1000
+MAX_CHANGES_PAGE = 5000
+
+CountMode = Literal["exact", "estimated", "none"]
+COUNT_DESCRIPTION = (
+    "Total in the X-Total-Count header: exact (COUNT(*) on SQL), "
+    "estimated (planner statistics / maintained counters, microseconds) or none"
+)
+
 logger = logging.getLogger("book-service")
-logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+configure_logging(get_settings())
+
+
+def _warm_indexes() -> None:
+    """Build the in-memory views of the catalogue ahead of the first query."""
+    kinds = [SearchIndex] + ([ColumnarSnapshot] if analytics_available() else [])
+    settings = get_settings()
+    if settings.db_mode == "memory":
+        for kind in kinds:
+            warm_index(kind, get_memory_repository(settings))
+        return
+    with Session(engine) as session:
+        for kind in kinds:
+            warm_index(kind, SqlRepository(session))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.db_mode == "memory" and settings.memory_data_dir and not settings.memory_shared_path:
+        # Load snapshot + log before serving, then compact in the background.
+        get_memory_repository(settings).start_compaction(settings.memory_snapshot_interval)
+    if settings.search_index_warm:
+        threading.Thread(target=_warm_indexes, name="index-warm", daemon=True).start()
+    get_health_monitor(settings).start()
+    yield
+    stop_health_monitor()
+    # Commit whatever creates are still queued before the process exits.
+    shutdown_group_committers()
+    if settings.db_mode == "memory":
+        close_memory_repository()
 
-app = FastAPI(title="Book Service", version="0.5.0")
+
+app = FastAPI(title="Book Service", version="0.5.0", lifespan=lifespan)
+app.router.route_class = TimedRoute  # deps / app / serialize stages for Server-Timing
 app.include_router(auth_router)
 
 app.add_middleware(
@@ -29,13 +106,92 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Missing-Ids", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    controller = get_admission_controller(get_settings())
+    if controller is None:
+        return await call_next(request)
+    return await controller.dispatch(request, call_next)
+
+class _ProfiledUntilSent:
+    """
+    Keeps sampling until the response has been sent: streamed responses
+    (exports) do most of their work after call_next has returned. Saving
+    when the send ends, however it ends, also covers a body never started.
+    """
+
+    def __init__(self, response, request: Request, sampler: StackSampler, name: str, settings: Settings) -> None:
+        self.response = response
+        self.request = request
+        self.sampler = sampler
+        self.name = name
+        self.settings = settings
+
+    def __getattr__(self, name: str):
+        return getattr(self.response, name)  # status_code, headers, ...
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.sampler.stop()
+            meta = {"method": self.request.method, "path": self.request.url.path, "status": self.response.status_code}
+            try:
+                await run_in_threadpool(get_profile_store(self.settings).save, self.name, self.sampler, meta)
+            except OSError:
+                logger.exception("profile.save_failed trace_id=%s", self.name)
+
+
+async def _profile(request: Request, call_next, settings: Settings):
+    """call_next under the stack sampler, if the request asked for a profile or was sampled."""
+    if not (
+        admin_opt_in(request.headers.get("X-Profile"), request.headers.get("authorization", ""), settings)
+        or (settings.profile_sample_rate and random.random() < settings.profile_sample_rate)
+    ):
+        return await call_next(request)
+    name = safe_name(request.state.trace_id) or f"req-{uuid.uuid4().hex[:8]}"
+    sampler = StackSampler(settings.profile_interval_ms / 1000).start()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        sampler.stop()
+        raise
+    response.headers["X-Profile-Id"] = name
+    return _ProfiledUntilSent(response, request, sampler, name, settings)
+
 @app.middleware("http")
 async def add_trace_id(request: Request, call_next):
     trace_id = request.headers.get("X-Trace-Id") or f"req-{uuid.uuid4().hex[:8]}"
     request.state.trace_id = trace_id
-    response = await call_next(request)
+    token = trace_id_var.set(trace_id)  # stamped on every log record of this request
+    # Timed here rather than in a middleware of its own: one less hop per request.
+    settings = get_settings()
+    timings = RequestTimings() if settings.server_timing_enabled else None
+    timings_token = timings_var.set(timings)
+    try:
+        # Profiling also lives here, named after the trace id; unprofiled requests only check the setting.
+        if settings.profile_enabled:
+            response = await _profile(request, call_next, settings)
+        else:
+            response = await call_next(request)
+        if timings is not None:
+            timings.finish()
+            # Stage timings (auth included) are a side channel: only admins who ask get the header.
+            if admin_opt_in(request.headers.get("X-Server-Timing"), request.headers.get("authorization", ""), settings):
+                response.headers["Server-Timing"] = timings.header()
+            logger.info(
+                "request.timing method=%s path=%s status=%s %s",
+                request.method,
+                request.url.path,
+                response.status_code,
+                timings.fields(),
+            )
+    finally:
+        timings_var.reset(timings_token)
+        trace_id_var.reset(token)
     response.headers["X-Trace-Id"] = trace_id
     return response
 
@@ -48,11 +204,104 @@ def healthcheck(settings: SettingsDep) -> dict[str, str]:
     return {"status": "ok", "app": settings.app_name, "database": backend}
 
 
+@app.get("/livez", tags=["health"])
+def liveness() -> dict[str, str]:
+    """The process is up and serving; no I/O."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["health"])
+def readiness(settings: SettingsDep) -> JSONResponse:
+    """Last report of the background health monitor (database, pool, Redis); no I/O."""
+    ready, report = get_health_monitor(settings).readiness()
+    return JSONResponse(report, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@app.get("/admin/profiles", tags=["admin"])
+def list_profiles(settings: SettingsDep, token: dict = Depends(require_role(PROFILE_ROLE))) -> list[dict]:
+    """Saved request profiles, newest first."""
+    return get_profile_store(settings).list()
+
+
+@app.get("/admin/profiles/{trace_id}", tags=["admin"], response_class=FileResponse)
+def download_profile(trace_id: str, settings: SettingsDep, token: dict = Depends(require_role(PROFILE_ROLE))):
+    """One profile as folded stacks (flamegraph.pl / speedscope input)."""
+    path = get_profile_store(settings).path(trace_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@app.get("/metrics", tags=["health"])
+def metrics() -> dict:
+    """In-process performance counters."""
+    return {
+        "group_commit": group_commit_metrics(),
+        "admission": admission_metrics(),
+        "singleflight": flights.metrics(),
+        "search_index": search_index_metrics(),
+        "analytics": analytics_metrics(),
+        "memory_store": memory_store_metrics(),
+        "logging": logging_metrics(),
+    }
+
+
+
+def _parse_ids(raw: str) -> list[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers",
+        )
+    if not 1 <= len(ids) <= MAX_BATCH_GET:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"ids must name between 1 and {MAX_BATCH_GET} books",
+        )
+    return ids
+
+
+def _batch_get(repository, ids: list[int]) -> BookBatch:
+    """One `get_many` lookup; found books keep request order, the rest are `missing`."""
+    books = repository.get_many(ids)
+    found = {book.id for book in books}
+    return BookBatch(books=books, missing=[book_id for book_id in ids if book_id not in found])
+
 
 @app.get("/books", response_model=list[Book], tags=["books"])
-def list_books(repository: RepositoryDep) -> list[Book]:
-    """Get all books."""
-    return list(repository.list())
+def list_books(
+    repository: RepositoryDep,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=0, description="Keyset cursor: last ID of the previous page"),
+    ids: str | None = Query(
+        None,
+        description=f"Comma-separated IDs (at most {MAX_BATCH_GET}) to fetch in one lookup instead of a page; "
+        "missing IDs are listed in the X-Missing-Ids header",
+    ),
+    count: CountMode = Query("none", description=COUNT_DESCRIPTION),
+) -> list[Book]:
+    """Get all books, one page at a time, or specific books by ID."""
+    if ids is not None:
+        batch = _batch_get(repository, _parse_ids(ids))
+        if batch.missing:
+            response.headers["X-Missing-Ids"] = ",".join(map(str, batch.missing))
+        return batch.books
+    if count != "none":
+        response.headers["X-Total-Count"] = str(repository.count(estimated=count == "estimated"))
+    return list(repository.list(skip=skip, limit=limit, after_id=after_id))
+
+
+@app.post("/books/batch-get", response_model=BookBatch, tags=["books"])
+def batch_get_books(
+    repository: RepositoryDep,
+    ids: list[int] = Body(..., embed=True, min_length=1, max_length=MAX_BATCH_GET),
+) -> BookBatch:
+    """Get up to MAX_BATCH_GET books by ID in one lookup, in request order."""
+    return _batch_get(repository, ids)
 
 
 @app.post(
@@ -72,52 +321,224 @@ def create_book(
     return book
 
 
-@app.get("/books/{book_id}", response_model=Book, tags=["books"])
-def read_book(book_id: int, repository: RepositoryDep) -> Book:
-    """Get a specific book by ID."""
-    book = repository.get(book_id)
-    if book is None:
+@app.post(
+    "/books/bulk",
+    response_model=list[Book],
+    status_code=status.HTTP_201_CREATED,
+    tags=["books"],
+)
+def create_books_bulk(
+    repository: RepositoryDep,
+    payload: list[BookCreate] = Body(..., min_length=1, max_length=MAX_BULK_SIZE),
+    token: dict = Depends(require_role("editor")),
+) -> list[Book]:
+    """Create many books in one request and one transaction."""
+    books = repository.create_many(payload)
+    logger.info("book.bulk_created count=%s", len(books))
+    return books
+
+
+@app.get("/books/stats", response_model=BookStats, tags=["books"])
+def book_stats(
+    repository: RepositoryDep,
+    top: int | None = Query(None, ge=1, description="Keep only the N largest groups per dimension"),
+) -> BookStats:
+    """Per-genre, per-author and per-year counts from precomputed aggregates."""
+    return repository.stats(top=top)
+
+
+@app.get("/books/changes", response_model=BookChangesPage, tags=["books"])
+def book_changes(
+    repository: RepositoryDep,
+    response: Response,
+    since: int = Query(0, ge=0, description="Last sequence number already applied"),
+    limit: int = Query(500, ge=1, le=MAX_CHANGES_PAGE),
+) -> BookChangesPage:
+    """
+    Catalogue changes after `since`, in sequence order (for incremental sync).
+    The newest sequence number is sent in the X-Latest-Seq header. If
+    changes after `since` were already compacted away the answer is 410:
+    reload the catalogue, then continue from X-Latest-Seq.
+    """
+    response.headers["X-Latest-Seq"] = str(repository.latest_seq())
+    try:
+        changes = repository.changes(since=since, limit=limit + 1)
+    except ChangesExpired as exc:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Book not found",
+            status_code=status.HTTP_410_GONE, detail=str(exc), headers=dict(response.headers)
+        ) from exc
+    page = changes[:limit]
+    return BookChangesPage(
+        changes=page,
+        next_since=page[-1].seq if page else since,
+        has_more=len(changes) > limit,
+    )
+
+
+@app.get("/books/export", tags=["books"], response_class=StreamingResponse)
+def export_books(
+    repository: RepositoryDep,
+    format: Literal["arrow", "parquet"] = Query("arrow"),
+    compression: Literal["zstd", "lz4", "none"] = Query("zstd"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=100, le=100_000),
+) -> StreamingResponse:
+    """Whole catalogue as an Arrow IPC stream or Parquet file, streamed batch by batch."""
+    try:
+        chunks = stream_export(
+            repository.iter_batches(EXPORT_COLUMNS, batch_size=batch_size),
+            format,
+            compression=compression,
         )
-    return book
+        first = next(chunks)
+    except ExportUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc)) from exc
 
+    def body():
+        yield first
+        yield from chunks
 
-@app.delete(
-    "/books/{book_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
-    tags=["books"],
-)
-def delete_book(book_id: int, repository: RepositoryDep) -> None:
-    """Delete a book by ID."""
-    if repository.get(book_id) is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Book not found",
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{EXTENSIONS[format]}"'},
+    )
+
+
+@app.get("/books/analytics", response_model=BookAnalytics, tags=["books"])
+def book_analytics(
+    repository: RepositoryDep,
+    settings: SettingsDep,
+    year_from: int | None = Query(None),
+    year_to: int | None = Query(None),
+    genre: str | None = Query(None, description="Exact genre (case-insensitive)"),
+    author: str | None = Query(None, description="Exact author (case-insensitive)"),
+    title: str | None = Query(None, description="Substring of the title"),
+    group_by: Literal["genre", "author", "year"] | None = Query(None),
+    top: int | None = Query(None, ge=1),
+) -> BookAnalytics:
+    """Counts over a columnar in-memory snapshot, optionally grouped."""
+    try:
+        total, groups = analytics_query(
+            repository,
+            max_lag=settings.search_index_max_lag,
+            year_from=year_from,
+            year_to=year_to,
+            genre=genre,
+            author=author,
+            title=title,
+            group_by=group_by,
+            top=top,
         )
-    repository.delete(book_id)
-    logger.info("book.deleted id=%s", book_id)
+    except AnalyticsUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc)) from exc
+    return BookAnalytics(total=total, group_by=group_by, groups=groups)
+
+
+@app.get("/books/suggest", response_model=list[Suggestion], tags=["books"])
+def suggest_books(
+    repository: RepositoryDep,
+    settings: SettingsDep,
+    prefix: str = Query(..., min_length=1, max_length=200),
+    field: Literal["title", "author"] = Query("title"),
+    limit: int = Query(10, ge=1, le=50),
+) -> list[Suggestion]:
+    """Autocomplete: most common titles or authors starting with `prefix`."""
+    matches = suggest(repository, field, prefix, limit=limit, max_lag=settings.search_index_max_lag)
+    return [Suggestion(value=value, count=count) for value, count in matches]
+
 
 @app.get("/books/search", response_model=list[Book], tags=["books"])
 def search_books(
     repository: RepositoryDep,
+    settings: SettingsDep,
+    response: Response,
     title: str | None = Query(None),
     author: str | None = Query(None),
     year: int | None = Query(None),
     genre: str | None = Query(None),
+    year_from: int | None = Query(None, description="Earliest year, inclusive"),
+    year_to: int | None = Query(None, description="Latest year, inclusive"),
+    fuzzy: bool = Query(False, description="Tolerate typos in title/author (in-memory index)"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Maximum fuzzy matches, best first"),
+    count: CountMode = Query("none", description="Plain search only: X-Total-Count with the number of matches"),
 ) -> list[Book]:
     """
     Search books by optional filters.
     """
-    return list(
+    if fuzzy:
+        if not (title or author):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Fuzzy search needs a title or author",
+            )
+        return fuzzy_search(
+            repository,
+            title=title,
+            author=author,
+            year=year,
+            genre=genre,
+            year_from=year_from,
+            year_to=year_to,
+            limit=limit,
+            max_lag=settings.search_index_max_lag,
+        )
+    books = list(
         repository.search(
             title=title,
             author=author,
             year=year,
             genre=genre,
+            year_from=year_from,
+            year_to=year_to,
         )
     )
+    if count != "none":
+        # Plain search is not paginated, so the total is simply what was found.
+        response.headers["X-Total-Count"] = str(len(books))
+    return books
+
+
+@app.get("/books/{book_id}", response_model=Book, tags=["books"])
+def read_book(book_id: int, repository: RepositoryDep) -> Book:
+    """Get a specific book by ID."""
+    book = repository.get(book_id)
+    if book is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    return book
 
 
+@app.put("/books/{book_id}", response_model=Book, tags=["books"])
+def update_book(
+    book_id: int,
+    payload: BookCreate,
+    repository: RepositoryDep,
+    token: dict = Depends(require_role("editor")),
+) -> Book:
+    """Replace a book's fields."""
+    book = repository.update(book_id, payload)
+    if book is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    logger.info("book.updated id=%s", book_id)
+    return book
+
 
+@app.delete(
+    "/books/{book_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["books"],
+)
+def delete_book(book_id: int, repository: RepositoryDep) -> None:
+    """Delete a book by ID."""
+    if repository.get(book_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    repository.delete(book_id)
+    logger.info("book.deleted id=%s", book_id)
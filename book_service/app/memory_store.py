@@ -0,0 +1,451 @@
+# book_service/app/memory_store.py
+"""
+Durable memory mode: the in-memory repository backed by files in
+BOOK_MEMORY_DATA_DIR.
+
+- `books.snap` is a binary snapshot of the whole catalogue: fixed-width
+  columns (ids, years, author/genre codes, text lengths), the text as
+  NUL-joined UTF-8 blobs, and the stats counters as JSON. It is read through mmap and turned into
+  records in bulk, so a warm start costs a few C-level passes instead of
+  one Python call per book.
+- Every write is appended to a write-ahead log segment (`wal-N.log`) as
+  a CRC-checked frame before the call returns (a `create_many` batch is
+  one frame). On boot the segments are replayed on top of the snapshot;
+  a torn frame at the tail is dropped.
+- A background thread periodically writes a fresh snapshot from a
+  shallow copy of the catalogue (records are immutable) and deletes the
+  log segments it covers. Writers only wait for the segment rotation.
+
+The change feed keeps the newest `retain_changes` entries; older ones are
+trimmed after each snapshot, and a restart keeps only those written after
+the snapshot. `changes(since=...)` older than that raises ChangesExpired
+(410 from /books/changes) instead of silently skipping deletes and updates.
+"""
+
+import fcntl
+import gc
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from functools import partial
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from .models import Book, BookCreate
+from .repository import BookRecord, BookRepository
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = "books.snap"
+LOCK = "LOCK"
+_MAGIC = b"BOOKSNP1"
+# magic, little-endian flag, books, next id, seq, distinct author/genre strings
+_HEADER = struct.Struct("<8sBxxxxxxxqqqq")
+# payload length, crc32 of the payload
+_FRAME = struct.Struct("<II")
+# seq, book id, op, year, utf-8 lengths of title / author / description / genre
+_ENTRY = struct.Struct("<qqBhIIII")
+_OPS = ("create", "update", "delete", "clear")
+_SEP = "\x00"
+_new_record = partial(tuple.__new__, BookRecord)
+
+
+class StoreError(RuntimeError):
+    """The data directory is unusable (corrupt snapshot, or open in another process)."""
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+def _texts(blob: memoryview, lengths: memoryview) -> list[str]:
+    text = str(blob, "utf-8")
+    parts = text.split(_SEP)
+    if len(parts) == len(lengths):
+        return parts
+    # Some value contains NUL itself: cut by the stored lengths instead.
+    parts, start = [], 0
+    for length in lengths.tolist():
+        parts.append(text[start : start + length])
+        start += length + 1
+    return parts
+
+
+def write_snapshot(path: Path, items: dict, stats: dict, *, next_id: int, seq: int) -> None:
+    """Write `items` (book id -> BookRecord) and their stats counters atomically to `path`."""
+    strings: dict[str, int] = {}
+    ids, years, authors, genres = array("q"), array("h"), array("i"), array("i")
+    title_lengths, description_lengths = array("q"), array("q")
+    titles, descriptions = [], []
+    for book_id, record in items.items():
+        ids.append(book_id)
+        years.append(record.year)
+        authors.append(strings.setdefault(record.author, len(strings)))
+        genres.append(strings.setdefault(record.genre, len(strings)))
+        titles.append(record.title)
+        title_lengths.append(len(record.title))
+        descriptions.append(record.description)
+        description_lengths.append(len(record.description))
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, sys.byteorder == "little", len(ids), next_id, seq, len(strings)))
+        for column in (ids, title_lengths, description_lengths, authors, genres, years):
+            f.write(column.tobytes())
+        counters = json.dumps({dimension: list(counter.items()) for dimension, counter in stats.items()})
+        for blob in (_SEP.join(strings), _SEP.join(titles), _SEP.join(descriptions), counters):
+            data = blob.encode()
+            f.write(struct.pack("<q", len(data)))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: Path) -> tuple[dict, dict, int, int]:
+    """Load a snapshot: (book id -> BookRecord, stats counters, next id, seq)."""
+    with open(path, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            magic, little, count, next_id, seq, n_strings = _HEADER.unpack_from(view)
+            if magic != _MAGIC or little != (sys.byteorder == "little"):
+                raise StoreError(f"{path} is not a snapshot written on this platform")
+            offset = _HEADER.size
+
+            def column(code: str, size: int) -> memoryview:
+                nonlocal offset
+                offset += count * size
+                return view[offset - count * size : offset].cast(code)
+
+            def blob() -> memoryview:
+                nonlocal offset
+                (length,) = struct.unpack_from("<q", view, offset)
+                offset += 8 + length
+                return view[offset - length : offset]
+
+            ids = column("q", 8).tolist()
+            title_lengths = column("q", 8)
+            description_lengths = column("q", 8)
+            author_codes = column("i", 4).tolist()
+            genre_codes = column("i", 4).tolist()
+            years = column("h", 2).tolist()
+            strings = [sys.intern(value) for value in str(blob(), "utf-8").split(_SEP)][:n_strings]
+            titles = _texts(blob(), title_lengths)
+            descriptions = _texts(blob(), description_lengths)
+            title_lengths.release()
+            description_lengths.release()
+            stats = {
+                dimension: Counter(dict(map(tuple, pairs)))
+                for dimension, pairs in json.loads(str(blob(), "utf-8")).items()
+            }
+        finally:
+            view.release()
+
+    authors = map(strings.__getitem__, author_codes)
+    genres = map(strings.__getitem__, genre_codes)
+    # A million small tuples would trigger several full collections.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        records = map(_new_record, zip(titles, authors, descriptions, years, genres))
+        return dict(zip(ids, records)), stats, next_id, seq
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+# ---------------------------------------------------------------------------
+# Write-ahead log
+# ---------------------------------------------------------------------------
+def _entry(seq: int, op: str, book_id: int, record: Optional[BookRecord]) -> bytes:
+    if record is None:
+        return _ENTRY.pack(seq, book_id, _OPS.index(op), 0, 0, 0, 0, 0)
+    texts = [value.encode() for value in (record.title, record.author, record.description, record.genre)]
+    return _ENTRY.pack(seq, book_id, _OPS.index(op), record.year, *map(len, texts)) + b"".join(texts)
+
+
+def encode_entry(seq: int, op: str, book_id: int, record: Optional[BookRecord]) -> bytes:
+    return encode_entries([(seq, op, book_id, record)])
+
+
+def encode_entries(entries: list[tuple]) -> bytes:
+    """One frame holding `entries` back to back: replayed together, or (torn) not at all."""
+    payload = b"".join(_entry(*entry) for entry in entries)
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_entries(path: Path) -> tuple[list[tuple], int]:
+    """Valid (seq, op, book_id, record) entries of a segment, and the byte length they cover."""
+    data = path.read_bytes()
+    entries, offset = [], 0
+    while offset + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, offset)
+        payload = data[offset + _FRAME.size : offset + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break  # torn write at the tail
+        start = 0
+        while start < length:
+            seq, book_id, op, year, *lengths = _ENTRY.unpack_from(payload, start)
+            start += _ENTRY.size
+            record = None
+            if _OPS[op] in ("create", "update"):
+                texts = []
+                for size in lengths:
+                    texts.append(payload[start : start + size].decode())
+                    start += size
+                title, author, description, genre = texts
+                record = BookRecord(title, sys.intern(author), description, year, sys.intern(genre))
+            entries.append((seq, _OPS[op], book_id, record))
+        offset += _FRAME.size + length
+    return entries, offset
+
+
+def _segments(directory: Path) -> list[tuple[int, Path]]:
+    found = []
+    for path in directory.glob("wal-*.log"):
+        try:
+            found.append((int(path.stem[4:]), path))
+        except ValueError:
+            continue
+    return sorted(found)
+
+
+# ---------------------------------------------------------------------------
+# Repository
+# ---------------------------------------------------------------------------
+class DurableBookRepository(BookRepository):
+    """
+    In-memory repository whose writes survive restarts.
+
+    With `readonly=True` the files are only read (e.g. to export from a
+    CLI while the API owns the directory); writes then raise StoreError.
+    """
+
+    def __init__(
+        self,
+        data_dir: str | os.PathLike,
+        *,
+        fsync: bool = False,
+        readonly: bool = False,
+        retain_changes: int = 1_000_000,
+    ) -> None:
+        super().__init__()
+        self.directory = Path(data_dir)
+        self.fsync = fsync
+        self.readonly = readonly
+        self.retain_changes = retain_changes
+        self._log: Optional[BinaryIO] = None
+        self._segment = 0
+        self._unsnapshotted = 0
+        self._lock_file = None
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.snapshots = 0
+        self.last_snapshot_seconds = 0.0
+
+        if not readonly:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.directory / LOCK, "a")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as exc:
+                self._lock_file.close()
+                raise StoreError(f"{self.directory} is in use by another process") from exc
+        started = time.perf_counter()
+        self._recover()
+        self.load_seconds = time.perf_counter() - started
+        logger.info(
+            "memory_store.loaded books=%s seq=%s seconds=%.3f", len(self), self.latest_seq(), self.load_seconds
+        )
+
+    # ---- recovery -------------------------------------------------------
+    def _recover(self) -> None:
+        snapshot = self.directory / SNAPSHOT
+        if snapshot.exists():
+            self._items, stats, self._next_id, self._seq_base = read_snapshot(snapshot)
+            self._stats.update(stats)
+        segments = _segments(self.directory)
+        for number, path in segments:
+            entries, valid = read_entries(path)
+            for entry in entries:
+                self._replay(*entry)
+            self._unsnapshotted += len(entries)
+            self._segment = number
+            if self.readonly:
+                continue
+            if not entries:
+                path.unlink()
+            elif valid < path.stat().st_size:
+                logger.warning("memory_store.truncated_log path=%s bytes=%s", path, path.stat().st_size - valid)
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+        if not self.readonly:
+            self._segment += 1
+            self._log = open(self.directory / f"wal-{self._segment:08d}.log", "ab")
+
+    def _replay(self, seq: int, op: str, book_id: int, record: Optional[BookRecord]) -> None:
+        latest = self.latest_seq()
+        if op == "clear":
+            if seq >= latest:
+                self._items.clear()
+                for counter in self._stats.values():
+                    counter.clear()
+                self._next_id = 1
+            return
+        if seq <= latest:
+            return  # already in the snapshot
+        current = self._items.get(book_id)
+        if current is not None:
+            self._count(current, -1)
+        if record is None:
+            self._items.pop(book_id, None)
+        else:
+            self._items[book_id] = record  # an update keeps its place in ID order
+            self._count(record, +1)
+            self._next_id = max(self._next_id, book_id + 1)
+        self._changes.append((book_id, op, record))
+
+    # ---- logging writes -------------------------------------------------
+    def _check_writable(self) -> None:
+        if self._log is None:
+            raise StoreError("memory store is read-only" if self.readonly else "memory store is closed")
+
+    def _write(self, frame: bytes, entries: int) -> None:
+        self._log.write(frame)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._unsnapshotted += entries
+
+    def _append(self, seq: int, op: str, book_id: int, record: Optional[BookRecord]) -> None:
+        self._write(encode_entry(seq, op, book_id, record), 1)
+
+    def _record_change(self, op: str, book_id: int, record: BookRecord) -> None:
+        self._append(self.latest_seq() + 1, op, book_id, None if op == "delete" else record)
+        super()._record_change(op, book_id, record)
+
+    def _record_creates(self, first_id: int, records: list[BookRecord]) -> None:
+        seq = self.latest_seq()
+        entries = [(seq + i, "create", first_id + i - 1, record) for i, record in enumerate(records, 1)]
+        self._write(encode_entries(entries), len(entries))
+        super()._record_creates(first_id, records)
+
+    # Writes hold the store lock (the base class's, which its reads take
+    # too) so log order matches apply order and a snapshot never sees half
+    # of a write.
+    def create(self, payload: BookCreate) -> Book:
+        with self._lock:
+            self._check_writable()
+            return super().create(payload)
+
+    def create_many(self, payloads: list[BookCreate]) -> list[Book]:
+        with self._lock:
+            self._check_writable()
+            return super().create_many(payloads)
+
+    def update(self, book_id: int, payload: BookCreate) -> Optional[Book]:
+        with self._lock:
+            self._check_writable()
+            return super().update(book_id, payload)
+
+    def delete(self, book_id: int) -> bool:
+        with self._lock:
+            self._check_writable()
+            return super().delete(book_id)
+
+    def delete_all(self) -> int:
+        with self._lock:
+            self._check_writable()
+            count = super().delete_all()
+            self._append(self.latest_seq(), "clear", 0, None)
+            return count
+
+    # ---- snapshots ------------------------------------------------------
+    def snapshot(self) -> bool:
+        """Write a snapshot and drop the log segments it covers; False if nothing changed."""
+        if self.readonly:
+            raise StoreError("memory store is read-only")
+        with self._lock:
+            if not self._unsnapshotted:
+                return False
+            items = dict(self._items)
+            stats = {dimension: counter.copy() for dimension, counter in self._stats.items()}
+            next_id, seq = self._next_id, self.latest_seq()
+            covered = self._segment
+            self._log.close()
+            self._segment += 1
+            self._log = open(self.directory / f"wal-{self._segment:08d}.log", "ab")
+            self._unsnapshotted = 0
+            excess = len(self._changes) - self.retain_changes
+            if excess > 0:
+                del self._changes[:excess]
+                self._seq_base += excess
+        started = time.perf_counter()
+        try:
+            write_snapshot(self.directory / SNAPSHOT, items, stats, next_id=next_id, seq=seq)
+        except Exception:
+            with self._lock:
+                self._unsnapshotted += 1  # retry next round; the old segments are still there
+            raise
+        for number, path in _segments(self.directory):
+            if number <= covered:
+                path.unlink(missing_ok=True)
+        self.snapshots += 1
+        self.last_snapshot_seconds = time.perf_counter() - started
+        logger.info("memory_store.snapshot books=%s seq=%s seconds=%.3f", len(items), seq, self.last_snapshot_seconds)
+        return True
+
+    def start_compaction(self, interval: float) -> None:
+        """Snapshot every `interval` seconds in a daemon thread."""
+        if self.readonly or self._compactor is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.snapshot()
+                except Exception:
+                    logger.exception("memory_store.snapshot_failed")
+
+        self._compactor = threading.Thread(target=run, name="memory-store-compaction", daemon=True)
+        self._compactor.start()
+
+    def close(self) -> None:
+        """Stop compaction, write a final snapshot and release the directory."""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        if self.readonly:
+            return
+        try:
+            self.snapshot()
+        finally:
+            with self._lock:
+                if self._log is not None:
+                    self._log.close()
+                    path = Path(self._log.name)
+                    if not path.stat().st_size:
+                        path.unlink()
+                    self._log = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def metrics(self) -> dict:
+        return {
+            "books": len(self),
+            "seq": self.latest_seq(),
+            "oldest_seq": self._seq_base,
+            "load_seconds": round(self.load_seconds, 4),
+            "unsnapshotted_writes": self._unsnapshotted,
+            "snapshots": self.snapshots,
+            "last_snapshot_seconds": round(self.last_snapshot_seconds, 4),
+        }
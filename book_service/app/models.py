@@ -1,9 +1,12 @@
 # filepath: book_service/app/models.py
 from __future__ import annotations
+from datetime import datetime, timezone
+
 from pydantic import model_validator
+from sqlalchemy import JSON, Column
 from sqlmodel import SQLModel, Field 
 
-from typing import Optional
+from typing import Any, Optional
 
 
 class BookBase(SQLModel):
@@ -46,6 +49,95 @@ class BookCreate(BookBase):
         return self
 
 
+class BookStat(SQLModel, table=True):
+    """Precomputed catalogue aggregate: number of books per (dimension, key).
+
+    Maintained in the same transaction as every write, so reading stats costs
+    O(number of groups) instead of a scan over all books. The catalogue total
+    is stored under dimension "total" with an empty key.
+    """
+
+    __tablename__ = "book_stats"
+
+    dimension: str = Field(primary_key=True, max_length=16)
+    key: str = Field(primary_key=True, max_length=200)
+    count: int = 0
+
+
+class LeaseFence(SQLModel, table=True):
+    """Highest fencing number that has written under a lease key.
+
+    A write guarded by a lease claims this row in its own transaction and
+    is rejected when a later holder (higher fence) already wrote, so a
+    worker whose lease expired mid-work cannot overwrite its successor.
+    """
+
+    __tablename__ = "lease_fences"
+
+    key: str = Field(primary_key=True, max_length=200)
+    fence: int
+
+
+class BookStats(SQLModel):
+    """Response model for GET /books/stats."""
+
+    total: int
+    genre: dict[str, int]
+    author: dict[str, int]
+    year: dict[int, int]
+
+
+STAT_DIMENSIONS = ("genre", "author", "year")
+
+
+class BookAnalytics(SQLModel):
+    """Response model for GET /books/analytics."""
+
+    total: int
+    group_by: Optional[str] = None
+    groups: dict[str, int] = {}
+
+
+class Suggestion(SQLModel):
+    """One autocomplete entry from GET /books/suggest."""
+
+    value: str
+    count: int  # books carrying this exact value
+
+
+class BookChange(SQLModel, table=True):
+    """Outbox row describing one write to the catalogue.
+
+    Written in the same transaction as the change itself; `seq` is strictly
+    increasing, so consumers can mirror the catalogue by replaying changes
+    after the last sequence number they applied.
+    """
+
+    __tablename__ = "book_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    book_id: int = Field(index=True)
+    op: str = Field(max_length=8)  # create | update | delete
+    book: Optional[dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class BookChangesPage(SQLModel):
+    """Response model for GET /books/changes."""
+
+    changes: list[BookChange]
+    next_since: int
+    has_more: bool
+
+
+class BookBatch(SQLModel):
+    """Response model for POST /books/batch-get."""
+
+    books: list[Book]  # found books, in request order
+    missing: list[int]  # requested ids that do not exist
+
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(index=True, unique=True)
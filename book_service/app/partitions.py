@@ -0,0 +1,180 @@
+# book_service/app/partitions.py
+"""
+Range partitioning of the Postgres `books` table by `year`.
+
+Layout: `books` becomes `PARTITION BY RANGE (year)` with one partition per
+`span` years (`books_y1990` holds 1990-1999) covering the whole range the
+API accepts, plus `books_y_default` for anything written around the
+validation. The primary key becomes (id, year) because Postgres requires
+the partition key in every unique index; ids still come from the one
+`books_id_seq`, so they stay unique.
+
+The conversion runs in three steps so it can happen while the service
+takes writes (see scripts/partition_books.py):
+
+1. `create_shadow`: an empty partitioned copy, `books_by_year`.
+2. `install_mirror` + `copy_batch`: a trigger replays every write on
+   `books` into the copy while existing rows are moved in id batches.
+3. `swap`: under a short ACCESS EXCLUSIVE lock the tables trade names.
+
+The alembic migration runs all three in one transaction, which is fine
+for small tables. Everything here is Postgres only.
+"""
+
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Keep in step with the `year` bounds on BookBase.
+YEAR_MIN = 1900
+YEAR_MAX = 2100
+DEFAULT_SPAN = 10
+
+SHADOW = "books_by_year"
+RETIRED = "books_unpartitioned"
+_MIRROR_TRIGGER = "books_mirror_to_partitioned"
+
+
+def partition_ranges(span: int = DEFAULT_SPAN, first: int = YEAR_MIN, last: int = YEAR_MAX) -> list[tuple[str, int, int]]:
+    """(name, from, to) for every partition covering `first`..`last`; `to` is exclusive."""
+    start = first - first % span
+    return [(f"books_y{lo}", lo, lo + span) for lo in range(start, last + 1, span)]
+
+
+def is_partitioned(connection: Connection, table: str = "books") -> bool:
+    return bool(
+        connection.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def table_exists(connection: Connection, table: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar() is not None
+
+
+def ensure_partitions(connection: Connection, table: str = "books", span: int = DEFAULT_SPAN) -> int:
+    """Create any missing year partitions (and the default one) of `table`; returns how many were added."""
+    existing = set(
+        connection.execute(
+            text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"),
+            {"table": table},
+        ).scalars()
+    )
+    added = 0
+    for name, lo, hi in partition_ranges(span):
+        if name not in existing:
+            connection.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ({lo}) TO ({hi})"))
+            added += 1
+    if "books_y_default" not in existing:
+        connection.execute(text(f"CREATE TABLE books_y_default PARTITION OF {table} DEFAULT"))
+        added += 1
+    return added
+
+
+def create_shadow(connection: Connection, span: int = DEFAULT_SPAN) -> None:
+    """Create the empty partitioned copy of `books` (same columns and id default)."""
+    if not table_exists(connection, SHADOW):
+        connection.execute(
+            text(
+                f"CREATE TABLE {SHADOW} (LIKE books INCLUDING DEFAULTS, "
+                f"CONSTRAINT {SHADOW}_pkey PRIMARY KEY (id, year)) PARTITION BY RANGE (year)"
+            )
+        )
+    ensure_partitions(connection, SHADOW, span)
+
+
+def install_mirror(connection: Connection) -> None:
+    """Replay every write on `books` into the shadow table, inside the writer's transaction."""
+    connection.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION {_MIRROR_TRIGGER}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {SHADOW} WHERE id = OLD.id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {SHADOW} SELECT NEW.*;
+                END IF;
+                RETURN NULL;
+            END $$
+            """
+        )
+    )
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {_MIRROR_TRIGGER} ON books"))
+    connection.execute(
+        text(
+            f"CREATE TRIGGER {_MIRROR_TRIGGER} AFTER INSERT OR UPDATE OR DELETE ON books "
+            f"FOR EACH ROW EXECUTE FUNCTION {_MIRROR_TRIGGER}()"
+        )
+    )
+
+
+def copy_batch(connection: Connection, after_id: int, batch_size: int) -> Optional[int]:
+    """
+    Copy the next `batch_size` ids after `after_id` into the shadow table and
+    return the last id copied (None when done). Rows are share-locked for the
+    batch so a concurrent update either lands before the copy (and is copied)
+    or after it (and is replayed by the mirror trigger).
+    """
+    upto = connection.execute(
+        text("SELECT max(id) FROM (SELECT id FROM books WHERE id > :after ORDER BY id LIMIT :n) AS page"),
+        {"after": after_id, "n": batch_size},
+    ).scalar()
+    if upto is None:
+        return None
+    params = {"after": after_id, "upto": upto}
+    connection.execute(text("SELECT id FROM books WHERE id > :after AND id <= :upto FOR SHARE"), params)
+    connection.execute(
+        text(f"INSERT INTO {SHADOW} SELECT * FROM books WHERE id > :after AND id <= :upto ON CONFLICT DO NOTHING"),
+        params,
+    )
+    return upto
+
+
+def swap(connection: Connection) -> None:
+    """
+    Make the shadow table `books`; the old one is kept as `books_unpartitioned`.
+    Run in its own short transaction once `copy_batch` is done.
+
+    Row counts are compared before the lock is taken (a full scan of both
+    tables); from then on the mirror trigger keeps the copy in step, so under
+    the lock only the highest ids are compared, which reads one index entry
+    per partition.
+    """
+    counts = connection.execute(text(f"SELECT (SELECT count(*) FROM books), (SELECT count(*) FROM {SHADOW})")).one()
+    if counts[0] != counts[1]:
+        raise RuntimeError(f"books has {counts[0]} rows but {SHADOW} has {counts[1]}; copy not finished")
+    connection.execute(text("LOCK TABLE books IN ACCESS EXCLUSIVE MODE"))
+    last = connection.execute(text(f"SELECT (SELECT max(id) FROM books), (SELECT max(id) FROM {SHADOW})")).one()
+    if last[0] != last[1]:
+        raise RuntimeError(f"books ends at id {last[0]} but {SHADOW} at {last[1]}; is the mirror trigger installed?")
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {_MIRROR_TRIGGER} ON books"))
+    connection.execute(text(f"DROP FUNCTION IF EXISTS {_MIRROR_TRIGGER}()"))
+    # The sequence is owned by books.id; detach it so dropping the old table later keeps it.
+    connection.execute(text("ALTER SEQUENCE books_id_seq OWNED BY NONE"))
+    _rename(connection, "books", RETIRED)
+    _rename(connection, SHADOW, "books")
+    connection.execute(text("ALTER SEQUENCE books_id_seq OWNED BY books.id"))
+    connection.execute(text("ANALYZE books"))
+
+
+def unpartition(connection: Connection) -> None:
+    """Replace a partitioned `books` with a plain table again (offline; used by the downgrade)."""
+    connection.execute(text("LOCK TABLE books IN ACCESS EXCLUSIVE MODE"))
+    connection.execute(
+        text(f"CREATE TABLE {RETIRED}_tmp (LIKE books INCLUDING DEFAULTS, CONSTRAINT {RETIRED}_tmp_pkey PRIMARY KEY (id))")
+    )
+    connection.execute(text(f"INSERT INTO {RETIRED}_tmp SELECT * FROM books"))
+    connection.execute(text("ALTER SEQUENCE books_id_seq OWNED BY NONE"))
+    connection.execute(text("DROP TABLE books"))  # drops its partitions too
+    _rename(connection, f"{RETIRED}_tmp", "books")
+    connection.execute(text("ALTER SEQUENCE books_id_seq OWNED BY books.id"))
+
+
+def _rename(connection: Connection, old: str, new: str) -> None:
+    connection.execute(text(f"ALTER TABLE {old} RENAME TO {new}"))
+    connection.execute(text(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey"))
@@ -0,0 +1,155 @@
+# book_service/app/profiling.py
+"""
+On-demand request profiling.
+
+A profiled request runs while a sampler thread snapshots the stacks of
+busy threads (`sys._current_frames`) every BOOK_PROFILE_INTERVAL_MS. That
+covers both the event loop and the threadpool worker running a sync
+endpoint, which cProfile (per-thread) would miss. Samples are saved as
+folded stacks, `<trace_id>.folded`: one "frame;frame;frame count" line
+per distinct stack, the input format of flamegraph.pl, speedscope and
+most flame graph viewers.
+
+Idle threads (blocked in threading/queue/selectors) are skipped. Other
+requests running at the same moment in the same process do show up, so
+profile on a quiet replica when the picture matters.
+
+Unprofiled requests pay one settings check (and one random() when a
+sample rate is set).
+"""
+
+import json
+import queue
+import re
+import selectors
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import jwt
+
+from .config import Settings
+
+PROFILE_ROLE = "admin"
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+_IDLE_FILES = frozenset({threading.__file__, queue.__file__, selectors.__file__})
+
+
+def _label(code) -> str:
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples every busy thread's stack on a background thread between start() and stop()."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _sample(self, own_id: int) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or frame.f_code.co_filename in _IDLE_FILES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+
+    def start(self) -> "StackSampler":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self.duration = time.perf_counter() - self.started
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Profiles on disk, newest `keep` retained."""
+
+    def __init__(self, directory: str, keep: int) -> None:
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, name: str, sampler: StackSampler, meta: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            (self.directory / f"{name}.folded").write_text(sampler.folded())
+            meta = {**meta, "samples": sampler.samples, "duration_ms": round(sampler.duration * 1000, 2)}
+            (self.directory / f"{name}.json").write_text(json.dumps(meta))
+            for old in self._entries()[self.keep :]:
+                old.unlink(missing_ok=True)
+                old.with_suffix(".json").unlink(missing_ok=True)
+
+    def _entries(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def list(self) -> list[dict]:
+        found = []
+        for path in self._entries():
+            try:
+                meta = json.loads(path.with_suffix(".json").read_text())
+            except (OSError, ValueError):
+                meta = {}
+            found.append({"trace_id": path.stem, **meta})
+        return found
+
+    def path(self, name: str) -> Optional[Path]:
+        if not _SAFE_NAME.match(name):
+            return None
+        path = self.directory / f"{name}.folded"
+        return path if path.is_file() else None
+
+
+def safe_name(trace_id: str) -> Optional[str]:
+    """The trace id if it is usable as a file name (it may come from the client)."""
+    return trace_id if _SAFE_NAME.match(trace_id) else None
+
+
+def admin_opt_in(header: Optional[str], authorization: str, settings: Settings) -> bool:
+    """An opt-in header (`X-Profile: 1`, `X-Server-Timing: 1`) counts only with a valid bearer token carrying the admin role."""
+    if header != "1" or not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        claims = jwt.decode(
+            authorization[7:],
+            settings.jwt_secret,
+            algorithms=["HS256"],
+            audience=settings.jwt_audience,
+            issuer=settings.jwt_issuer,
+        )
+    except jwt.PyJWTError:
+        return False
+    return PROFILE_ROLE in claims.get("roles", [])
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_profile_store(settings: Settings) -> ProfileStore:
+    global _store
+    if _store is None or _store.directory != Path(settings.profile_dir):
+        _store = ProfileStore(settings.profile_dir, settings.profile_keep)
+    return _store
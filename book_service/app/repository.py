@@ -1,57 +1,317 @@
 # filepath: book_service/app/repository.py
 
-from typing import Optional, Dict
-from .models import Book, BookCreate
+import sys
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Iterator, NamedTuple, Optional, Dict, List, Sequence
+from .models import STAT_DIMENSIONS, Book, BookChange, BookCreate, BookStats
+from .feed_index import ChangesExpired, mark_stale
+
+class BookRecord(NamedTuple):
+    """
+    Compact, immutable row of the in-memory store.
+
+    A `Book` instance carries Pydantic and SQLAlchemy state (several KB
+    each); a record is a five-slot tuple. `author` and `genre` repeat
+    across the catalogue, so they are interned and shared. Records are
+    never mutated (updates store a new one), which lets the change log
+    point at them instead of keeping its own copies.
+    """
+
+    title: str
+    author: str
+    description: str
+    year: int
+    genre: str
+
+    @classmethod
+    def from_payload(cls, payload: BookCreate) -> "BookRecord":
+        return cls(
+            payload.title,
+            sys.intern(payload.author),
+            payload.description,
+            payload.year,
+            sys.intern(payload.genre),
+        )
+
+    def to_book(self, book_id: int) -> Book:
+        return Book(
+            id=book_id,
+            title=self.title,
+            author=self.author,
+            description=self.description,
+            year=self.year,
+            genre=self.genre,
+        )
+
+    def to_dict(self, book_id: int) -> dict:
+        return {
+            "title": self.title,
+            "author": self.author,
+            "description": self.description,
+            "year": self.year,
+            "genre": self.genre,
+            "id": book_id,
+        }
+
 
 class BookRepository:
     """
     In-memory storage for books.
     This implementation does NOT require a database session.
     Used when BOOK_DB_MODE="memory".
+
+    Rows are kept as compact `BookRecord`s keyed by ID (in ascending ID
+    order, since IDs are handed out incrementally and updates keep their
+    slot); `Book` objects are only built for the books a call returns.
+
+    One instance serves every threadpool request, so `_lock` covers id
+    allocation, `_items`, the stats and the change log. Scans copy what
+    they need under the lock and do the rest outside it.
     """
 
     def __init__(self) -> None:
         """Initializes the repository with an empty dictionary."""
-        self._items: Dict[int, Book] = {}
+        self._items: Dict[int, BookRecord] = {}
         self._next_id = 1
+        self._stats: Dict[str, Counter] = {d: Counter() for d in STAT_DIMENSIONS}
+        # (book_id, op, record or None); the seq of entry i is _seq_base + i + 1
+        self._changes: List[tuple] = []
+        self._seq_base = 0
+        self._lock = threading.RLock()
+
+    def _record_change(self, op: str, book_id: int, record: BookRecord) -> None:
+        self._changes.append((book_id, op, None if op == "delete" else record))
+        mark_stale(self)
+
+    def _record_creates(self, first_id: int, records: List[BookRecord]) -> None:
+        self._changes.extend((book_id, "create", record) for book_id, record in enumerate(records, first_id))
+        mark_stale(self)
 
-    def list(self, *, skip: int = 0, limit: int = 100) -> list[Book]:
+    def _count(self, record: BookRecord, sign: int) -> None:
+        for dimension in STAT_DIMENSIONS:
+            counter = self._stats[dimension]
+            key = getattr(record, dimension)
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def count(self, *, estimated: bool = False) -> int:
+        """
+        Number of books; always exact, since the dict keeps it.
+        """
+        return len(self._items)
+
+    def list(
+        self, *, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> list[Book]:
         """
         Get all books with pagination support.
+        `after_id` enables keyset pagination: only books with a larger ID are returned.
         """
-        all_books = list(self._items.values())
-        return all_books[skip : skip + limit]
+        with self._lock:
+            if after_id is None:
+                page = list(islice(self._items.items(), skip, skip + limit))
+            else:
+                # IDs are dense and ascending, so walk them from the cursor
+                # instead of scanning every book before it.
+                items = self._items
+                page = list(
+                    islice(
+                        ((book_id, items[book_id]) for book_id in range(max(after_id, 0) + 1, self._next_id) if book_id in items),
+                        skip,
+                        skip + limit,
+                    )
+                )
+        return [record.to_book(book_id) for book_id, record in page]
 
     def create(self, payload: BookCreate) -> Book:
         """
         Add a new book to the dictionary and return it with an assigned ID.
         """
-        book = Book(id=self._next_id, **payload.model_dump())
-        self._items[book.id] = book
-        self._next_id += 1
-        return book
+        record = BookRecord.from_payload(payload)
+        with self._lock:
+            book_id = self._next_id
+            self._next_id += 1
+            self._items[book_id] = record
+            self._count(record, +1)
+            self._record_change("create", book_id, record)
+        return record.to_book(book_id)
+
+    def create_many(self, payloads: List[BookCreate]) -> List[Book]:
+        """
+        Add several books at once, preserving input order. All or nothing:
+        the books get consecutive IDs and sequence numbers, and no reader
+        sees part of the batch (the bulk importer relies on this).
+        """
+        records = [BookRecord.from_payload(payload) for payload in payloads]
+        with self._lock:
+            first_id = self._next_id
+            self._record_creates(first_id, records)
+            self._next_id += len(records)
+            for book_id, record in enumerate(records, first_id):
+                self._items[book_id] = record
+                self._count(record, +1)
+        return [record.to_book(book_id) for book_id, record in enumerate(records, first_id)]
 
     def get(self, book_id: int) -> Optional[Book]:
         """
         Get a book by ID, or None if not found.
         """
-        return self._items.get(book_id)
+        record = self._items.get(book_id)
+        return None if record is None else record.to_book(book_id)
+
+    def get_many(self, book_ids: List[int]) -> List[Book]:
+        """
+        Get the books with the given IDs, in that order; unknown IDs are skipped.
+        """
+        with self._lock:
+            rows = [(book_id, self._items.get(book_id)) for book_id in book_ids]
+        return [record.to_book(book_id) for book_id, record in rows if record is not None]
+
+    def search(
+        self,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        year: Optional[int] = None,
+        genre: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> List[Book]:
+        """
+        Case-insensitive substring search, same semantics as the SQL `ilike` filters.
+        """
+        def contains(value: str, needle: Optional[str]) -> bool:
+            return not needle or needle.casefold() in value.casefold()
+
+        with self._lock:
+            rows = list(self._items.items())
+        return [
+            record.to_book(book_id)
+            for book_id, record in rows
+            if contains(record.title, title)
+            and contains(record.author, author)
+            and contains(record.genre, genre)
+            and (not year or record.year == year)
+            and (year_from is None or record.year >= year_from)
+            and (year_to is None or record.year <= year_to)
+        ]
+
+    def update(self, book_id: int, payload: BookCreate) -> Optional[Book]:
+        """
+        Replace the fields of an existing book, or return None if not found.
+        """
+        record = BookRecord.from_payload(payload)
+        with self._lock:
+            current = self._items.get(book_id)
+            if current is None:
+                return None
+            self._count(current, -1)
+            self._items[book_id] = record
+            self._count(record, +1)
+            self._record_change("update", book_id, record)
+        return record.to_book(book_id)
 
     def delete(self, book_id: int) -> bool:
         """
         Remove a book by ID. 
         Returns True if deleted, False if not found.
         """
-        if book_id in self._items:
-            self._items.pop(book_id)
+        with self._lock:
+            record = self._items.pop(book_id, None)
+            if record is None:
+                return False
+            self._count(record, -1)
+            self._record_change("delete", book_id, record)
             return True
-        return False
 
     def delete_all(self) -> int:
         """
         Remove all books. Useful for resetting state between tests.
         """
-        count = len(self._items)
-        self._items.clear()
-        self._next_id = 1
-        return count
\ No newline at end of file
+        with self._lock:
+            rows = list(self._items.items())
+            for book_id, record in rows:
+                self._record_change("delete", book_id, record)
+            self._items.clear()
+            self._next_id = 1
+            for counter in self._stats.values():
+                counter.clear()
+        return len(rows)
+
+    def changes(self, *, since: int = 0, limit: int = 500) -> List[BookChange]:
+        """
+        Changes with a sequence number greater than `since`, oldest first.
+        Raises ChangesExpired if some of them were already trimmed.
+        """
+        with self._lock:
+            if since < self._seq_base:
+                raise ChangesExpired(since, self._seq_base)
+            start = since - self._seq_base
+            seq_base = self._seq_base
+            entries = self._changes[start : start + limit]
+        return [
+            BookChange(
+                seq=seq,
+                book_id=book_id,
+                op=op,
+                book=None if record is None else record.to_dict(book_id),
+            )
+            for seq, (book_id, op, record) in enumerate(entries, seq_base + start + 1)
+        ]
+
+    def iter_batches(
+        self, columns: Sequence[str], *, batch_size: int = 10_000
+    ) -> Iterator[List[tuple]]:
+        """
+        All books in ID order as lists of `columns` tuples, `batch_size` at a time.
+        """
+        with self._lock:
+            items = dict(self._items)  # records are immutable: a shallow copy is a consistent snapshot
+        ids = sorted(items)
+        for start in range(0, len(ids), batch_size):
+            yield [
+                tuple(book_id if name == "id" else getattr(items[book_id], name) for name in columns)
+                for book_id in ids[start : start + batch_size]
+            ]
+
+    def latest_seq(self) -> int:
+        """
+        Sequence number of the newest change (0 when there is none).
+        """
+        with self._lock:
+            return self._seq_base + len(self._changes)
+
+    def stats(self, *, top: Optional[int] = None) -> BookStats:
+        """
+        Catalogue aggregates, maintained incrementally on every write.
+        """
+        with self._lock:
+            total = len(self._items)
+            counts = {dimension: list(counter.items()) for dimension, counter in self._stats.items()}
+
+        def groups(dimension: str) -> dict:
+            ranked = sorted(counts[dimension], key=lambda kv: (-kv[1], str(kv[0])))
+            return dict(ranked[:top] if top else ranked)
+
+        return BookStats(
+            total=total,
+            genre=groups("genre"),
+            author=groups("author"),
+            year=groups("year"),
+        )
+
+    def rebuild_stats(self) -> int:
+        """
+        Recompute the aggregates from scratch. Returns the number of groups.
+        """
+        with self._lock:
+            for counter in self._stats.values():
+                counter.clear()
+            for record in self._items.values():
+                self._count(record, +1)
+            return 1 + sum(len(counter) for counter in self._stats.values())
\ No newline at end of file
@@ -1,8 +1,50 @@
 # book_service/app/repository_db.py
 
-from typing import Optional, Sequence, List
+import logging
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Optional, Sequence, List
+from pydantic import ValidationError
+from sqlalchemy import String, cast, delete as sa_delete, func, insert, literal, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import Session, select
-from .models import Book, BookCreate
+from .models import STAT_DIMENSIONS, Book, BookChange, BookCreate, BookStat, BookStats, LeaseFence
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key guarding change-log sequence allocation
+CHANGE_LOG_LOCK_ID = 0x626F6F6B  # "book"
+
+# Planner-style row estimate for books (and its partitions, if any): the
+# tuple density seen by the last ANALYZE times the table's current size.
+# NULL when some table has never been analyzed.
+_PG_ROW_ESTIMATE = text(
+    """
+    SELECT CASE WHEN bool_and(c.reltuples >= 0) THEN sum(
+        CASE WHEN c.relpages > 0
+             THEN c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+             ELSE c.reltuples END
+    ) END
+    FROM pg_class c
+    WHERE c.relkind = 'r'
+      AND (c.oid = to_regclass('books')
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass('books')))
+    """
+)
+
+
+class StaleFence(RuntimeError):
+    """A write carried a fencing number lower than one that already wrote."""
+
+
+def _stat_deltas(books: Iterable[Book], sign: int) -> Counter:
+    """Per-(dimension, key) count changes caused by adding/removing `books`."""
+    deltas: Counter = Counter()
+    for book in books:
+        deltas[("total", "")] += sign
+        for dimension in STAT_DIMENSIONS:
+            deltas[(dimension, str(getattr(book, dimension)))] += sign
+    return deltas
+
 
 class BookRepository:
     """SQLModel-backed storage for books with proper session handling."""
@@ -14,11 +56,18 @@ class BookRepository:
         """
         self.session = session
 
-    def list(self, *, skip: int = 0, limit: int = 100) -> Sequence[Book]:
+    def list(
+        self, *, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> Sequence[Book]:
         """
         List all books with pagination support.
+        `after_id` enables keyset pagination, which stays cheap on deep pages
+        because it seeks on the primary key instead of skipping rows.
         """
-        statement = select(Book).offset(skip).limit(limit)
+        statement = select(Book).order_by(Book.id)
+        if after_id is not None:
+            statement = statement.where(Book.id > after_id)
+        statement = statement.offset(skip).limit(limit)
         return self.session.exec(statement).all()
 
     def create(self, payload: BookCreate) -> Book:
@@ -28,16 +77,67 @@ class BookRepository:
 
         record = Book.model_validate(payload)
         self.session.add(record)
+        self.session.flush()
+        self._apply_stat_deltas(_stat_deltas([record], +1))
+        self._record_changes("create", [record])
         self.session.commit()
         self.session.refresh(record)
         return record
 
+    def create_many(self, payloads: List[BookCreate]) -> List[Book]:
+        """
+        Create several books in a single transaction (one commit for the batch).
+        Either all books are persisted or none are.
+        """
+        records = [Book.model_validate(payload) for payload in payloads]
+        self.session.add_all(records)
+        self.session.flush()
+        self._apply_stat_deltas(_stat_deltas(records, +1))
+        self._record_changes("create", records)
+        ids = [record.id for record in records]
+        self.session.commit()
+        # One round trip reloads every expired record instead of N refreshes.
+        self.session.exec(select(Book).where(Book.id.in_(ids))).all()
+        return records
+
     def get(self, book_id: int) -> Optional[Book]:
         """
         Retrieve a single book by its primary key ID.
         """
         return self.session.get(Book, book_id)
 
+    def get_many(self, book_ids: List[int]) -> List[Book]:
+        """
+        Retrieve several books in one query, in the order of `book_ids`.
+        Unknown IDs are skipped.
+        """
+        if not book_ids:
+            return []
+        unique_ids = list(dict.fromkeys(book_ids))
+        found = {book.id: book for book in self.session.exec(select(Book).where(Book.id.in_(unique_ids)))}
+        return [found[book_id] for book_id in book_ids if book_id in found]
+
+    def update(self, book_id: int, payload: BookCreate) -> Optional[Book]:
+        """
+        Replace the fields of an existing book.
+        Returns the updated book, or None if it does not exist.
+        """
+        record = self.get(book_id)
+        if record is None:
+            return None
+
+        deltas = _stat_deltas([record], -1)
+        for field, value in payload.model_dump().items():
+            setattr(record, field, value)
+        deltas.update(_stat_deltas([record], +1))
+
+        self.session.add(record)
+        self._apply_stat_deltas(deltas)
+        self._record_changes("update", [record])
+        self.session.commit()
+        self.session.refresh(record)
+        return record
+
     def delete(self, book_id: int) -> bool:
         """
         Delete a book by ID. 
@@ -48,6 +148,8 @@ class BookRepository:
             return False
         
         self.session.delete(record)
+        self._apply_stat_deltas(_stat_deltas([record], -1))
+        self._record_changes("delete", [record])
         self.session.commit()
         return True
 
@@ -62,9 +164,245 @@ class BookRepository:
         
         for record in records:
             self.session.delete(record)
-        
+
+        self.session.exec(sa_delete(BookStat))
+        self._record_changes("delete", records)
         self.session.commit()
         return count
+
+    # -----------------------
+    # Change feed
+    # -----------------------
+    def _record_changes(self, op: str, records: Iterable[Book]) -> None:
+        """
+        Append outbox rows for `records` inside the current transaction.
+        On Postgres a transaction-scoped advisory lock serializes sequence
+        allocation with commit, so readers never see seq N+1 before N.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            self.session.exec(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_ID)))
+        # Lets in-process readers (search index) know to catch up after commit.
+        self.session.info["books_changed"] = True
+        self.session.add_all(
+            BookChange(
+                book_id=record.id,
+                op=op,
+                book=None if op == "delete" else record.model_dump(mode="json"),
+            )
+            for record in records
+        )
+
+    def changes(self, *, since: int = 0, limit: int = 500) -> List[BookChange]:
+        """
+        Changes with a sequence number greater than `since`, oldest first.
+        """
+        statement = (
+            select(BookChange)
+            .where(BookChange.seq > since)
+            .order_by(BookChange.seq)
+            .limit(limit)
+        )
+        return list(self.session.exec(statement).all())
+
+    def iter_batches(
+        self, columns: Sequence[str], *, batch_size: int = 10_000
+    ) -> Iterator[List[tuple]]:
+        """
+        All books in ID order as lists of `columns` tuples, `batch_size` at a
+        time, read from a streaming cursor instead of loading every row.
+        """
+        statement = (
+            select(*(getattr(Book, name) for name in columns))
+            .order_by(Book.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in self.session.execute(statement).partitions():
+            yield [tuple(row) for row in partition]
+
+    def count(self, *, estimated: bool = False) -> int:
+        """
+        Number of books. Exact is a COUNT(*), which scans the table.
+        Estimated costs one catalogue lookup: planner statistics on
+        Postgres, otherwise (or before the first ANALYZE) the maintained
+        `total` row of book_stats.
+        """
+        if not estimated:
+            return self.session.exec(select(func.count()).select_from(Book)).one()
+        if self.session.get_bind().dialect.name == "postgresql":
+            rows = self.session.execute(_PG_ROW_ESTIMATE).scalar()
+            if rows is not None:
+                return round(rows)
+        total = self.session.exec(select(BookStat.count).where(BookStat.dimension == "total")).first()
+        return total if total is not None else self.count()
+
+    def latest_seq(self) -> int:
+        """
+        Sequence number of the newest change (0 when there is none).
+        """
+        return self.session.exec(select(func.max(BookChange.seq))).one() or 0
+
+    # -----------------------
+    # Catalogue refresh
+    # -----------------------
+    def id_bounds(self) -> tuple[Optional[int], Optional[int]]:
+        """Smallest and largest book ID (None, None when empty)."""
+        return tuple(self.session.exec(select(func.min(Book.id), func.max(Book.id))).one())
+
+    def refresh_range(
+        self,
+        lo: int,
+        hi: int,
+        *,
+        before_commit: Optional[Callable[[], None]] = None,
+        fence: Optional[tuple[str, int]] = None,
+    ) -> int:
+        """
+        Re-apply the BookCreate normalization rules to books with lo <= id < hi,
+        fixing rows written before the rules existed. Changed rows update the
+        stats and the change log like any other write. `before_commit` may
+        raise to abort (e.g. when the caller lost its shard lease); `fence`
+        (lease key, fencing number) makes the commit fail with StaleFence
+        if a later holder of that lease already wrote.
+        Returns the number of books changed.
+        """
+        records = self.session.exec(select(Book).where(Book.id >= lo, Book.id < hi)).all()
+        deltas: Counter = Counter()
+        changed = []
+        for record in records:
+            try:
+                normalized = BookCreate.model_validate(record.model_dump(exclude={"id"})).model_dump()
+            except ValidationError:
+                logger.warning("refresh.skip id=%s reason=invalid", record.id)
+                continue
+            if all(getattr(record, field) == value for field, value in normalized.items()):
+                continue
+            deltas.update(_stat_deltas([record], -1))
+            for field, value in normalized.items():
+                setattr(record, field, value)
+            deltas.update(_stat_deltas([record], +1))
+            changed.append(record)
+
+        if not changed:
+            return 0
+        self._apply_stat_deltas(deltas)
+        self._record_changes("update", changed)
+        try:
+            if before_commit is not None:
+                before_commit()
+            if fence is not None:
+                self._claim_fence(*fence)
+        except Exception:
+            self.session.rollback()
+            raise
+        self.session.commit()
+        return len(changed)
+
+    def _claim_fence(self, key: str, fence: int) -> None:
+        """
+        Record `fence` for `key` inside the current transaction, or raise
+        StaleFence when a higher one is already recorded. The row lock taken
+        here also orders concurrent writers under the same key.
+        """
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert_(LeaseFence).values(key=key, fence=fence)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"fence": stmt.excluded.fence},
+                where=LeaseFence.fence <= stmt.excluded.fence,
+            )
+            claimed = self.session.exec(stmt).rowcount == 1
+        else:
+            row = self.session.exec(select(LeaseFence).where(LeaseFence.key == key).with_for_update()).first()
+            claimed = row is None or row.fence <= fence
+            if row is None:
+                self.session.add(LeaseFence(key=key, fence=fence))
+            elif claimed:
+                row.fence = fence
+        if not claimed:
+            raise StaleFence(f"fence {fence} for {key} is older than the last write")
+
+    # -----------------------
+    # Catalogue statistics
+    # -----------------------
+    def _apply_stat_deltas(self, deltas: Counter) -> None:
+        """
+        Atomically add `deltas` to book_stats inside the current transaction.
+        Uses INSERT .. ON CONFLICT DO UPDATE so concurrent writers never race
+        on a read-modify-write; rows are sorted to keep lock order stable.
+        """
+        rows = [
+            {"dimension": dimension, "key": key, "count": count}
+            for (dimension, key), count in sorted(deltas.items())
+            if count
+        ]
+        if not rows:
+            return
+
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(BookStat).values(rows)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(BookStat).values(rows)
+        else:
+            for row in rows:
+                stat = self.session.get(BookStat, (row["dimension"], row["key"]))
+                if stat is None:
+                    self.session.add(BookStat(**row))
+                else:
+                    stat.count += row["count"]
+            return
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dimension", "key"],
+            set_={"count": BookStat.count + stmt.excluded.count},
+        )
+        self.session.exec(stmt)
+
+    def stats(self, *, top: Optional[int] = None) -> BookStats:
+        """
+        Read the precomputed aggregates: O(number of groups), not O(books).
+        `top` keeps only the largest groups of each dimension.
+        """
+        statement = select(BookStat).where(BookStat.count > 0)
+        groups: dict[str, list[BookStat]] = {d: [] for d in ("total", *STAT_DIMENSIONS)}
+        for stat in self.session.exec(statement):
+            groups.setdefault(stat.dimension, []).append(stat)
+
+        def top_groups(dimension: str) -> list[BookStat]:
+            ranked = sorted(groups[dimension], key=lambda s: (-s.count, s.key))
+            return ranked[:top] if top else ranked
+
+        return BookStats(
+            total=sum(s.count for s in groups["total"]),
+            genre={s.key: s.count for s in top_groups("genre")},
+            author={s.key: s.count for s in top_groups("author")},
+            year={int(s.key): s.count for s in top_groups("year")},
+        )
+
+    def rebuild_stats(self) -> int:
+        """
+        Recompute book_stats from the books table in one transaction,
+        correcting any drift. Returns the number of groups written.
+        """
+        self.session.exec(sa_delete(BookStat))
+        columns = [BookStat.dimension, BookStat.key, BookStat.count]
+        self.session.exec(
+            insert(BookStat).from_select(
+                columns, select(literal("total"), literal(""), func.count()).select_from(Book)
+            )
+        )
+        for dimension in STAT_DIMENSIONS:
+            column = getattr(Book, dimension)
+            self.session.exec(
+                insert(BookStat).from_select(
+                    columns,
+                    select(literal(dimension), cast(column, String), func.count()).group_by(column),
+                )
+            )
+        self.session.commit()
+        return self.session.exec(select(func.count()).select_from(BookStat)).one()
     
     def search(
         self,
@@ -72,8 +410,14 @@ class BookRepository:
         author: str | None = None,
         year: int | None = None,
         genre: str | None = None,
+        year_from: int | None = None,
+        year_to: int | None = None,
     ) -> List[Book]:
-
+        """
+        Filter books; `year_from`/`year_to` are inclusive bounds. Year
+        conditions are plain comparisons on the column, so on a table
+        partitioned by year Postgres only scans the matching partitions.
+        """
         stmt = select(Book)
 
         if title:
@@ -82,7 +426,11 @@ class BookRepository:
             stmt = stmt.where(Book.author.ilike(f"%{author}%"))
         if year:
             stmt = stmt.where(Book.year == year)
+        if year_from is not None:
+            stmt = stmt.where(Book.year >= year_from)
+        if year_to is not None:
+            stmt = stmt.where(Book.year <= year_to)
         if genre:
             stmt = stmt.where(Book.genre.ilike(f"%{genre}%"))
 
-        return List(self.session.scalars(stmt).all())
\ No newline at end of file
+        return list(self.session.scalars(stmt).all())
\ No newline at end of file
@@ -0,0 +1,415 @@
+# book_service/app/search_index.py
+"""
+In-memory search over titles and authors: typo-tolerant matching for
+/books/search?fuzzy=true and prefix autocomplete for /books/suggest.
+
+Each field has a FuzzyIndex: words are normalized (case, accents), every
+distinct word is indexed by its trigrams, and a query word is matched by
+collecting words that share enough trigrams with it and re-ranking them
+with a bounded edit distance (adjacent transpositions count as one edit,
+so "Tolkein" finds "Tolkien"). A PrefixIndex keeps each field's distinct
+values in a sorted array for autocomplete.
+
+Suggestions and fuzzy ranking never touch the database. The index holds
+only ids and terms, not whole books, so a fuzzy search then loads its
+winners with one `get_many` (a primary-key lookup) to build the response.
+
+A SearchIndex is a FeedIndex: built once per catalogue (at startup, or on
+first use) and then kept current from the change feed.
+"""
+
+import heapq
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+
+from .feed_index import FeedIndex, built_indexes, current_index, field_value
+
+_WORD = re.compile(r"\w+")
+
+# Terms verified with edit distance per query word, best trigram overlap first.
+MAX_CANDIDATES = 256
+# Words this short share too few trigrams with their typos ("dnue" / "dune"
+# share none), so they are also indexed by their single-deletion variants.
+SHORT_TERM = 6
+
+
+def normalize(text: str) -> list[str]:
+    """Lower-cased, accent-free words of `text`."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WORD.findall(stripped.casefold())
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"^{term}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(term: str) -> set[str]:
+    return {term[:i] + term[i + 1 :] for i in range(len(term))}
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated for a query word of this length."""
+    if len(term) <= 2:
+        return 0
+    if len(term) <= 5:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Optimal-string-alignment distance between `a` and `b`, or None when it
+    exceeds `limit`. Only the diagonal band |i - j| <= limit is computed and
+    rows stop early once every cell is over the bound.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+    over = limit + 1
+    before: list[int] = []
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and before[j - 2] + 1 < value:
+                value = before[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class FuzzyIndex:
+    """Word -> book ids postings plus a trigram index over the vocabulary."""
+
+    def __init__(self) -> None:
+        self._docs: dict[int, tuple[str, ...]] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._grams: dict[str, set[str]] = {}
+        self._deletes: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, book_id: int, text: str) -> None:
+        self.remove(book_id)
+        terms = tuple(dict.fromkeys(normalize(text)))
+        self._docs[book_id] = terms
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                for gram in trigrams(term):
+                    self._grams.setdefault(gram, set()).add(term)
+                if len(term) <= SHORT_TERM:
+                    for variant in deletions(term):
+                        self._deletes.setdefault(variant, set()).add(term)
+            postings.add(book_id)
+
+    def remove(self, book_id: int) -> None:
+        for term in self._docs.pop(book_id, ()):
+            postings = self._postings[term]
+            postings.discard(book_id)
+            if postings:
+                continue
+            del self._postings[term]
+            for gram in trigrams(term):
+                terms = self._grams[gram]
+                terms.discard(term)
+                if not terms:
+                    del self._grams[gram]
+            if len(term) <= SHORT_TERM:
+                for variant in deletions(term):
+                    terms = self._deletes[variant]
+                    terms.discard(term)
+                    if not terms:
+                        del self._deletes[variant]
+
+    def similar_terms(self, word: str) -> dict[str, int]:
+        """Indexed words within max_edits(word) of `word`, with their distance."""
+        limit = max_edits(word)
+        if limit == 0:
+            return {word: 0} if word in self._postings else {}
+        if limit == 1:
+            # Any term within one edit shares a single-deletion variant with
+            # `word` (or is one, or has `word` as one).
+            candidates: set[str] = set()
+            for key in deletions(word) | {word}:
+                if key in self._postings:
+                    candidates.add(key)
+                candidates.update(self._deletes.get(key, ()))
+            matches = {}
+            for term in candidates:
+                distance = bounded_edit_distance(word, term, limit)
+                if distance is not None:
+                    matches[term] = distance
+            return matches
+        grams = trigrams(word)
+        overlap: Counter = Counter()
+        for gram in grams:
+            overlap.update(self._grams.get(gram, ()))
+        # One edit (or transposition) changes at most four trigrams.
+        threshold = max(1, len(grams) - 4 * limit)
+        matches = {}
+        for term, shared in overlap.most_common(MAX_CANDIDATES):
+            if shared < threshold:
+                break
+            if abs(len(term) - len(word)) > limit:
+                continue
+            distance = bounded_edit_distance(word, term, limit)
+            if distance is not None:
+                matches[term] = distance
+        return matches
+
+    def search(self, query: str) -> dict[int, float]:
+        """
+        Books matching every word of `query` (allowing typos), scored by
+        closeness: each word contributes 1 / (1 + edit distance).
+        """
+        scores: Optional[dict[int, float]] = None
+        for word in dict.fromkeys(normalize(query)):
+            best: dict[int, float] = {}
+            for term, distance in self.similar_terms(word).items():
+                weight = 1.0 / (1 + distance)
+                for book_id in self._postings[term]:
+                    if weight > best.get(book_id, 0.0):
+                        best[book_id] = weight
+            if scores is None:
+                scores = best
+            else:
+                scores = {book_id: score + best[book_id] for book_id, score in scores.items() if book_id in best}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+class PrefixIndex:
+    """
+    Distinct values of one field in a sorted array (bisect for prefix
+    ranges), weighted by how many books carry the value. The top results
+    of every queried prefix are cached (least recently used dropped
+    first) and invalidated whenever a value under that prefix changes, so
+    a keystroke costs one ranking of its range until the next write there.
+
+    A bulk load (`start_bulk` ... `finish_bulk`) sorts the array once at
+    the end instead of inserting every new value in order.
+    """
+
+    CACHED_TOP = 50  # the most /books/suggest asks for
+    CACHED_PREFIXES = 10_000
+
+    def __init__(self) -> None:
+        self._keys: list[str] = []
+        self._values: dict[str, list] = {}  # key -> [display value, book count]
+        self._docs: dict[int, str] = {}
+        self._top: "OrderedDict[str, list[str]]" = OrderedDict()
+        self._longest_cached = 0
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @staticmethod
+    def key(value: str) -> str:
+        return " ".join(normalize(value))
+
+    def start_bulk(self) -> None:
+        """Stop maintaining the sorted array until `finish_bulk`."""
+        self._sorted = False
+        self._top.clear()
+
+    def finish_bulk(self) -> None:
+        self._keys = sorted(self._values)
+        self._sorted = True
+        self._top.clear()
+
+    def _invalidate(self, key: str) -> None:
+        for size in range(1, min(len(key), self._longest_cached) + 1):
+            self._top.pop(key[:size], None)
+
+    def add(self, book_id: int, value: str) -> None:
+        self.remove(book_id)
+        key = self.key(value)
+        if not key:
+            return
+        self._docs[book_id] = key
+        entry = self._values.get(key)
+        if entry is None:
+            self._values[key] = [value, 1]
+            if self._sorted:
+                insort(self._keys, key)
+        else:
+            entry[1] += 1
+        self._invalidate(key)
+
+    def remove(self, book_id: int) -> None:
+        key = self._docs.pop(book_id, None)
+        if key is None:
+            return
+        entry = self._values[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._values[key]
+            if self._sorted:
+                del self._keys[bisect_left(self._keys, key)]
+        self._invalidate(key)
+
+    def _ranked(self, prefix: str, limit: int) -> list[str]:
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return heapq.nsmallest(
+            limit, self._keys[lo:hi], key=lambda key: (-self._values[key][1], key)
+        )
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """Most common values starting with `prefix`, as (value, book count)."""
+        prefix = self.key(prefix)
+        if not prefix:
+            return []
+        if limit <= self.CACHED_TOP:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._top[prefix] = self._ranked(prefix, self.CACHED_TOP)
+                self._longest_cached = max(self._longest_cached, len(prefix))
+                if len(self._top) > self.CACHED_PREFIXES:
+                    self._top.popitem(last=False)
+            else:
+                self._top.move_to_end(prefix)
+            keys = top[:limit]
+        else:
+            keys = self._ranked(prefix, limit)
+        return [tuple(self._values[key]) for key in keys]
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint: the sorted array, its strings and the value table."""
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._values) + sys.getsizeof(self._docs)
+        for key, (value, count) in self._values.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value) + 72  # entry list + count
+        return size
+
+
+class SearchIndex(FeedIndex):
+    """Fuzzy and prefix indexes over titles and authors for one catalogue."""
+
+    FIELDS = ("title", "author")
+
+    def _reset(self) -> None:
+        self.fields = {field: FuzzyIndex() for field in self.FIELDS}
+        self.prefixes = {field: PrefixIndex() for field in self.FIELDS}
+
+    def _start_bulk(self) -> None:
+        for index in self.prefixes.values():
+            index.start_bulk()
+
+    def _finish_bulk(self) -> None:
+        for index in self.prefixes.values():
+            index.finish_bulk()
+
+    def __len__(self) -> int:
+        return len(self.fields["title"])
+
+    def _add(self, book_id: int, book: Any) -> None:
+        for field in self.FIELDS:
+            value = field_value(book, field) or ""
+            self.fields[field].add(book_id, value)
+            self.prefixes[field].add(book_id, value)
+
+    def _remove(self, book_id: int) -> None:
+        for field in self.FIELDS:
+            self.fields[field].remove(book_id)
+            self.prefixes[field].remove(book_id)
+
+    def search(
+        self, *, title: Optional[str] = None, author: Optional[str] = None, limit: int = 100
+    ) -> list[int]:
+        """Book ids matching every given field, best matches first."""
+        with self._lock:
+            scores: Optional[dict[int, float]] = None
+            for field, query in (("title", title), ("author", author)):
+                if not query:
+                    continue
+                matched = self.fields[field].search(query)
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {book_id: score + matched[book_id] for book_id, score in scores.items() if book_id in matched}
+        if not scores:
+            return []
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [book_id for book_id, _ in best]
+
+    def suggest(self, field: str, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        with self._lock:
+            return self.prefixes[field].suggest(prefix, limit)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "books": len(self),
+                "seq": self.seq,
+                "suggest": {
+                    field: {"values": len(index), "bytes": index.memory_bytes()}
+                    for field, index in self.prefixes.items()
+                },
+            }
+
+
+def search_index_metrics() -> list[dict]:
+    return [index.metrics() for index in built_indexes(SearchIndex)]
+
+
+def suggest(repository, field: str, prefix: str, *, limit: int = 10, max_lag: float = 2.0) -> list[tuple[str, int]]:
+    return current_index(SearchIndex, repository, max_lag).suggest(field, prefix, limit)
+
+
+def fuzzy_search(
+    repository,
+    *,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+    genre: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    limit: int = 100,
+    max_lag: float = 2.0,
+) -> list:
+    """
+    Rank ids in memory, then load only the winning books from the
+    repository (one `get_many`; the database in SQL modes). Year and genre
+    filters apply to those books, so up to `limit * 10` candidates are
+    loaded when they are set.
+    """
+    index = current_index(SearchIndex, repository, max_lag)
+    filtered = year is not None or genre or year_from is not None or year_to is not None
+    candidates = max(limit * 10, 1000) if filtered else limit
+    ids = index.search(title=title, author=author, limit=candidates)
+    books = repository.get_many(ids)
+    if year is not None:
+        books = [book for book in books if book.year == year]
+    if year_from is not None:
+        books = [book for book in books if book.year >= year_from]
+    if year_to is not None:
+        books = [book for book in books if book.year <= year_to]
+    if genre:
+        needle = genre.casefold()
+        books = [book for book in books if needle in book.genre.casefold()]
+    return books[:limit]
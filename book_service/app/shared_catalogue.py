@@ -0,0 +1,456 @@
+# book_service/app/shared_catalogue.py
+"""
+Memory-mode catalogue shared by every worker process on one host.
+
+With BOOK_MEMORY_SHARED_PATH set (ideally on tmpfs, e.g.
+/dev/shm/books-catalogue), all workers map the same file instead of each
+holding its own BookRepository, so they agree on the data and it sits in
+RAM once. The file is created sparse at its full capacity, so pages only
+cost memory once written and it never has to be remapped:
+
+    header   one page of u64 fields (seqlock version, next id, seq, ...)
+    slots    u64 per book id: heap offset of the current record, 0 = none
+    changes  ring of (book id, new offset, old offset) = the change feed
+    heap     append-only encoded records
+
+Writes are serialized across processes by an flock on the file (and a
+thread lock inside the process). A writer appends the record to the heap,
+bumps the version to odd, moves the oldest-seq marker past the ring entry
+it is about to reuse, writes the change there, publishes slot/seq/count
+and bumps the version back to even. Readers never lock: they read the
+version, do their read, and retry if the version moved or was odd (a
+seqlock). Records are immutable once written, so decoding one needs no
+retry. `create_many` publishes its whole batch inside one such window.
+
+The change feed keeps the newest `max_changes` entries; `changes(since=...)`
+older than the marker raises ChangesExpired (410 from /books/changes), and
+stats or views that fell that far behind recount from the live slots.
+
+A writer killed between the two bumps (worker timeout, OOM) leaves the
+version odd. The kernel drops its flock, so the next process to take the
+lock finishes the publish from the change feed, recounts, and makes the
+version even again. Readers that keep failing (odd version, or a version
+that moves on every attempt) fall back to reading under the write lock,
+which runs that repair and then cannot be interrupted.
+
+Stats are kept per process and caught up from the shared change feed.
+Updated and deleted records stay in the heap until the file is recreated.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+from .feed_index import ChangesExpired, mark_stale
+from .models import STAT_DIMENSIONS, Book, BookChange, BookCreate, BookStats
+from .repository import BookRecord
+
+_MAGIC = int.from_bytes(b"BOOKCAT1", "little")
+_PAGE = mmap.PAGESIZE
+# header word indexes
+_H_MAGIC, _H_VERSION, _H_NEXT_ID, _H_SEQ, _H_HEAP_USED, _H_COUNT = range(6)
+_H_MAX_BOOKS, _H_MAX_CHANGES, _H_HEAP_BYTES = 6, 7, 8
+_H_PUBLISHING = 9  # seq a writer is publishing up to (meaningful while the version is odd)
+_H_OLDEST = 10  # changes after this seq are still in the ring
+# total length, year, utf-8 lengths of title / author / description / genre
+_RECORD = struct.Struct("<IhIIII")
+_HEAP_START = 8  # offset 0 means "no record"
+# Optimistic read attempts before a reader takes the write lock instead.
+MAX_READ_RETRIES = 100
+
+
+class SharedCatalogueError(RuntimeError):
+    """The shared catalogue file is full or was created with another layout."""
+
+
+def _encode(record: BookRecord) -> bytes:
+    texts = [value.encode() for value in (record.title, record.author, record.description, record.genre)]
+    body = b"".join(texts)
+    return _RECORD.pack(_RECORD.size + len(body), record.year, *map(len, texts)) + body
+
+
+class SharedBookRepository:
+    """
+    Repository over a shared, memory-mapped catalogue file.
+
+    Same interface and semantics as the in-memory BookRepository; every
+    process opening the same path sees the same books.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        max_books: int = 4_000_000,
+        heap_mb: int = 2048,
+        max_changes: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+        self._header = None
+        self.read_retries = 0
+        self.locked_reads = 0
+        self.repairs = 0
+        with self._write_lock():
+            if os.fstat(self._fd).st_size == 0:
+                self._create(max_books, max_changes or max_books * 2, heap_mb * 1024 * 1024)
+            self._map()
+        self._stats: dict[str, Counter] = {d: Counter() for d in STAT_DIMENSIONS}
+        self._stats_seq = 0
+        self._stats_lock = threading.Lock()
+
+    # ---- layout -----------------------------------------------------------
+    def _create(self, max_books: int, max_changes: int, heap_bytes: int) -> None:
+        slots = (max_books + 1) * 8
+        changes = max_changes * 24
+        os.ftruncate(self._fd, _PAGE + slots + changes + heap_bytes)  # sparse
+        header = struct.pack("<9Q", _MAGIC, 0, 1, 0, _HEAP_START, 0, max_books, max_changes, heap_bytes)
+        os.pwrite(self._fd, header, 0)
+
+    def _map(self) -> None:
+        self._mm = mmap.mmap(self._fd, 0)
+        view = memoryview(self._mm)
+        self._header = view[:_PAGE].cast("Q")
+        if self._header[_H_MAGIC] != _MAGIC or sys.byteorder != "little":
+            raise SharedCatalogueError(f"{self.path} is not a shared catalogue file")
+        self.max_books = self._header[_H_MAX_BOOKS]
+        self.max_changes = self._header[_H_MAX_CHANGES]
+        slots_end = _PAGE + (self.max_books + 1) * 8
+        changes_end = slots_end + self.max_changes * 24
+        self._slots = view[_PAGE:slots_end].cast("Q")
+        self._changes = view[slots_end:changes_end].cast("Q")
+        self._heap_base = changes_end
+        self._heap_bytes = self._header[_H_HEAP_BYTES]
+
+    def close(self) -> None:
+        for view in (self._header, self._slots, self._changes):
+            view.release()
+        self._mm.close()
+        os.close(self._fd)
+
+    # ---- seqlock ----------------------------------------------------------
+    def _read(self, fn):
+        """Run `fn` against a consistent view of the header/slots/changes."""
+        header = self._header
+        for _ in range(MAX_READ_RETRIES):
+            before = header[_H_VERSION]
+            if before & 1:
+                self.read_retries += 1
+                time.sleep(0)
+                continue
+            try:
+                result = fn()
+            except Exception:
+                if header[_H_VERSION] == before:
+                    raise
+                result = None
+            if header[_H_VERSION] == before:
+                return result
+            self.read_retries += 1
+        # A writer is slow or died mid-publish: wait for (or repair) it.
+        self.locked_reads += 1
+        with self._write_lock():
+            return fn()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Single writer: threads of this process, then other processes."""
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if self._header is not None and self._header[_H_VERSION] & 1:
+                    self._repair()
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _repair(self) -> None:
+        """Finish the publish of a writer that died with the version odd; caller holds the write lock."""
+        header = self._header
+        seq, publishing = header[_H_SEQ], header[_H_PUBLISHING]
+        if publishing > seq:
+            # Died before advancing seq: the change entries are complete, roll them forward.
+            for entry in range(seq, publishing):
+                base = (entry % self.max_changes) * 3
+                self._slots[self._changes[base]] = self._changes[base + 1]
+            header[_H_SEQ] = publishing
+        # Whether the count was adjusted is unknown; recount the live slots.
+        slots = self._slots
+        header[_H_COUNT] = sum(1 for book_id in range(1, header[_H_NEXT_ID]) if slots[book_id])
+        header[_H_VERSION] += 1
+        self.repairs += 1
+        mark_stale(self)
+
+    # ---- records ----------------------------------------------------------
+    def _record(self, offset: int) -> BookRecord:
+        at = self._heap_base + offset
+        _, year, *lengths = _RECORD.unpack_from(self._mm, at)
+        at += _RECORD.size
+        texts = []
+        for length in lengths:
+            texts.append(str(self._mm[at : at + length], "utf-8"))
+            at += length
+        title, author, description, genre = texts
+        return BookRecord(title, sys.intern(author), description, year, sys.intern(genre))
+
+    def _append_record(self, record: BookRecord) -> int:
+        data = _encode(record)
+        offset = self._header[_H_HEAP_USED]
+        if offset + len(data) > self._heap_bytes:
+            raise SharedCatalogueError("shared catalogue heap is full; raise BOOK_MEMORY_SHARED_HEAP_MB")
+        at = self._heap_base + offset
+        self._mm[at : at + len(data)] = data
+        self._header[_H_HEAP_USED] = offset + len(data)  # only writers read it
+        return offset
+
+    def _publish(self, book_id: int, new: int, old: int) -> None:
+        """Point `book_id` at `new` and log the change; caller holds the write lock."""
+        self._publish_many([(book_id, new, old)])
+
+    def _publish_many(self, entries: List[tuple[int, int, int]]) -> None:
+        """Publish (book id, new, old) changes as one step readers see whole; caller holds the write lock."""
+        header = self._header
+        seq = header[_H_SEQ]
+        end = seq + len(entries)
+        header[_H_VERSION] += 1  # odd: readers retry
+        if end > self.max_changes:
+            # The entries about to be reused are the oldest ones still kept.
+            header[_H_OLDEST] = max(header[_H_OLDEST], end - self.max_changes)
+        changes = self._changes
+        for at, (book_id, new, old) in enumerate(entries, seq):
+            base = (at % self.max_changes) * 3
+            changes[base], changes[base + 1], changes[base + 2] = book_id, new, old
+        header[_H_PUBLISHING] = end
+        for book_id, new, old in entries:
+            self._slots[book_id] = new
+        header[_H_SEQ] = end
+        header[_H_COUNT] += sum((1 if new else 0) - (1 if old else 0) for _, new, old in entries)
+        header[_H_VERSION] += 1
+        mark_stale(self)
+
+    def __len__(self) -> int:
+        return self._header[_H_COUNT]
+
+    def count(self, *, estimated: bool = False) -> int:
+        return self._header[_H_COUNT]
+
+    # ---- writes -----------------------------------------------------------
+    def create(self, payload: BookCreate) -> Book:
+        record = BookRecord.from_payload(payload)
+        with self._write_lock():
+            book_id = self._header[_H_NEXT_ID]
+            if book_id > self.max_books:
+                raise SharedCatalogueError("shared catalogue is full; raise BOOK_MEMORY_SHARED_MAX_BOOKS")
+            offset = self._append_record(record)
+            # Readers may now scan this id, but its slot is 0 until published.
+            self._header[_H_NEXT_ID] = book_id + 1
+            self._publish(book_id, offset, 0)
+        return record.to_book(book_id)
+
+    def create_many(self, payloads: List[BookCreate]) -> List[Book]:
+        """All or nothing, with consecutive IDs and sequence numbers (see BookRepository.create_many)."""
+        records = [BookRecord.from_payload(payload) for payload in payloads]
+        if len(records) > self.max_changes:
+            raise SharedCatalogueError("batch is larger than the change feed ring")
+        with self._write_lock():
+            first_id = self._header[_H_NEXT_ID]
+            if first_id + len(records) - 1 > self.max_books:
+                raise SharedCatalogueError("shared catalogue is full; raise BOOK_MEMORY_SHARED_MAX_BOOKS")
+            offsets = [self._append_record(record) for record in records]
+            self._header[_H_NEXT_ID] = first_id + len(records)
+            self._publish_many([(book_id, offset, 0) for book_id, offset in enumerate(offsets, first_id)])
+        return [record.to_book(book_id) for book_id, record in enumerate(records, first_id)]
+
+    def update(self, book_id: int, payload: BookCreate) -> Optional[Book]:
+        record = BookRecord.from_payload(payload)
+        with self._write_lock():
+            old = self._slot(book_id)
+            if not old:
+                return None
+            self._publish(book_id, self._append_record(record), old)
+        return record.to_book(book_id)
+
+    def delete(self, book_id: int) -> bool:
+        with self._write_lock():
+            old = self._slot(book_id)
+            if not old:
+                return False
+            self._publish(book_id, 0, old)
+        return True
+
+    def delete_all(self) -> int:
+        count = 0
+        with self._write_lock():
+            for book_id in range(1, self._header[_H_NEXT_ID]):
+                old = self._slots[book_id]
+                if old:
+                    self._publish(book_id, 0, old)
+                    count += 1
+        return count
+
+    # ---- reads ------------------------------------------------------------
+    def _slot(self, book_id: int) -> int:
+        return self._slots[book_id] if 0 < book_id <= self.max_books else 0
+
+    def get(self, book_id: int) -> Optional[Book]:
+        # One aligned word plus an immutable record: no seqlock needed.
+        offset = self._slot(book_id)
+        return self._record(offset).to_book(book_id) if offset else None
+
+    def get_many(self, book_ids: List[int]) -> List[Book]:
+        books = (self.get(book_id) for book_id in book_ids)
+        return [book for book in books if book is not None]
+
+    def _live(self, after_id: int = 0) -> Iterator[tuple[int, int]]:
+        """(book id, offset) of live books above `after_id`, ascending."""
+        slots = self._slots
+        for book_id in range(max(after_id, 0) + 1, self._header[_H_NEXT_ID]):
+            offset = slots[book_id]
+            if offset:
+                yield book_id, offset
+
+    def list(self, *, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> list[Book]:
+        def page() -> list[tuple[int, int]]:
+            return list(islice(self._live(after_id or 0), skip, skip + limit))
+
+        return [self._record(offset).to_book(book_id) for book_id, offset in self._read(page)]
+
+    def search(
+        self,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        year: Optional[int] = None,
+        genre: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> List[Book]:
+        def contains(value: str, needle: Optional[str]) -> bool:
+            return not needle or needle.casefold() in value.casefold()
+
+        found = []
+        for book_id, offset in self._read(lambda: list(self._live())):
+            record = self._record(offset)
+            if (
+                contains(record.title, title)
+                and contains(record.author, author)
+                and contains(record.genre, genre)
+                and (not year or record.year == year)
+                and (year_from is None or record.year >= year_from)
+                and (year_to is None or record.year <= year_to)
+            ):
+                found.append(record.to_book(book_id))
+        return found
+
+    def iter_batches(self, columns: Sequence[str], *, batch_size: int = 10_000) -> Iterator[List[tuple]]:
+        live = self._read(lambda: list(self._live()))
+        for start in range(0, len(live), batch_size):
+            batch = []
+            for book_id, offset in live[start : start + batch_size]:
+                record = self._record(offset)
+                batch.append(tuple(book_id if name == "id" else getattr(record, name) for name in columns))
+            yield batch
+
+    def latest_seq(self) -> int:
+        return self._header[_H_SEQ]
+
+    def _change_entries(self, since: int, limit: int) -> List[tuple]:
+        def read() -> list[tuple[int, int, int, int]]:
+            since_ = max(since, 0)
+            if since_ < self._header[_H_OLDEST]:
+                raise ChangesExpired(since_, self._header[_H_OLDEST])
+            end = min(self._header[_H_SEQ], since_ + limit)
+            changes, ring = self._changes, self.max_changes
+            return [
+                (seq + 1, changes[(seq % ring) * 3], changes[(seq % ring) * 3 + 1], changes[(seq % ring) * 3 + 2])
+                for seq in range(since_, end)
+            ]
+
+        return self._read(read)
+
+    def changes(self, *, since: int = 0, limit: int = 500) -> List[BookChange]:
+        result = []
+        for seq, book_id, new, old in self._change_entries(since, limit):
+            op = "delete" if not new else "update" if old else "create"
+            book = None if not new else self._record(new).to_dict(book_id)
+            result.append(BookChange(seq=seq, book_id=book_id, op=op, book=book))
+        return result
+
+    # ---- stats ------------------------------------------------------------
+    def _count(self, record: BookRecord, sign: int) -> None:
+        for dimension in STAT_DIMENSIONS:
+            counter = self._stats[dimension]
+            key = getattr(record, dimension)
+            counter[key] += sign
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _recount_stats(self) -> None:
+        """Count the live records from scratch (the feed no longer reaches back far enough)."""
+        seq, live = self._read(lambda: (self._header[_H_SEQ], list(self._live())))
+        for counter in self._stats.values():
+            counter.clear()
+        for _, offset in live:
+            self._count(self._record(offset), +1)
+        self._stats_seq = seq
+
+    def _catch_up_stats(self) -> None:
+        while True:
+            try:
+                entries = self._change_entries(self._stats_seq, 10_000)
+            except ChangesExpired:
+                self._recount_stats()
+                continue
+            for seq, _, new, old in entries:
+                if old:
+                    self._count(self._record(old), -1)
+                if new:
+                    self._count(self._record(new), +1)
+                self._stats_seq = seq
+            if len(entries) < 10_000:
+                return
+
+    def stats(self, *, top: Optional[int] = None) -> BookStats:
+        with self._stats_lock:
+            self._catch_up_stats()
+
+            def groups(dimension: str) -> dict:
+                ranked = sorted(self._stats[dimension].items(), key=lambda kv: (-kv[1], str(kv[0])))
+                return dict(ranked[:top] if top else ranked)
+
+            return BookStats(
+                total=sum(self._stats["genre"].values()),
+                genre=groups("genre"),
+                author=groups("author"),
+                year=groups("year"),
+            )
+
+    def rebuild_stats(self) -> int:
+        with self._stats_lock:
+            self._recount_stats()
+            self._catch_up_stats()
+            return 1 + sum(len(counter) for counter in self._stats.values())
+
+    def metrics(self) -> dict:
+        header = self._header
+        return {
+            "books": header[_H_COUNT],
+            "seq": header[_H_SEQ],
+            "oldest_seq": header[_H_OLDEST],
+            "changes_max": self.max_changes,
+            "heap_bytes_used": header[_H_HEAP_USED],
+            "heap_bytes_max": self._heap_bytes,
+            "heap_fill": round(header[_H_HEAP_USED] / self._heap_bytes, 4),
+            "read_retries": self.read_retries,
+            "locked_reads": self.locked_reads,
+            "repairs": self.repairs,
+        }
@@ -0,0 +1,110 @@
+# book_service/app/singleflight.py
+"""
+Request coalescing ("single flight") for repository reads.
+
+When many threads ask for the same thing at once (a popular book, the same
+search), only the first one - the leader - runs the query; the others wait
+for it and share its result or its exception. Nothing is cached: once the
+leader finishes, the next caller queries again.
+
+A caller that joins an in-flight read may see the state from when that read
+started, which is the same guarantee it would get from racing the query.
+"""
+
+import os
+import threading
+from collections import Counter
+from collections.abc import Callable, Hashable
+from typing import Any, Optional
+
+from sqlmodel import Session
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run `fn` once per key among concurrent callers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    def do(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        """`key[0]` names the operation for metrics."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders[key[0]] += 1
+            else:
+                self.coalesced[key[0]] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def metrics(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                op: {"leaders": self.leaders[op], "coalesced": self.coalesced[op]}
+                for op in sorted(set(self.leaders) | set(self.coalesced))
+            }
+
+
+flights = SingleFlight()
+# A call in flight at fork time has no leader in the child.
+os.register_at_fork(after_in_child=flights.__init__)
+
+
+class SingleFlightRepository:
+    """
+    Wraps a SQL repository so concurrent identical get/list/search calls
+    against the same database share one query. Everything else is delegated.
+    """
+
+    def __init__(self, repository, session: Session, flight: SingleFlight = flights) -> None:
+        self._repository = repository
+        self._flight = flight
+        # Requests against different databases (e.g. test engines) never mix.
+        self._bind = session.get_bind()
+
+    def __getattr__(self, name: str):
+        return getattr(self._repository, name)
+
+    def get(self, book_id: int):
+        return self._flight.do(("get", self._bind, book_id), lambda: self._repository.get(book_id))
+
+    def list(self, *, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+        return self._flight.do(
+            ("list", self._bind, skip, limit, after_id),
+            lambda: self._repository.list(skip=skip, limit=limit, after_id=after_id),
+        )
+
+    def search(self, **filters):
+        return self._flight.do(
+            ("search", self._bind, tuple(sorted(filters.items()))),
+            lambda: self._repository.search(**filters),
+        )
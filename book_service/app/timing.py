@@ -0,0 +1,227 @@
+# book_service/app/timing.py
+"""
+Per-request stage timings, reported in one `request.timing` log line
+carrying the request's trace_id and, for admins who send
+`X-Server-Timing: 1`, in the `Server-Timing` response header (shown under
+"Timing" in browser devtools). Off by default (BOOK_SERVER_TIMING_ENABLED).
+
+Stages (milliseconds; they nest, so they do not add up to `total`):
+
+- total: the whole request, measured in the outermost middleware;
+- deps: dependency resolution and request parsing, up to the endpoint call;
+- auth: JWT decoding and role checks (`require_role`), part of deps;
+- app: the endpoint function itself;
+- repo: repository calls made by the endpoint, part of app;
+- db: SQL statements on this request's connections (with a count);
+- serialize: turning the return value into the response body.
+
+Everything hangs off one context variable, which also reaches threadpool
+workers running sync endpoints and dependencies. When it is unset
+(timing disabled, scripts, background threads such as the
+group committer) every hook is a single `ContextVar.get()`. A timed request
+adds a few `perf_counter()` calls per stage.
+
+Streamed responses (exports) send their headers before the body is
+produced, so their `serialize` and `db` only cover what happened up to then.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_DESCRIPTIONS = {
+    "deps": "dependencies",
+    "auth": "auth",
+    "app": "endpoint",
+    "repo": "repository",
+    "db": "SQL",
+    "serialize": "serialization",
+    "total": "total",
+}
+_COUNTED = frozenset({"db", "repo"})
+
+
+class RequestTimings:
+    """Accumulated seconds and call counts per stage for one request."""
+
+    __slots__ = ("started", "stages", "endpoint_span")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, list] = {}
+        self.endpoint_span: Optional[tuple[float, float]] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            stage[0] += seconds
+            stage[1] += 1
+
+    def finish(self) -> None:
+        self.add("total", time.perf_counter() - self.started)
+
+    def header(self) -> str:
+        parts = []
+        for name, (seconds, count) in self.stages.items():
+            desc = _DESCRIPTIONS.get(name, name)
+            if name in _COUNTED:
+                desc = f"{desc} ({count})"
+            parts.append(f'{name};dur={seconds * 1000:.2f};desc="{desc}"')
+        return ", ".join(parts)
+
+    def fields(self) -> str:
+        """`key=value` pairs for the log line (see logs.JsonFormatter)."""
+        parts = []
+        for name, (seconds, count) in self.stages.items():
+            parts.append(f"{name}_ms={seconds * 1000:.2f}")
+            if name in _COUNTED:
+                parts.append(f"{name}_count={count}")
+        return " ".join(parts)
+
+
+timings_var: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class stage:
+    """`with stage("auth"): ...` adds the block's duration to the current request, if timed."""
+
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.timings = timings_var.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.start)
+
+
+# -----------------------
+# SQL statements
+# -----------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and timings_var.get() is not None:
+        context._timing_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    start = getattr(context, "_timing_start", None)
+    if start is not None:
+        timings = timings_var.get()
+        if timings is not None:
+            timings.add("db", time.perf_counter() - start)
+
+
+# -----------------------
+# Repository calls
+# -----------------------
+class TimedRepository:
+    """Wraps a repository so each method call counts towards the `repo` stage."""
+
+    def __init__(self, repository) -> None:
+        self.wrapped = repository  # catalogue views are keyed by the real repository (feed_index.index_key)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.wrapped, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            with stage("repo"):
+                return attr(*args, **kwargs)
+
+        return timed
+
+
+# -----------------------
+# Routes: deps / app / serialize
+# -----------------------
+def _timed_endpoint(call):
+    # Same sync/async kind as `call`: FastAPI decides between awaiting it and
+    # sending it to the threadpool from the (unwrapped) function.
+    def record(start: float) -> None:
+        timings = timings_var.get()
+        if timings is not None:
+            end = time.perf_counter()
+            timings.endpoint_span = (start, end)
+            timings.add("app", end - start)
+
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed(**values):
+            start = time.perf_counter()
+            try:
+                return await call(**values)
+            finally:
+                record(start)
+
+    else:
+
+        @functools.wraps(call)
+        def timed(**values):
+            start = time.perf_counter()
+            try:
+                return call(**values)
+            finally:
+                record(start)
+
+    timed._timed = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits its handler into deps / app / serialize. Set as the
+    `route_class` of the app and of every included router before routes are
+    added.
+
+    The endpoint itself is wrapped (not just `dependant.call`): an included
+    router's routes get their dependant rebuilt from `endpoint` for each
+    inclusion. FastAPI reads the signature and annotations through
+    `__wrapped__`, so parameters are unchanged.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        plain = inspect.isfunction(endpoint) and not (
+            inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint)
+        )
+        if plain and not getattr(endpoint, "_timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = timings_var.get()
+            if timings is None:
+                return await handler(request)
+            start = time.perf_counter()
+            timings.endpoint_span = None
+            try:
+                return await handler(request)
+            finally:
+                end = time.perf_counter()
+                span = timings.endpoint_span
+                if span is None:  # rejected before the endpoint (validation, auth)
+                    timings.add("deps", end - start)
+                else:
+                    timings.add("deps", span[0] - start)
+                    timings.add("serialize", end - span[1])
+
+        return timed_handler
@@ -0,0 +1,109 @@
+# book_service/serve.py
+"""
+Multi-process server: gunicorn master + uvicorn workers, app preloaded.
+
+    python -m book_service.serve
+
+The master imports the app once, warms the in-memory catalogue views and
+freezes the GC before forking, so workers start instantly and share those
+pages copy-on-write (frozen objects are never touched by the collector).
+Everything that must not cross a fork (the engine's pooled connections,
+Redis clients, background threads, locks, the shared catalogue's flock)
+is reset in the child by the `os.register_at_fork` hooks of the modules
+that own it.
+
+Configured through BOOK_WEB_* (see config.py). Signals are gunicorn's:
+HUP replaces workers gracefully, TTIN/TTOU add/remove one, TERM stops
+after BOOK_WEB_GRACEFUL_TIMEOUT. With a preloaded app, HUP does not pick
+up new code; restart the master for that.
+
+Needs the 'serve' extra (gunicorn + uvicorn-worker).
+"""
+
+import gc
+import logging
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from book_service.app.config import Settings
+
+logger = logging.getLogger("book-service")
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.web_workers or os.cpu_count() or 1
+
+
+def check_settings(settings: Settings, workers: int) -> None:
+    """Refuse layouts where workers would silently disagree about (or lose) the data."""
+    if settings.db_mode != "memory" or settings.memory_shared_path:
+        return
+    if workers > 1:
+        raise SystemExit(
+            "BOOK_DB_MODE=memory with several workers needs BOOK_MEMORY_SHARED_PATH "
+            "(each worker would otherwise hold its own catalogue)"
+        )
+    if settings.web_max_requests and not settings.memory_data_dir:
+        raise SystemExit(
+            "BOOK_DB_MODE=memory without BOOK_MEMORY_DATA_DIR or BOOK_MEMORY_SHARED_PATH keeps the "
+            "catalogue only in the worker, and BOOK_WEB_MAX_REQUESTS recycles that worker "
+            "(wiping it); set BOOK_WEB_MAX_REQUESTS=0 or give the catalogue a home"
+        )
+
+
+def _pre_fork(server, worker) -> None:
+    # Move everything the master has built into the permanent generation:
+    # collections in the workers then never write to (and copy) those pages.
+    gc.freeze()
+
+
+def _post_fork(server, worker) -> None:
+    logger.info("serve.worker_started pid=%s", os.getpid())
+
+
+class BookServiceApplication(BaseApplication):
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.workers = worker_count(settings)
+        super().__init__()
+
+    def load_config(self) -> None:
+        settings = self.settings
+        options = {
+            "bind": settings.web_bind,
+            "workers": self.workers,
+            "worker_class": "uvicorn_worker.UvicornWorker",
+            "preload_app": True,
+            "max_requests": settings.web_max_requests,
+            "max_requests_jitter": settings.web_max_requests_jitter,
+            "timeout": settings.web_timeout,
+            "graceful_timeout": settings.web_graceful_timeout,
+            "pre_fork": _pre_fork,
+            "post_fork": _post_fork,
+        }
+        for key, value in options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from book_service.app.database import engine
+        from book_service.app.main import _warm_indexes, app
+
+        if self.settings.search_index_warm and self.settings.db_mode != "memory":
+            # Built once here, inherited by every worker; their lifespan
+            # then only catches up with writes made since.
+            _warm_indexes()
+            engine.dispose()  # the master serves nothing; fork with an empty pool
+        gc.collect()
+        return app
+
+
+def main() -> None:
+    settings = Settings()
+    check_settings(settings, worker_count(settings))
+    BookServiceApplication(settings).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# filepath: book_service/tests/test_admission.py
+"""
+Tests for admission control (rate limits and bulkheads).
+"""
+import asyncio
+
+import pytest
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from book_service.app import admission
+from book_service.app.admission import MemoryRateLimiter, route_class
+from book_service.app.config import Settings
+from book_service.app.database import get_settings
+from book_service.app.security import create_access_token
+
+
+@pytest.fixture
+def admission_settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "admission_enabled", True)
+    monkeypatch.setattr(settings, "admission_backend", "memory")
+    monkeypatch.setattr(admission, "_controller", None)
+    return settings
+
+
+def test_route_classes():
+    assert route_class("GET", "/books") == "read"
+    assert route_class("GET", "/books/7") == "read"
+    assert route_class("GET", "/books/search") == "heavy"
+    assert route_class("POST", "/books/bulk") == "heavy"
+    assert route_class("POST", "/books/batch-get") == "read"
+    assert route_class("DELETE", "/books/7") == "write"
+    assert route_class("GET", "/healthz") is None
+
+
+@pytest.mark.anyio
+async def test_memory_bucket_refills():
+    limiter = MemoryRateLimiter()
+    assert await limiter.hit("a", rate=1000, burst=1) == 0
+    wait = await limiter.hit("a", rate=1000, burst=1)
+    assert 0 < wait <= 0.001
+    assert await limiter.hit("b", rate=1000, burst=1) == 0
+
+
+def test_rate_limit_is_per_client(client, admission_settings, monkeypatch):
+    """An exhausted bucket answers 429 + Retry-After without affecting others."""
+    monkeypatch.setattr(admission_settings, "rate_limit_per_second", 0.5)
+    monkeypatch.setattr(admission_settings, "rate_limit_burst", 2)
+
+    assert client.get("/books").status_code == 200
+    assert client.get("/books").status_code == 200
+    limited = client.get("/books")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "2"
+    assert "X-Trace-Id" in limited.headers
+
+    token = create_access_token(subject="someone-else", roles=["student"], settings=Settings())
+    other = client.get("/books", headers={"Authorization": f"Bearer {token}"})
+    assert other.status_code == 200
+    # Exempt endpoints stay reachable for a throttled client.
+    assert client.get("/metrics").json()["admission"]["rate_limited"] == 1
+
+
+def test_full_bulkhead_fails_fast(client, admission_settings, monkeypatch):
+    """A full bulkhead rejects with 503 instead of queueing."""
+    monkeypatch.setattr(admission_settings, "bulkhead_heavy", 0)
+
+    response = client.get("/books/stats")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/books").status_code == 200
+    bulkheads = client.get("/metrics").json()["admission"]["bulkheads"]
+    assert bulkheads["heavy"]["rejected"] == 1
+    assert bulkheads["read"]["in_flight"] == 0
+
+
+def test_zero_rate_disables_rate_limiting(client, admission_settings, monkeypatch):
+    monkeypatch.setattr(admission_settings, "rate_limit_per_second", 0.0)
+    monkeypatch.setattr(admission_settings, "rate_limit_burst", 1)
+
+    assert [client.get("/books").status_code for _ in range(3)] == [200, 200, 200]
+
+
+def test_bearer_token_is_decoded_once(client, admission_settings, monkeypatch):
+    calls = []
+    decode = admission.jwt.decode
+    monkeypatch.setattr(admission.jwt, "decode", lambda *a, **kw: calls.append(1) or decode(*a, **kw))
+    token = create_access_token(subject="reader", roles=["student"], settings=Settings())
+
+    for _ in range(3):
+        assert client.get("/books", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert len(calls) == 1
+
+
+def _request(path: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "headers": [], "client": ("10.0.0.1", 1)})
+
+
+@pytest.mark.anyio
+async def test_streaming_export_holds_its_heavy_slot(admission_settings, monkeypatch):
+    """The slot is held while the export body streams, not just until the headers."""
+    monkeypatch.setattr(admission_settings, "bulkhead_heavy", 1)
+    controller = admission.get_admission_controller(admission_settings)
+    streaming, finish = asyncio.Event(), asyncio.Event()
+
+    async def rows():
+        yield b"id,title\n"
+        streaming.set()
+        await finish.wait()
+        yield b"1,Dune\n"
+
+    async def call_next(request):
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    export = await controller.dispatch(_request("/books/export"), call_next)
+    sending = asyncio.create_task(export({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    await asyncio.wait_for(streaming.wait(), 1)
+
+    second = await controller.dispatch(_request("/books/search"), call_next)
+    assert second.status_code == 503
+    assert controller.bulkheads["heavy"].in_flight == 1
+
+    finish.set()
+    await sending
+    assert controller.bulkheads["heavy"].in_flight == 0
+    third = await controller.dispatch(_request("/books/search"), call_next)
+    assert third.status_code == 200
@@ -0,0 +1,113 @@
+# filepath: book_service/tests/test_analytics.py
+"""
+Tests for the columnar analytics snapshot (/books/analytics).
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from book_service.app.analytics import ColumnarSnapshot  # noqa: E402
+from book_service.app.models import BookCreate  # noqa: E402
+from book_service.app.repository import BookRepository as MemoryRepository  # noqa: E402
+
+
+def _book(**overrides) -> dict:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def _catalogue() -> MemoryRepository:
+    repository = MemoryRepository()
+    for title, author, year, genre in [
+        ("Dune", "Frank Herbert", 1965, "sci-fi"),
+        ("Dune Messiah", "Frank Herbert", 1969, "sci-fi"),
+        ("Emma", "Jane Austen", 1915, "romance"),
+        ("Persuasion", "Jane Austen", 1917, "romance"),
+        ("Neuromancer", "William Gibson", 1984, "sci-fi"),
+    ]:
+        repository.create(BookCreate(**_book(title=title, author=author, year=year, genre=genre)))
+    return repository
+
+
+def test_filters_and_group_by():
+    snapshot = ColumnarSnapshot()
+    snapshot.build(_catalogue())
+
+    assert snapshot.query() == (5, {})
+    assert snapshot.query(genre="SCI-FI", group_by="author") == (3, {"Frank Herbert": 2, "William Gibson": 1})
+    assert snapshot.query(year_from=1950, year_to=1970, group_by="year") == (2, {"1965": 1, "1969": 1})
+    assert snapshot.query(author="jane austen", title="em") == (1, {})
+    assert snapshot.query(title="dune", group_by="genre") == (2, {"Sci-Fi": 2})
+    assert snapshot.query(genre="unknown") == (0, {})
+    assert snapshot.query(group_by="genre", top=1) == (5, {"Sci-Fi": 3})
+
+
+def test_snapshot_follows_updates_and_deletes():
+    repository = _catalogue()
+    snapshot = ColumnarSnapshot()
+    snapshot.build(repository)
+
+    repository.update(1, BookCreate(**_book(title="Children of Dune", author="Frank Herbert", year=1976, genre="sci-fi")))
+    repository.delete(2)
+    for i in range(20):
+        repository.create(BookCreate(**_book(title=f"Filler {i}")))
+        repository.delete(6 + i)
+    snapshot.catch_up(repository)
+
+    assert snapshot.query(title="dune") == (1, {})
+    assert snapshot.query(title="children of") == (1, {})
+    assert snapshot.query(title="filler") == (0, {})
+    assert snapshot.query(author="Frank Herbert", group_by="year") == (1, {"1976": 1})
+    assert len(snapshot) == 4
+    assert snapshot.size < 10  # the deleted fillers' slots were reclaimed
+
+
+def test_deleted_rows_are_compacted():
+    repository = _catalogue()
+    snapshot = ColumnarSnapshot()
+    snapshot.build(repository)
+    for book_id in (1, 3, 4):
+        repository.delete(book_id)
+    snapshot.catch_up(repository)
+
+    assert snapshot.size == 2 and snapshot.alive[:2].all()
+    assert snapshot.query(group_by="author") == (2, {"Frank Herbert": 1, "William Gibson": 1})
+    assert snapshot.query(title="neuro") == (1, {})
+    assert bytes(snapshot.titles) == b"dune messiahneuromancer"
+
+    repository.update(5, BookCreate(**_book(title="Count Zero", author="William Gibson", year=1986, genre="sci-fi")))
+    repository.delete(2)
+    snapshot.catch_up(repository)
+    assert snapshot.query(title="count", group_by="year") == (1, {"1986": 1})
+    assert len(snapshot) == 1
+
+
+def test_title_filter_matches_a_per_title_scan():
+    repository = MemoryRepository()
+    titles = ["aaaa", "Banana", "ab", "cd", "abcd", "Ärger", "x"]
+    for title in titles:
+        repository.create(BookCreate(**_book(title=title)))
+    snapshot = ColumnarSnapshot()
+    snapshot.build(repository)
+
+    # Overlapping hits, hits across two adjacent titles ("ab"+"cd"), non-ASCII, longer than the buffer.
+    for needle in ("a", "aa", "ana", "bc", "abcd", "ärg", "d", "q", "x" * 100):
+        expected = sum(needle.casefold() in title.casefold() for title in titles)
+        assert snapshot.query(title=needle) == (expected, {}), needle
+
+
+def test_analytics_endpoint(client, auth_headers):
+    client.post("/books", json=_book(title="Dune", author="Frank Herbert", year=1965, genre="sci-fi"), headers=auth_headers)
+    client.post("/books", json=_book(title="Emma", author="Jane Austen", year=1915, genre="romance"), headers=auth_headers)
+
+    response = client.get("/books/analytics", params={"group_by": "genre", "year_from": 1900})
+    assert response.status_code == 200
+    assert response.json() == {"total": 2, "group_by": "genre", "groups": {"Romance": 1, "Sci-Fi": 1}}
+    assert client.get("/books/analytics", params={"year_to": 1950}).json()["total"] == 1
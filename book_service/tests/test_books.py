@@ -240,3 +240,91 @@ def test_create_book_rejects_year_too_new(client):
         },
     )
     assert response.status_code == 422
+
+
+def _create(client, auth_headers, **overrides):
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    response = client.post("/books", json=payload, headers=auth_headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_list_books_keyset_pagination(client, auth_headers):
+    """after_id + limit walk the catalogue in ID order without overlap."""
+    ids = [_create(client, auth_headers, title=f"Book {i}")["id"] for i in range(5)]
+
+    first = client.get("/books", params={"limit": 2}).json()
+    assert [b["id"] for b in first] == ids[:2]
+
+    second = client.get("/books", params={"limit": 2, "after_id": first[-1]["id"]}).json()
+    assert [b["id"] for b in second] == ids[2:4]
+
+
+def test_list_books_total_count_header(client, auth_headers):
+    for i in range(3):
+        _create(client, auth_headers, title=f"Book {i}")
+
+    for mode in ("exact", "estimated"):
+        response = client.get("/books", params={"limit": 1, "count": mode})
+        assert response.headers["X-Total-Count"] == "3"
+        assert len(response.json()) == 1
+    assert "X-Total-Count" not in client.get("/books").headers
+    assert client.get("/books", params={"count": "bogus"}).status_code == 422
+
+
+def test_list_books_rejects_oversized_page(client):
+    response = client.get("/books", params={"limit": 100000})
+    assert response.status_code == 422
+
+
+def test_batch_get_returns_books_in_request_order(client, auth_headers):
+    """POST /books/batch-get and GET /books?ids= resolve many ids in one call."""
+    ids = [_create(client, auth_headers, title=f"Book {i}")["id"] for i in range(3)]
+    wanted = [ids[2], 999, ids[0]]
+
+    response = client.post("/books/batch-get", json={"ids": wanted})
+    assert response.status_code == 200
+    batch = response.json()
+    assert [b["id"] for b in batch["books"]] == [ids[2], ids[0]]
+    assert batch["missing"] == [999]
+
+    response = client.get("/books", params={"ids": ",".join(map(str, wanted))})
+    assert [b["id"] for b in response.json()] == [ids[2], ids[0]]
+    assert response.headers["X-Missing-Ids"] == "999"
+
+
+def test_batch_get_rejects_bad_ids(client):
+    assert client.get("/books", params={"ids": "1,x"}).status_code == 422
+    assert client.post("/books/batch-get", json={"ids": []}).status_code == 422
+    assert client.post("/books/batch-get", json={"ids": list(range(1001))}).status_code == 422
+
+
+def test_bulk_create_returns_books_in_order(client, auth_headers):
+    """POST /books/bulk creates every book in one request."""
+    payload = [
+        {"title": f"Bulk {i}", "author": "Bulk", "description": "d", "year": 2001, "genre": "drama"}
+        for i in range(3)
+    ]
+    response = client.post("/books/bulk", json=payload, headers=auth_headers)
+    assert response.status_code == 201
+    books = response.json()
+    assert [b["title"] for b in books] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    assert books[0]["genre"] == "Drama"
+    assert len(client.get("/books").json()) == 3
+
+
+def test_bulk_create_rejects_whole_batch_on_invalid_row(client, auth_headers):
+    payload = [
+        {"title": "Good", "author": "A", "description": "d", "year": 2001, "genre": "drama"},
+        {"title": "Bad", "author": "A", "description": "d", "year": 1500, "genre": "drama"},
+    ]
+    response = client.post("/books/bulk", json=payload, headers=auth_headers)
+    assert response.status_code == 422
+    assert client.get("/books").json() == []
@@ -0,0 +1,87 @@
+# filepath: book_service/tests/test_changes.py
+"""
+Tests for the change feed (/books/changes) and PUT /books/{id}.
+"""
+from book_service.app.dependencies import get_repository
+from book_service.app.main import app
+from book_service.app.memory_store import DurableBookRepository
+from book_service.app.models import BookCreate
+
+
+def _book(**overrides) -> dict:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_changes_record_create_update_delete_in_order(client, auth_headers):
+    """Every write appends a sequenced change with the book snapshot."""
+    book = client.post("/books", json=_book(title="Dune"), headers=auth_headers).json()
+    updated = client.put(f"/books/{book['id']}", json=_book(title="Dune Messiah"), headers=auth_headers)
+    assert updated.status_code == 200
+    assert updated.json()["title"] == "Dune Messiah"
+    client.delete(f"/books/{book['id']}")
+
+    page = client.get("/books/changes").json()
+    assert [c["op"] for c in page["changes"]] == ["create", "update", "delete"]
+    seqs = [c["seq"] for c in page["changes"]]
+    assert seqs == sorted(seqs)
+    assert page["changes"][1]["book"]["title"] == "Dune Messiah"
+    assert page["changes"][2]["book"] is None
+    assert page["next_since"] == seqs[-1]
+    assert page["has_more"] is False
+
+
+def test_changes_paging_with_since(client, auth_headers):
+    for i in range(5):
+        client.post("/books", json=_book(title=f"B{i}"), headers=auth_headers)
+
+    response = client.get("/books/changes", params={"limit": 2})
+    first = response.json()
+    assert len(first["changes"]) == 2
+    assert int(response.headers["X-Latest-Seq"]) == first["next_since"] + 3
+    assert first["has_more"] is True
+
+    rest = client.get("/books/changes", params={"since": first["next_since"], "limit": 10}).json()
+    assert [c["book"]["title"] for c in rest["changes"]] == ["B2", "B3", "B4"]
+    assert rest["has_more"] is False
+
+    empty = client.get("/books/changes", params={"since": rest["next_since"]}).json()
+    assert empty == {"changes": [], "next_since": rest["next_since"], "has_more": False}
+
+
+def test_changes_older_than_the_retained_history_are_gone(client, tmp_path):
+    repository = DurableBookRepository(tmp_path, retain_changes=2)
+    for i in range(5):
+        repository.create(BookCreate(**_book(title=f"B{i}")))
+    repository.snapshot()
+    app.dependency_overrides[get_repository] = lambda: repository
+    try:
+        gone = client.get("/books/changes", params={"since": 2})
+        kept = client.get("/books/changes", params={"since": 3}).json()
+    finally:
+        del app.dependency_overrides[get_repository]
+        repository.close()
+
+    assert gone.status_code == 410
+    assert gone.headers["X-Latest-Seq"] == "5"
+    assert [c["book"]["title"] for c in kept["changes"]] == ["B3", "B4"]
+
+
+def test_update_adjusts_stats(client, auth_headers):
+    book = client.post("/books", json=_book(genre="drama"), headers=auth_headers).json()
+    client.put(f"/books/{book['id']}", json=_book(genre="poetry"), headers=auth_headers)
+    stats = client.get("/books/stats").json()
+    assert stats["total"] == 1
+    assert stats["genre"] == {"Poetry": 1}
+
+
+def test_update_missing_book_returns_404(client, auth_headers):
+    response = client.put("/books/9999", json=_book(), headers=auth_headers)
+    assert response.status_code == 404
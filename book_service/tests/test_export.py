@@ -0,0 +1,72 @@
+# filepath: book_service/tests/test_export.py
+"""
+Tests for the Arrow IPC / Parquet catalogue export (/books/export).
+"""
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from book_service.app.export import COLUMNS, write_export  # noqa: E402
+from book_service.app.models import BookCreate  # noqa: E402
+from book_service.app.repository import BookRepository as MemoryRepository  # noqa: E402
+
+
+def _book(**overrides) -> dict:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def _seed(client, auth_headers) -> None:
+    client.post("/books", json=_book(title="Dune", author="Frank Herbert", year=1965, genre="sci-fi"), headers=auth_headers)
+    client.post("/books", json=_book(title="Emma", author="Jane Austen", year=1915, genre="romance"), headers=auth_headers)
+
+
+def test_arrow_export_is_typed_and_complete(client, auth_headers):
+    _seed(client, auth_headers)
+
+    response = client.get("/books/export", params={"format": "arrow"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+
+    assert table.column_names == list(COLUMNS)
+    assert table.schema.field("year").type == pa.int16()
+    assert pa.types.is_dictionary(table.schema.field("genre").type)
+    assert table.column("title").to_pylist() == ["Dune", "Emma"]
+
+
+def test_parquet_export_across_several_batches(client, auth_headers):
+    for i in range(250):
+        client.post("/books", json=_book(title=f"Book {i}", genre="even" if i % 2 else "odd"), headers=auth_headers)
+
+    response = client.get("/books/export", params={"format": "parquet", "compression": "none", "batch_size": 100})
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+
+    assert table.num_rows == 250
+    assert table.column("id").to_pylist() == sorted(table.column("id").to_pylist())
+    assert table.column("genre").to_pylist().count("Odd") == 125
+
+
+def test_write_export_to_file(tmp_path):
+    repository = MemoryRepository()
+    for year in (1950, 1960, 1970):
+        repository.create(BookCreate(**_book(year=year)))
+    path = tmp_path / "books.arrows"
+
+    assert write_export(repository.iter_batches(COLUMNS, batch_size=2), "arrow", str(path), compression="none") == 3
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_stream(source).read_all()
+    assert table.column("year").to_pylist() == [1950, 1960, 1970]
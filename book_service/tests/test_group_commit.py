@@ -0,0 +1,95 @@
+# filepath: book_service/tests/test_group_commit.py
+"""
+Tests for group-committed creates.
+"""
+import threading
+
+from sqlmodel import Session, select
+
+from book_service.app.group_commit import GroupCommitter
+from book_service.app.models import Book, BookChange, BookCreate
+from book_service.app.repository_db import BookRepository
+
+
+def _payload(title: str) -> BookCreate:
+    return BookCreate(title=title, author="Author", description="Desc", year=2000, genre="fiction")
+
+
+def _submit_concurrently(committer: GroupCommitter, titles: list[str]) -> dict[str, object]:
+    results: dict[str, object] = {}
+    barrier = threading.Barrier(len(titles))
+
+    def worker(title: str) -> None:
+        barrier.wait()
+        try:
+            results[title] = committer.submit(_payload(title), timeout=10)
+        except Exception as exc:
+            results[title] = exc
+
+    threads = [threading.Thread(target=worker, args=(title,)) for title in titles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_creates_share_transactions(engine):
+    """Every caller gets its own id while commits are shared across callers."""
+    committer = GroupCommitter(engine, max_batch=50, max_delay=0.05)
+    titles = [f"Book {i}" for i in range(20)]
+    try:
+        results = _submit_concurrently(committer, titles)
+    finally:
+        committer.close()
+
+    assert sorted(book.title for book in results.values()) == sorted(titles)
+    assert len({book.id for book in results.values()}) == len(titles)
+    assert committer.items == len(titles)
+    assert committer.batches < len(titles)
+
+    with Session(engine) as session:
+        assert len(session.exec(select(Book)).all()) == len(titles)
+        assert len(session.exec(select(BookChange)).all()) == len(titles)
+        assert BookRepository(session).stats().total == len(titles)
+
+
+def test_failing_create_only_fails_its_own_caller(engine, monkeypatch):
+    """A failed shared transaction is replayed so only the bad row errors."""
+    original = BookRepository._record_changes
+
+    def record_changes(self, op, records):
+        records = list(records)
+        if any(record.title == "Bad" for record in records):
+            raise RuntimeError("rejected")
+        original(self, op, records)
+
+    monkeypatch.setattr(BookRepository, "_record_changes", record_changes)
+    committer = GroupCommitter(engine, max_batch=50, max_delay=0.05)
+    try:
+        results = _submit_concurrently(committer, ["Good 1", "Bad", "Good 2"])
+    finally:
+        committer.close()
+
+    assert isinstance(results["Bad"], RuntimeError)
+    assert results["Good 1"].id is not None
+    assert results["Good 2"].id is not None
+    with Session(engine) as session:
+        titles = {book.title for book in session.exec(select(Book)).all()}
+    assert titles == {"Good 1", "Good 2"}
+
+
+def test_api_create_with_group_commit(client, auth_headers, monkeypatch):
+    """POST /books keeps its contract when group commit is switched on."""
+    from book_service.app.database import get_settings
+    from book_service.app.group_commit import shutdown_group_committers
+
+    monkeypatch.setattr(get_settings(), "group_commit_enabled", True)
+    try:
+        response = client.post("/books", json=_payload("Dune").model_dump(), headers=auth_headers)
+        assert response.status_code == 201
+        book = response.json()
+        assert client.get(f"/books/{book['id']}").json()["title"] == "Dune"
+        assert client.get("/metrics").json()["group_commit"]["items"] == 1
+    finally:
+        shutdown_group_committers()
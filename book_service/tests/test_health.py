@@ -0,0 +1,75 @@
+# filepath: book_service/tests/test_health.py
+"""
+Tests for /livez, /readyz and the background health monitor.
+"""
+import time
+
+from book_service.app.config import Settings
+from book_service.app.health import STALE_INTERVALS, HealthMonitor
+
+
+def _settings(**overrides) -> Settings:
+    values = {"db_mode": "sqlite", "admission_backend": "memory", "worker_queue_backend": "memory"}
+    values.update(overrides)
+    return Settings(**values)
+
+
+def test_livez_needs_no_dependencies(client):
+    response = client.get("/livez")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_serves_cached_report(client):
+    response = client.get("/readyz")
+    assert response.status_code in (200, 503)
+    assert "ready" in response.json()
+
+
+def test_monitor_reports_database_and_pool_without_using_the_pool(engine):
+    monitor = HealthMonitor(_settings(), app_engine=engine)
+    try:
+        assert monitor.readiness() == (False, {"ready": False, "reason": "starting"})
+
+        report = monitor.check_once()
+        assert report["ready"]
+        assert report["checks"]["database"]["ok"]
+        assert report["checks"]["pool"]["in_use"] == 0
+        assert engine.pool.checkedout() == 0
+
+        ready, body = monitor.readiness()
+        assert ready and "redis" not in body["checks"]
+
+        report["checked_at"] = time.time() - monitor.interval * (STALE_INTERVALS + 1)
+        ready, body = monitor.readiness()
+        assert not ready and body["reason"] == "monitor stalled"
+    finally:
+        monitor.stop()
+
+
+def test_monitor_reports_unreachable_redis(engine):
+    monitor = HealthMonitor(
+        _settings(admission_backend="redis", redis_url="redis://127.0.0.1:1/0", health_check_timeout=0.5),
+        app_engine=engine,
+    )
+    try:
+        report = monitor.check_once()
+        assert not report["ready"]
+        assert report["checks"]["redis"]["ok"] is False
+        assert report["checks"]["database"]["ok"]
+    finally:
+        monitor.stop()
+
+
+def test_monitor_reports_shared_catalogue_fill(engine, monkeypatch):
+    metrics = {"heap_fill": 0.95, "seq": 12, "oldest_seq": 4}
+    monkeypatch.setattr("book_service.app.health.memory_store_metrics", lambda: metrics)
+    monitor = HealthMonitor(_settings(db_mode="memory", memory_shared_path="/dev/shm/books"), app_engine=engine)
+    try:
+        report = monitor.check_once()
+        assert report["ready"]
+        assert report["checks"]["catalogue"] == {
+            "ok": True, "heap_fill": 0.95, "saturated": True, "seq": 12, "oldest_seq": 4
+        }
+    finally:
+        monitor.stop()
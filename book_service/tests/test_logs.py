@@ -0,0 +1,84 @@
+# filepath: book_service/tests/test_logs.py
+"""
+Tests for the queue-based JSON logging pipeline.
+"""
+import json
+import logging
+import threading
+import time
+
+from book_service.app.config import Settings
+from book_service.app.logs import LogPipeline, trace_id_var
+
+
+class _SlowSink(logging.Handler):
+    def __init__(self, delay: float = 0.0) -> None:
+        super().__init__()
+        self.delay = delay
+        self.lines: list[str] = []
+        self.gate = threading.Event()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay:
+            self.gate.wait(self.delay)
+        self.lines.append(self.format(record))
+
+
+def _logger(pipeline: LogPipeline, name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [pipeline.handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_json_records_carry_event_fields_and_trace_id():
+    sink = _SlowSink()
+    pipeline = LogPipeline(Settings(log_format="json"), sink=sink)
+    pipeline.start()
+    logger = _logger(pipeline, "test-logs-json")
+
+    token = trace_id_var.set("req-abc")
+    try:
+        logger.info("book.created id=%s title=%s", 7, "Dune Messiah")
+    finally:
+        trace_id_var.reset(token)
+    pipeline.stop()
+
+    entry = json.loads(sink.lines[0])
+    assert entry["event"] == "book.created"
+    assert entry["id"] == "7" and entry["title"] == "Dune Messiah"
+    assert entry["trace_id"] == "req-abc"
+
+
+def test_slow_sink_never_blocks_callers_and_overflow_is_counted():
+    sink = _SlowSink(delay=1.0)
+    pipeline = LogPipeline(Settings(log_queue_size=10), sink=sink)
+    pipeline.start()
+    logger = _logger(pipeline, "test-logs-slow")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        logger.info("book.read id=%s", i)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5  # a blocking sink would take 1000 s
+    assert pipeline.metrics()["dropped"] >= 1000 - 11
+    sink.gate.set()
+    pipeline.stop()
+
+
+def test_info_sampling_keeps_warnings():
+    sink = _SlowSink()
+    pipeline = LogPipeline(Settings(log_sample_rates={"book.read": 0.0}), sink=sink)
+    pipeline.start()
+    logger = _logger(pipeline, "test-logs-sampling")
+
+    for i in range(50):
+        logger.info("book.read id=%s", i)
+    logger.info("book.created id=1")
+    logger.warning("book.read id=2 slow")
+    pipeline.stop()
+
+    assert [json.loads(line)["event"] for line in sink.lines] == ["book.created", "book.read"]
+    assert pipeline.metrics()["sampled_out"] == 50
@@ -0,0 +1,149 @@
+# filepath: book_service/tests/test_memory_repository.py
+"""
+Tests for the compact in-memory record store.
+"""
+import threading
+
+from book_service.app.models import Book, BookCreate
+from book_service.app.repository import BookRecord, BookRepository
+
+
+def _payload(**overrides) -> BookCreate:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return BookCreate(**payload)
+
+
+def test_rows_are_compact_records_materialized_as_books():
+    repository = BookRepository()
+    created = repository.create(_payload(author="".join(["Frank", " Herbert"])))
+    repository.create(_payload(author="Frank Herbert"))
+
+    records = list(repository._items.values())
+    assert all(isinstance(record, BookRecord) for record in records)
+    assert not hasattr(records[0], "__dict__")
+    assert records[0].author is records[1].author  # interned
+    assert records[0].genre is records[1].genre
+
+    book = repository.get(created.id)
+    assert isinstance(book, Book)
+    assert book.model_dump() == created.model_dump()
+    book.title = "Changed"  # callers get their own objects
+    assert repository.get(created.id).title == "Book"
+
+
+def test_keyset_list_skips_deleted_ids_and_changes_keep_their_payload():
+    repository = BookRepository()
+    for i in range(10):
+        repository.create(_payload(title=f"Book {i}"))
+    for book_id in (3, 4, 5):
+        repository.delete(book_id)
+    repository.update(6, _payload(title="Renamed"))
+
+    page = repository.list(after_id=2, limit=3)
+    assert [book.id for book in page] == [6, 7, 8]
+    assert page[0].title == "Renamed"
+    assert [book.id for book in repository.list(skip=1, limit=2)] == [2, 6]
+
+    changes = repository.changes(since=10, limit=10)
+    assert [(change.seq, change.op, change.book_id) for change in changes] == [
+        (11, "delete", 3),
+        (12, "delete", 4),
+        (13, "delete", 5),
+        (14, "update", 6),
+    ]
+    assert changes[-1].book["title"] == "Renamed"
+    assert repository.changes(since=0, limit=1)[0].book["title"] == "Book 0"
+    assert repository.latest_seq() == 14
+
+
+def test_concurrent_writers_and_readers_keep_the_store_consistent():
+    repository = BookRepository()
+    errors: list[BaseException] = []
+    writing = threading.Event()
+
+    def write(n: int) -> None:
+        for i in range(500):
+            repository.create(_payload(title=f"w{n}-{i}", genre=f"g{i % 7}"))
+
+    def read() -> None:
+        while writing.is_set():
+            try:
+                repository.list(limit=50)
+                repository.search(title="w1")
+                repository.stats()
+            except BaseException as exc:  # e.g. "dictionary changed size during iteration"
+                errors.append(exc)
+                return
+
+    writing.set()
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writing.clear()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert len(repository) == 2000 and repository.latest_seq() == 2000
+    assert sum(repository.stats().genre.values()) == 2000
+    assert sorted(book.id for book in repository.list(limit=5000)) == list(range(1, 2001))
+
+
+def test_batches_are_a_snapshot_taken_when_the_scan_starts():
+    repository = BookRepository()
+    for i in range(5):
+        repository.create(_payload(title=f"b{i}"))
+
+    batches = repository.iter_batches(["id", "title"], batch_size=2)
+    first = next(batches)
+    repository.delete(4)
+    repository.create(_payload(title="late"))
+
+    assert first == [(1, "b0"), (2, "b1")]
+    assert list(batches) == [[(3, "b2"), (4, "b3")], [(5, "b4")]]
+    assert [book.id for book in repository.get_many([4, 6, 5])] == [6, 5]
+
+
+def test_create_many_is_one_contiguous_step():
+    repository = BookRepository()
+    errors, seen = [], []
+
+    def write_batches() -> None:
+        for i in range(100):
+            books = repository.create_many([_payload(title=f"Batch {i}.{n}") for n in range(5)])
+            ids = [book.id for book in books]
+            if ids != list(range(ids[0], ids[0] + 5)):
+                errors.append(ids)
+
+    def write_singles() -> None:
+        for i in range(300):
+            repository.create(_payload(title=f"Single {i}"))
+
+    def read() -> None:
+        while any(thread.is_alive() for thread in writers):
+            seen.append(len([book for book in repository.list(limit=10_000) if book.title.startswith("Batch")]))
+
+    writers = [threading.Thread(target=write_batches), threading.Thread(target=write_singles)]
+    reader = threading.Thread(target=read)
+    for thread in writers + [reader]:
+        thread.start()
+    for thread in writers + [reader]:
+        thread.join()
+
+    assert errors == []
+    assert all(count % 5 == 0 for count in seen)  # never part of a batch
+    changes = repository.changes(limit=10_000)
+    for start, change in enumerate(changes):
+        if change.book["title"].endswith(".0"):
+            run = changes[start : start + 5]
+            assert [c.book["title"].rsplit(".", 1)[0] for c in run] == [change.book["title"][:-2]] * 5
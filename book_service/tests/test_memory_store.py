@@ -0,0 +1,142 @@
+# filepath: book_service/tests/test_memory_store.py
+"""
+Tests for durable memory mode (snapshot + append-only log).
+"""
+import threading
+
+import pytest
+
+from book_service.app.feed_index import ChangesExpired
+from book_service.app.memory_store import DurableBookRepository, StoreError
+from book_service.app.models import BookCreate
+
+
+def _payload(**overrides) -> BookCreate:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return BookCreate(**payload)
+
+
+def _crash(repository: DurableBookRepository) -> None:
+    """Drop the repository without the final snapshot close() would write."""
+    repository._log.close()
+    repository._lock_file.close()
+
+
+def test_writes_survive_restart_from_snapshot_and_log(tmp_path):
+    repository = DurableBookRepository(tmp_path)
+    for i in range(5):
+        repository.create(_payload(title=f"Book {i}", author="Frank Herbert" if i % 2 else "Jane Austen"))
+    repository.delete(2)
+    assert repository.snapshot() is True
+    assert repository.snapshot() is False  # nothing new
+    repository.update(1, _payload(title="Dune"))
+    repository.create(_payload(title="After snapshot", description="line\x00with NUL"))
+    expected = (repository.list(), repository.stats(), repository.latest_seq())
+    _crash(repository)
+
+    reopened = DurableBookRepository(tmp_path)
+    assert (reopened.list(), reopened.stats(), reopened.latest_seq()) == expected
+    assert [(change.seq, change.op) for change in reopened.changes(since=6)] == [(7, "update"), (8, "create")]
+    assert reopened.create(_payload()).id == 7
+    reopened.close()
+
+    restarted = DurableBookRepository(tmp_path)
+    assert restarted.get(6).description == "line\x00with NUL"
+    assert restarted.latest_seq() == 9
+    assert [path.name for path in tmp_path.glob("wal-*.log")] == ["wal-00000001.log"]
+    restarted.close()
+
+
+def test_change_history_is_trimmed_and_expired_sinces_raise(tmp_path):
+    repository = DurableBookRepository(tmp_path, retain_changes=3)
+    for i in range(5):
+        repository.create(_payload(title=f"Book {i}"))
+    assert len(repository.changes(since=0)) == 5  # nothing trimmed before a snapshot
+    repository.snapshot()
+    assert [change.seq for change in repository.changes(since=2)] == [3, 4, 5]
+    with pytest.raises(ChangesExpired):
+        repository.changes(since=1)
+    repository.create(_payload(title="After snapshot"))
+    repository.close()
+
+    reopened = DurableBookRepository(tmp_path, readonly=True)
+    assert reopened.metrics()["oldest_seq"] == 6  # only the final snapshot survives
+    assert reopened.changes(since=6) == []
+    with pytest.raises(ChangesExpired):
+        reopened.changes(since=5)
+
+
+def test_a_batch_is_logged_as_one_frame(tmp_path):
+    repository = DurableBookRepository(tmp_path)
+    repository.create(_payload(title="Single"))
+    books = repository.create_many([_payload(title=f"Batch {i}") for i in range(3)])
+    assert [book.id for book in books] == [2, 3, 4]
+    _crash(repository)
+
+    reopened = DurableBookRepository(tmp_path)
+    assert [(change.seq, change.book_id) for change in reopened.changes()] == [(1, 1), (2, 2), (3, 3), (4, 4)]
+    _crash(reopened)
+
+    log = tmp_path / "wal-00000001.log"
+    log.write_bytes(log.read_bytes()[:-1])  # tear the batch frame
+    torn = DurableBookRepository(tmp_path)
+    assert [book.title for book in torn.list()] == ["Single"]
+    torn.close()
+
+
+def test_torn_log_tail_is_dropped_and_directory_is_exclusive(tmp_path):
+    repository = DurableBookRepository(tmp_path)
+    repository.create(_payload(title="Kept"))
+    with pytest.raises(StoreError):
+        DurableBookRepository(tmp_path)
+    repository._log.write(b"\x40\x00\x00\x00garbage")  # half-written frame
+    _crash(repository)
+
+    reopened = DurableBookRepository(tmp_path)
+    assert [book.title for book in reopened.list()] == ["Kept"]
+    reopened.delete_all()
+    reopened.close()
+
+    readonly = DurableBookRepository(tmp_path, readonly=True)
+    assert len(readonly) == 0 and readonly.latest_seq() == 2
+    with pytest.raises(StoreError):
+        readonly.create(_payload())
+
+
+def test_reads_and_snapshots_run_alongside_writes(tmp_path):
+    repository = DurableBookRepository(tmp_path)
+    errors = []
+
+    def write() -> None:
+        for i in range(300):
+            repository.create(_payload(title=f"Book {i}", genre=f"genre {i % 7}"))
+
+    def read(snapshot: bool) -> None:
+        try:
+            while any(writer.is_alive() for writer in writers):
+                repository.list(limit=50)
+                repository.search(title="Book 1")
+                repository.stats()
+                if snapshot:  # one compactor, as in start_compaction
+                    repository.snapshot()
+        except Exception as exc:  # pragma: no cover - the failure being tested
+            errors.append(exc)
+
+    writers = [threading.Thread(target=write) for _ in range(3)]
+    readers = [threading.Thread(target=read, args=(snapshot,)) for snapshot in (True, False)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers + readers:
+        thread.join()
+
+    assert errors == []
+    assert len(repository) == 900 and sum(repository.stats().genre.values()) == 900
+    repository.close()
+    assert len(DurableBookRepository(tmp_path, readonly=True)) == 900
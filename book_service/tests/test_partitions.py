@@ -0,0 +1,68 @@
+# filepath: book_service/tests/test_partitions.py
+"""
+Tests for the year-range partition layout (the DDL itself needs Postgres).
+"""
+import pytest
+from sqlalchemy import text
+
+from book_service.app import partitions
+from book_service.app.partitions import YEAR_MAX, YEAR_MIN, partition_ranges
+
+
+def test_partition_ranges_cover_every_valid_year_once():
+    ranges = partition_ranges(10)
+
+    assert ranges[0] == ("books_y1900", 1900, 1910)
+    assert ranges[-1] == ("books_y2100", 2100, 2110)
+    for year in range(YEAR_MIN, YEAR_MAX + 1):
+        assert sum(lo <= year < hi for _, lo, hi in ranges) == 1
+
+
+def test_partition_ranges_align_to_span():
+    assert partition_ranges(25, first=1990, last=2030) == [
+        ("books_y1975", 1975, 2000),
+        ("books_y2000", 2000, 2025),
+        ("books_y2025", 2025, 2050),
+    ]
+
+
+def _add_book(connection, title: str, year: int) -> None:
+    connection.execute(
+        text("INSERT INTO books (title, author, description, year, genre) VALUES (:title, 'A', '', :year, 'G')"),
+        {"title": title, "year": year},
+    )
+
+
+@pytest.mark.postgres
+def test_online_partitioning_copies_mirrors_and_swaps(pg_engine):
+    with pg_engine.begin() as connection:
+        for n in range(5):
+            _add_book(connection, f"old {n}", 1950 + 20 * n)
+        partitions.create_shadow(connection)
+        partitions.install_mirror(connection)
+
+    after_id = 0
+    with pg_engine.begin() as connection:
+        after_id = partitions.copy_batch(connection, after_id, 2)
+    with pg_engine.begin() as connection:  # written mid-copy: replayed by the trigger
+        _add_book(connection, "live", 2001)
+        connection.execute(text("UPDATE books SET year = 1999 WHERE title = 'old 0'"))
+    with pg_engine.begin() as connection:
+        with pytest.raises(RuntimeError, match="copy not finished"):
+            partitions.swap(connection)
+    while after_id is not None:
+        with pg_engine.begin() as connection:
+            after_id = partitions.copy_batch(connection, after_id, 2)
+
+    with pg_engine.begin() as connection:
+        partitions.swap(connection)
+
+    with pg_engine.begin() as connection:
+        assert partitions.is_partitioned(connection)
+        assert partitions.table_exists(connection, partitions.RETIRED)
+        rows = dict(connection.execute(text("SELECT title, year FROM books")).all())
+        assert len(rows) == 6 and rows["old 0"] == 1999 and rows["live"] == 2001
+        in_nineties = connection.execute(text("SELECT title FROM books_y1990")).scalars().all()
+        assert in_nineties == ["old 0"]
+        _add_book(connection, "after swap", 2020)  # the id sequence moved with the table
+        assert connection.execute(text("SELECT count(*) FROM books")).scalar() == 7
@@ -0,0 +1,65 @@
+# filepath: book_service/tests/test_profiling.py
+"""
+Tests for header-triggered request profiling and the admin endpoints.
+"""
+import time
+
+import pytest
+
+from book_service.app.config import Settings
+from book_service.app.database import get_settings
+from book_service.app.main import app
+from book_service.app.profiling import StackSampler
+from book_service.app.security import create_access_token
+
+
+@pytest.fixture(name="profiling")
+def profiling_fixture(tmp_path, monkeypatch):
+    settings = Settings(profile_enabled=True, profile_dir=str(tmp_path / "profiles"), profile_interval_ms=1.0)
+    monkeypatch.setattr("book_service.app.main.get_settings", lambda: settings)  # middleware
+    app.dependency_overrides[get_settings] = lambda: settings  # endpoints
+    yield settings
+    app.dependency_overrides.pop(get_settings, None)
+
+
+def _headers(*roles: str) -> dict[str, str]:
+    token = create_access_token(subject="ops", roles=list(roles), settings=Settings())
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_sampler_folds_busy_thread_stacks():
+    def spin():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    sampler = StackSampler(0.001).start()
+    spin()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert any("spin" in stack for stack in sampler.stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in sampler.folded().splitlines())
+
+
+def test_x_profile_needs_admin_token(client, profiling):
+    response = client.get("/books", headers={"X-Profile": "1", **_headers("editor")})
+    assert "X-Profile-Id" not in response.headers
+
+    response = client.get("/books", headers={"X-Profile": "1", "X-Trace-Id": "slow-list", **_headers("admin")})
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Id"] == "slow-list"
+
+    listed = client.get("/admin/profiles", headers=_headers("admin")).json()
+    assert [entry["trace_id"] for entry in listed] == ["slow-list"]
+    assert listed[0]["path"] == "/books"
+
+    download = client.get("/admin/profiles/slow-list", headers=_headers("admin"))
+    assert download.status_code == 200
+    assert client.get("/admin/profiles/slow-list", headers=_headers("editor")).status_code == 403
+    assert client.get("/admin/profiles/..%2Fsecret", headers=_headers("admin")).status_code == 404
+
+
+def test_profiling_rides_on_the_trace_id_middleware():
+    names = {getattr(middleware.kwargs.get("dispatch"), "__name__", None) for middleware in app.user_middleware}
+    assert "add_trace_id" in names and "profile_requests" not in names
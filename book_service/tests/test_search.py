@@ -0,0 +1,181 @@
+# filepath: book_service/tests/test_search.py
+"""
+Tests for /books/search, including the fuzzy in-memory index.
+"""
+from book_service.app.memory_store import DurableBookRepository
+from book_service.app.models import BookCreate
+from book_service.app.repository import BookRepository as MemoryRepository
+from book_service.app.search_index import (
+    FuzzyIndex,
+    PrefixIndex,
+    SearchIndex,
+    bounded_edit_distance,
+    normalize,
+)
+
+
+def _book(**overrides) -> dict:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_bounded_edit_distance():
+    assert bounded_edit_distance("tolkein", "tolkien", 2) == 1  # transposition
+    assert bounded_edit_distance("herbrt", "herbert", 2) == 1
+    assert bounded_edit_distance("dune", "dune", 0) == 0
+    assert bounded_edit_distance("kitten", "sitting", 2) is None
+    assert normalize("Brontë, Émily") == ["bronte", "emily"]
+
+
+def test_fuzzy_index_ranks_closest_first_and_forgets_removed_books():
+    index = FuzzyIndex()
+    index.add(1, "J. R. R. Tolkien")
+    index.add(2, "Christopher Tolkien")
+    index.add(3, "Frank Herbert")
+
+    assert set(index.search("Tolkein")) == {1, 2}
+    assert set(index.search("christopher tolkein")) == {2}
+    scores = index.search("herbert")
+    assert scores == {3: 1.0}
+    assert index.search("Herbrt")[3] < 1.0
+
+    index.remove(3)
+    assert index.search("herbert") == {}
+    assert len(index) == 2
+
+
+def test_search_index_follows_memory_repository_changes():
+    repository = MemoryRepository()
+    dune = repository.create(BookCreate(**_book(title="Dune", author="Frank Herbert")))
+    index = SearchIndex()
+    assert index.build(repository) == 1
+
+    repository.create(BookCreate(**_book(title="The Hobbit", author="J.R.R. Tolkien")))
+    repository.delete(dune.id)
+    index.catch_up(repository)
+
+    assert index.search(author="Herbrt") == []
+    assert len(index.search(title="Hobit", author="Tolkein")) == 1
+
+
+def test_search_index_rebuilds_when_its_changes_are_gone(tmp_path):
+    repository = DurableBookRepository(tmp_path, retain_changes=1)
+    dune = repository.create(BookCreate(**_book(title="Dune", author="Frank Herbert")))
+    index = SearchIndex()
+    index.build(repository)
+
+    repository.create(BookCreate(**_book(title="The Hobbit", author="J.R.R. Tolkien")))
+    repository.delete(dune.id)
+    repository.snapshot()  # keeps only the delete
+    index.catch_up(repository)
+
+    assert index.search(author="Herbrt") == []
+    assert len(index.search(title="Hobit", author="Tolkein")) == 1
+    assert index.seq == repository.latest_seq()
+    repository.close()
+
+
+def test_plain_search_route_is_reachable(client, auth_headers):
+    """/books/search is not swallowed by /books/{book_id}."""
+    client.post("/books", json=_book(title="Dune", author="Frank Herbert"), headers=auth_headers)
+    client.post("/books", json=_book(title="Emma", author="Jane Austen"), headers=auth_headers)
+
+    response = client.get("/books/search", params={"author": "herbert"})
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Dune"]
+
+
+def test_search_by_year_range(client, auth_headers):
+    for title, year in (("Emma", 1815), ("Dune", 1965), ("Neuromancer", 1984), ("Klara", 2021)):
+        client.post("/books", json=_book(title=title, year=year), headers=auth_headers)
+
+    response = client.get("/books/search", params={"year_from": 1960, "year_to": 1984})
+    assert sorted(book["title"] for book in response.json()) == ["Dune", "Neuromancer"]
+    response = client.get("/books/search", params={"year_from": 2000})
+    assert [book["title"] for book in response.json()] == ["Klara"]
+
+
+def test_memory_search_by_year_range():
+    repository = MemoryRepository()
+    for year in (1950, 1960, 1970):
+        repository.create(BookCreate(**_book(year=year)))
+
+    assert [book.year for book in repository.search(year_from=1955, year_to=1970)] == [1960, 1970]
+
+
+def test_fuzzy_search_tolerates_typos_and_follows_writes(client, auth_headers):
+    hobbit = client.post(
+        "/books", json=_book(title="The Hobbit", author="J. R. R. Tolkien", year=1937), headers=auth_headers
+    ).json()
+    client.post("/books", json=_book(title="Dune", author="Frank Herbert", year=1965), headers=auth_headers)
+
+    found = client.get("/books/search", params={"author": "Tolkein", "fuzzy": True}).json()
+    assert [book["id"] for book in found] == [hobbit["id"]]
+    assert client.get("/books/search", params={"title": "dnue", "fuzzy": True}).json()[0]["title"] == "Dune"
+    assert client.get("/books/search", params={"author": "Herbrt", "year": 1937, "fuzzy": True}).json() == []
+
+    # Writes committed in this process are visible to the next fuzzy query.
+    client.put(f"/books/{hobbit['id']}", json=_book(title="The Silmarillion", author="J. R. R. Tolkien"), headers=auth_headers)
+    assert client.get("/books/search", params={"title": "hobbit", "fuzzy": True}).json() == []
+    client.delete(f"/books/{hobbit['id']}")
+    assert client.get("/books/search", params={"author": "tolkien", "fuzzy": True}).json() == []
+
+
+def test_fuzzy_search_requires_title_or_author(client):
+    response = client.get("/books/search", params={"genre": "fiction", "fuzzy": True})
+    assert response.status_code == 422
+
+
+def test_prefix_index_ranks_by_book_count_and_updates_incrementally():
+    index = PrefixIndex()
+    index.add(1, "Terry Pratchett")
+    index.add(2, "Terry Pratchett")
+    index.add(3, "Terry Goodkind")
+    index.add(4, "Tolkien")
+
+    assert index.suggest("t") == [("Terry Pratchett", 2), ("Terry Goodkind", 1), ("Tolkien", 1)]
+    assert index.suggest("TERRY g") == [("Terry Goodkind", 1)]
+    assert index.suggest("t", limit=1) == [("Terry Pratchett", 2)]
+
+    index.remove(1)
+    index.remove(2)
+    assert index.suggest("te") == [("Terry Goodkind", 1)]
+    assert len(index) == 2
+    assert index.memory_bytes() > 0
+
+
+def test_prefix_index_bulk_load_and_long_prefix_cache():
+    index = PrefixIndex()
+    index.start_bulk()
+    for book_id, title in enumerate(["Dune Messiah", "Dune", "Emma", "Dune", "Dune Messiah", "Dune"], 1):
+        index.add(book_id, title)
+    index.finish_bulk()
+    assert index.suggest("dune") == [("Dune", 3), ("Dune Messiah", 2)]
+    assert index.suggest("em") == [("Emma", 1)]
+
+    # Cached for any prefix length, and dropped when a value under it changes.
+    assert index.suggest("dune m") == [("Dune Messiah", 2)]
+    index.add(7, "Dune Mammoth")
+    assert index.suggest("dune m") == [("Dune Messiah", 2), ("Dune Mammoth", 1)]
+    index.remove(1)
+    index.remove(5)
+    assert index.suggest("dune m") == [("Dune Mammoth", 1)]
+
+
+def test_suggest_endpoint(client, auth_headers):
+    client.post("/books", json=_book(title="Dune", author="Frank Herbert"), headers=auth_headers)
+    client.post("/books", json=_book(title="Dune Messiah", author="Frank Herbert"), headers=auth_headers)
+    client.post("/books", json=_book(title="Emma", author="Jane Austen"), headers=auth_headers)
+
+    titles = client.get("/books/suggest", params={"prefix": "du"}).json()
+    assert titles == [{"value": "Dune", "count": 1}, {"value": "Dune Messiah", "count": 1}]
+    authors = client.get("/books/suggest", params={"prefix": "f", "field": "author"}).json()
+    assert authors == [{"value": "Frank Herbert", "count": 2}]
+    assert client.get("/books/suggest", params={"prefix": "x", "field": "genre"}).status_code == 422
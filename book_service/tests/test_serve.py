@@ -0,0 +1,34 @@
+# filepath: book_service/tests/test_serve.py
+"""
+Tests for the multi-process launcher's settings checks.
+"""
+import pytest
+
+pytest.importorskip("gunicorn")
+
+from book_service.app.config import Settings
+from book_service.serve import check_settings, worker_count
+
+
+def test_worker_count_defaults_to_cores(monkeypatch):
+    monkeypatch.setattr("book_service.serve.os.cpu_count", lambda: 6)
+
+    assert worker_count(Settings(web_workers=0)) == 6
+    assert worker_count(Settings(web_workers=3)) == 3
+
+
+def test_memory_mode_needs_shared_catalogue_for_several_workers(tmp_path):
+    settings = Settings(db_mode="memory", memory_shared_path=None, web_max_requests=0)
+
+    check_settings(settings, 1)
+    with pytest.raises(SystemExit):
+        check_settings(settings, 2)
+    check_settings(Settings(db_mode="memory", memory_shared_path=str(tmp_path / "catalogue")), 4)
+
+
+def test_plain_memory_mode_refuses_worker_recycling(tmp_path):
+    with pytest.raises(SystemExit):
+        check_settings(Settings(db_mode="memory", memory_shared_path=None, memory_data_dir=None), 1)
+
+    check_settings(Settings(db_mode="memory", memory_shared_path=None, memory_data_dir=str(tmp_path)), 1)
+    check_settings(Settings(db_mode="sqlite"), 1)
@@ -0,0 +1,142 @@
+# filepath: book_service/tests/test_shards.py
+"""
+Tests for token-fenced leases and the sharded catalogue refresh.
+"""
+import asyncio
+
+import pytest
+from sqlmodel import select
+
+from book_service.app.models import Book, BookChange
+from book_service.app.repository_db import BookRepository, StaleFence
+from book_service.worker.leases import InMemoryLeaseStore, LeaseKeeper, LeaseLost
+from book_service.worker.shards import plan_shards, run_sharded
+
+
+def test_plan_shards_covers_id_range():
+    assert plan_shards(1, 25, 10) == [(1, 11), (11, 21), (21, 26)]
+    assert plan_shards(None, None, 10) == []
+
+
+@pytest.mark.anyio
+async def test_stale_holder_cannot_release_or_renew_new_lease():
+    store = InMemoryLeaseStore()
+    old = await store.acquire("k", ttl=0.01)
+    await asyncio.sleep(0.02)
+    new = await store.acquire("k", ttl=10)
+
+    assert new.fence > old.fence
+    assert await store.release(old) is False
+    assert await store.renew(old, 10) is False
+    assert await store.is_held(new)
+
+
+@pytest.mark.anyio
+async def test_replicas_process_each_shard_exactly_once():
+    store = InMemoryLeaseStore()
+    shards = plan_shards(1, 100, 10)
+    seen = []
+
+    def participant(name):
+        async def handle(lo, hi, keeper):
+            await asyncio.sleep(0.01)
+            seen.append((name, lo))
+        return handle
+
+    results = await asyncio.gather(
+        run_sharded(store, "run", shards, participant("a"), parallelism=2, poll_interval=0.01),
+        run_sharded(store, "run", shards, participant("b"), parallelism=2, poll_interval=0.01),
+    )
+
+    assert sorted(lo for _, lo in seen) == [lo for lo, _ in shards]
+    assert sum(results) == len(shards)
+    assert all(count > 0 for count in results)
+
+
+@pytest.mark.anyio
+async def test_shard_of_crashed_worker_is_reclaimed():
+    store = InMemoryLeaseStore()
+    shards = plan_shards(1, 30, 10)
+    # A worker grabbed shard 0 and died without releasing it.
+    await store.acquire("run:shard:0", ttl=0.1)
+    processed = []
+
+    async def handle(lo, hi, keeper):
+        processed.append(lo)
+
+    await run_sharded(store, "run", shards, handle, parallelism=1, lease_ttl=1, poll_interval=0.02)
+    assert sorted(processed) == [1, 11, 21]
+
+
+@pytest.mark.anyio
+async def test_keeper_reports_lost_lease():
+    store = InMemoryLeaseStore()
+    lease = await store.acquire("k", ttl=0.03)
+    async with LeaseKeeper(store, lease, 0.03) as keeper:
+        # Someone forcibly took the key (e.g. after a long GC pause).
+        store._leases["k"] = ("intruder", float("inf"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(LeaseLost):
+            keeper.check()
+
+
+@pytest.mark.anyio
+async def test_failing_slot_cancels_its_siblings():
+    store = InMemoryLeaseStore()
+    shards = plan_shards(1, 20, 10)
+    cancelled = []
+
+    async def handle(lo, hi, keeper):
+        if lo == 1:
+            await asyncio.sleep(0.01)
+            raise ValueError("bad shard")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(lo)
+            raise
+
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(run_sharded(store, "run", shards, handle, parallelism=2), 2)
+    assert cancelled == [11]
+    assert await store.acquire("run:shard:1", 1) is not None  # its lease was released
+
+
+def test_refresh_range_normalizes_legacy_rows(session):
+    session.add(Book(title="  dune ", author="Frank Herbert ", description="d", year=1965, genre="sci-fi"))
+    session.add(Book(title="Emma", author="Jane Austen", description="d", year=1915, genre="Romance"))
+    session.commit()
+    repo = BookRepository(session)
+
+    assert repo.refresh_range(1, 3) == 1
+    dune = repo.get(1)
+    assert (dune.title, dune.author, dune.genre) == ("dune", "Frank Herbert", "Sci-Fi")
+    changes = session.exec(select(BookChange)).all()
+    assert [(c.book_id, c.op) for c in changes] == [(1, "update")]
+
+
+def test_refresh_range_aborts_when_guard_fails(session):
+    session.add(Book(title="x", author="y", description="d", year=2000, genre="drama"))
+    session.commit()
+
+    def lost():
+        raise LeaseLost("gone")
+
+    with pytest.raises(LeaseLost):
+        BookRepository(session).refresh_range(1, 2, before_commit=lost)
+    assert BookRepository(session).get(1).genre == "drama"
+
+
+def test_refresh_range_rejects_a_stale_fence(session):
+    session.add(Book(title="x", author="y", description="d", year=2000, genre="drama"))
+    session.commit()
+    repo = BookRepository(session)
+
+    # The new holder (fence 2) committed while the old one (fence 1) was paused.
+    session.add(Book(title="z", author="y", description="d", year=2000, genre="drama"))
+    session.commit()
+    assert repo.refresh_range(2, 3, fence=("run:shard:0", 2)) == 1
+    with pytest.raises(StaleFence):
+        repo.refresh_range(1, 2, fence=("run:shard:0", 1))
+    assert repo.get(1).genre == "drama"
+    assert repo.refresh_range(1, 2, fence=("run:shard:0", 3)) == 1
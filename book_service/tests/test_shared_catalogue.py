@@ -0,0 +1,154 @@
+# filepath: book_service/tests/test_shared_catalogue.py
+"""
+Tests for the shared-memory catalogue used by multi-worker memory mode.
+"""
+import multiprocessing
+import os
+
+import pytest
+
+from book_service.app import shared_catalogue
+from book_service.app.feed_index import ChangesExpired
+from book_service.app.models import BookCreate
+from book_service.app.shared_catalogue import SharedBookRepository, SharedCatalogueError
+
+
+def _payload(**overrides) -> BookCreate:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return BookCreate(**payload)
+
+
+def _open(path) -> SharedBookRepository:
+    return SharedBookRepository(path, max_books=1000, heap_mb=1)
+
+
+def _write_books(path, count: int) -> None:
+    repository = _open(path)
+    for i in range(count):
+        repository.create(_payload(title=f"Child {i}", author="Child"))
+    repository.close()
+
+
+def test_workers_share_one_catalogue(tmp_path):
+    path = tmp_path / "catalogue"
+    first, second = _open(path), _open(path)
+
+    dune = first.create(_payload(title="Dune", author="Frank Herbert"))
+    assert second.get(dune.id).title == "Dune"
+    second.update(dune.id, _payload(title="Dune Messiah", author="Frank Herbert"))
+    emma = second.create(_payload(title="Emma", author="Jane Austen"))
+    first.delete(emma.id)
+
+    assert [book.title for book in first.list()] == ["Dune Messiah"]
+    assert [(change.seq, change.op) for change in first.changes()] == [
+        (1, "create"),
+        (2, "update"),
+        (3, "create"),
+        (4, "delete"),
+    ]
+    assert first.stats().author == {"Frank Herbert": 1}
+    assert second.stats().author == {"Frank Herbert": 1}
+    assert [book.id for book in second.search(author="herbert")] == [dune.id]
+    assert len(second) == 1
+
+
+def test_writes_from_other_processes_are_serialized(tmp_path):
+    path = tmp_path / "catalogue"
+    repository = _open(path)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_books, args=(path, 50)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    books = repository.list(limit=1000)
+    assert [book.id for book in books] == list(range(1, 151))
+    assert repository.latest_seq() == 150
+    assert repository.stats().total == 150
+
+
+def test_capacity_is_enforced(tmp_path):
+    repository = SharedBookRepository(tmp_path / "catalogue", max_books=2, heap_mb=1)
+    repository.create(_payload())
+    repository.create(_payload())
+    with pytest.raises(SharedCatalogueError):
+        repository.create(_payload())
+
+
+def test_create_many_publishes_the_batch_at_once(tmp_path):
+    repository = _open(tmp_path / "catalogue")
+    repository.create(_payload(title="Single"))
+    books = repository.create_many([_payload(title=f"Batch {i}") for i in range(3)])
+    assert [book.id for book in books] == [2, 3, 4]
+    assert [(change.seq, change.book_id, change.op) for change in repository.changes(since=1)] == [
+        (2, 2, "create"), (3, 3, "create"), (4, 4, "create")
+    ]
+    assert len(repository) == 4 and repository.stats().total == 4
+    with pytest.raises(SharedCatalogueError):
+        SharedBookRepository(tmp_path / "small", max_books=2, heap_mb=1).create_many([_payload()] * 3)
+
+
+def _die_mid_publish(path) -> None:
+    """Start publishing a create like SharedBookRepository._publish, then get killed."""
+    repository = _open(path)
+    with repository._write_lock():
+        header = repository._header
+        book_id, seq = header[shared_catalogue._H_NEXT_ID], header[shared_catalogue._H_SEQ]
+        offset = repository._append_record(shared_catalogue.BookRecord.from_payload(_payload(title="Half")))
+        header[shared_catalogue._H_NEXT_ID] = book_id + 1
+        header[shared_catalogue._H_VERSION] += 1
+        repository._changes[seq * 3], repository._changes[seq * 3 + 1], repository._changes[seq * 3 + 2] = book_id, offset, 0
+        header[shared_catalogue._H_PUBLISHING] = seq + 1
+        os._exit(1)  # version left odd; the kernel releases the flock
+
+
+def test_writer_killed_mid_publish_is_repaired(tmp_path):
+    path = tmp_path / "catalogue"
+    repository = _open(path)
+    repository.create(_payload(title="Dune"))
+    child = multiprocessing.get_context("fork").Process(target=_die_mid_publish, args=(path,))
+    child.start()
+    child.join()
+    assert repository._header[shared_catalogue._H_VERSION] & 1
+
+    # Readers give up spinning, take the lock and get the finished publish.
+    assert [book.title for book in repository.list()] == ["Dune", "Half"]
+    assert repository._header[shared_catalogue._H_VERSION] % 2 == 0
+    assert repository.metrics()["repairs"] == 1
+    assert len(repository) == 2 and repository.latest_seq() == 2
+
+    emma = repository.create(_payload(title="Emma"))
+    assert repository._header[shared_catalogue._H_VERSION] % 2 == 0
+    assert [book.id for book in repository.list()][-1] == emma.id
+    assert [change.op for change in repository.changes()] == ["create", "create", "create"]
+
+
+def test_change_feed_is_a_ring(tmp_path):
+    path = tmp_path / "catalogue"
+    repository = SharedBookRepository(path, max_books=100, heap_mb=1, max_changes=4)
+    books = [repository.create(_payload(genre="drama" if i % 2 else "poetry")) for i in range(5)]
+    repository.update(books[0].id, _payload(genre="drama"))
+    repository.delete(books[1].id)
+
+    with pytest.raises(ChangesExpired):
+        repository.changes(since=2)
+    assert [(change.seq, change.op) for change in repository.changes(since=3)] == [
+        (4, "create"), (5, "create"), (6, "update"), (7, "delete")
+    ]
+    assert repository.metrics()["oldest_seq"] == 3
+
+    # A process that starts after the ring wrapped counts the live books instead.
+    other = SharedBookRepository(path)
+    assert other.stats() == repository.stats()
+    assert other.stats().genre == {"Drama": 2, "Poetry": 2}
+    for _ in range(10):
+        repository.create(_payload(genre="poetry"))
+    assert other.stats().genre == {"Drama": 2, "Poetry": 12}
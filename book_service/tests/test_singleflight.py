@@ -0,0 +1,98 @@
+# filepath: book_service/tests/test_singleflight.py
+"""
+Tests for request coalescing of identical concurrent reads.
+"""
+import threading
+
+import pytest
+
+from book_service.app.singleflight import SingleFlight, SingleFlightRepository
+
+
+def _run_concurrently(count: int, target) -> list:
+    results: list = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i: int) -> None:
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = threading.Event()
+
+    def slow_query():
+        nonlocal calls
+        calls += 1
+        release.wait(timeout=5)
+        return ["book"]
+
+    def caller():
+        return flight.do(("get", 1), slow_query)
+
+    threading.Timer(0.1, release.set).start()
+    results = _run_concurrently(8, caller)
+
+    assert calls == 1
+    assert all(result == ["book"] for result in results)
+    assert flight.metrics() == {"get": {"leaders": 1, "coalesced": 7}}
+    # Nothing is cached once the flight lands.
+    flight.do(("get", 1), slow_query)
+    assert calls == 2
+
+
+def test_waiters_share_the_leader_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing_query():
+        release.wait(timeout=5)
+        raise LookupError("db down")
+
+    threading.Timer(0.1, release.set).start()
+    results = _run_concurrently(4, lambda: flight.do(("list", 0), failing_query))
+
+    assert all(isinstance(result, LookupError) for result in results)
+    with pytest.raises(KeyError):
+        flight.do(("list", 0), lambda: {}["missing"])
+
+
+def test_repository_wrapper_keys_by_arguments(session):
+    class Repo:
+        def get(self, book_id):
+            return {"id": book_id}
+
+        def delete(self, book_id):
+            return True
+
+    flight = SingleFlight()
+    repository = SingleFlightRepository(Repo(), session, flight)
+
+    assert repository.get(1) == {"id": 1}
+    assert repository.get(2) == {"id": 2}
+    assert repository.delete(2) is True
+    assert flight.metrics() == {"get": {"leaders": 2, "coalesced": 0}}
+
+
+def test_api_reads_go_through_single_flight(client, auth_headers):
+    created = client.post(
+        "/books",
+        json={"title": "Dune", "author": "Frank Herbert", "description": "Desc", "year": 1965, "genre": "sci-fi"},
+        headers=auth_headers,
+    ).json()
+    before = client.get("/metrics").json()["singleflight"].get("get", {"leaders": 0})["leaders"]
+    assert client.get(f"/books/{created['id']}").json()["title"] == "Dune"
+    after = client.get("/metrics").json()["singleflight"]["get"]["leaders"]
+    assert after == before + 1
@@ -0,0 +1,75 @@
+# filepath: book_service/tests/test_stats.py
+"""
+Tests for the precomputed catalogue statistics (/books/stats).
+"""
+from sqlmodel import select
+
+from book_service.app.models import BookCreate, BookStat
+from book_service.app.repository import BookRepository as MemoryRepository
+from book_service.app.repository_db import BookRepository
+
+
+def _book(**overrides) -> dict:
+    payload = {
+        "title": "Book",
+        "author": "Author",
+        "description": "Desc",
+        "year": 2000,
+        "genre": "fiction",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_stats_follow_creates_and_deletes(client, auth_headers):
+    """Each create/delete updates the aggregates in the same transaction."""
+    dune = client.post("/books", json=_book(author="Frank Herbert", genre="sci-fi", year=1965), headers=auth_headers).json()
+    client.post("/books", json=_book(author="Frank Herbert", genre="sci-fi", year=1966), headers=auth_headers)
+    client.post("/books", json=_book(author="Jane Austen", genre="romance", year=1966), headers=auth_headers)
+
+    stats = client.get("/books/stats").json()
+    assert stats["total"] == 3
+    assert stats["genre"] == {"Sci-Fi": 2, "Romance": 1}
+    assert stats["author"] == {"Frank Herbert": 2, "Jane Austen": 1}
+    assert stats["year"] == {"1966": 2, "1965": 1}
+
+    client.delete(f"/books/{dune['id']}")
+    stats = client.get("/books/stats", params={"top": 1}).json()
+    assert stats["total"] == 2
+    assert stats["year"] == {"1966": 2}
+    assert stats["genre"] == {"Romance": 1}
+
+
+def test_bulk_create_updates_stats(client, auth_headers):
+    client.post("/books/bulk", json=[_book(genre="drama")] * 4, headers=auth_headers)
+    assert client.get("/books/stats").json()["genre"] == {"Drama": 4}
+
+
+def test_rebuild_stats_corrects_drift(session):
+    """The periodic rebuild recomputes aggregates from the books table."""
+    repo = BookRepository(session)
+    repo.create(BookCreate(**_book(genre="drama")))
+    repo.create(BookCreate(**_book(genre="poetry", year=2010)))
+
+    stat = session.exec(select(BookStat).where(BookStat.key == "Drama")).one()
+    stat.count = 42
+    session.add(BookStat(dimension="genre", key="Ghost", count=3))
+    session.commit()
+
+    repo.rebuild_stats()
+    stats = repo.stats()
+    assert stats.total == 2
+    assert stats.genre == {"Drama": 1, "Poetry": 1}
+    assert stats.year == {2000: 1, 2010: 1}
+
+
+def test_memory_repository_stats():
+    repo = MemoryRepository()
+    first = repo.create(BookCreate(**_book(genre="drama")))
+    repo.create(BookCreate(**_book(genre="drama", year=2001)))
+    repo.delete(first.id)
+
+    stats = repo.stats()
+    assert stats.total == 1
+    assert stats.genre == {"Drama": 1}
+    assert stats.year == {2001: 1}
@@ -0,0 +1,111 @@
+# filepath: book_service/tests/test_timing.py
+"""
+Tests for the per-request Server-Timing breakdown.
+"""
+import logging
+
+import pytest
+
+from book_service.app.config import Settings
+from book_service.app.database import get_settings
+from book_service.app.logs import trace_id_var
+from book_service.app.main import app
+from book_service.app.security import create_access_token
+from book_service.app.timing import RequestTimings, stage, timings_var
+
+
+@pytest.fixture(name="timed")
+def timed_fixture(monkeypatch):
+    settings = Settings(server_timing_enabled=True)
+    monkeypatch.setattr("book_service.app.main.get_settings", lambda: settings)  # middleware
+    app.dependency_overrides[get_settings] = lambda: settings  # endpoints
+    yield settings
+    app.dependency_overrides.pop(get_settings, None)
+
+
+def _opt_in(*roles: str) -> dict[str, str]:
+    token = create_access_token(subject="ops", roles=list(roles), settings=Settings())
+    return {"Authorization": f"Bearer {token}", "X-Server-Timing": "1"}
+
+
+def _stages(response) -> dict[str, str]:
+    entries = [part.strip().split(";") for part in response.headers["Server-Timing"].split(",")]
+    return {entry[0]: entry[1] for entry in entries}
+
+
+def test_stage_is_a_no_op_outside_a_timed_request():
+    with stage("auth"):
+        pass
+    assert timings_var.get() is None
+
+    timings = RequestTimings()
+    token = timings_var.set(timings)
+    try:
+        with stage("repo"):
+            pass
+        with stage("repo"):
+            pass
+    finally:
+        timings_var.reset(token)
+    assert timings.stages["repo"][1] == 2
+    assert 'repo;dur=' in timings.header() and 'desc="repository (2)"' in timings.header()
+
+
+class _Recorder(logging.Handler):
+    """Keeps each message with the trace id that was current when it was logged."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.seen: list[tuple[str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.seen.append((record.getMessage(), trace_id_var.get()))
+
+
+def test_server_timing_breaks_down_a_write(client, timed):
+    payload = {"title": "Dune", "author": "Frank Herbert", "description": "Spice.", "year": 1965, "genre": "SF"}
+    logger = logging.getLogger("book-service")
+    recorder, level = _Recorder(), logger.level
+    logger.addHandler(recorder)
+    logger.setLevel(logging.INFO)
+    try:
+        response = client.post("/books", json=payload, headers={**_opt_in("editor", "admin"), "X-Trace-Id": "timed-write"})
+    finally:
+        logger.removeHandler(recorder)
+        logger.setLevel(level)
+    assert response.status_code == 201
+
+    stages = _stages(response)
+    for name in ("total", "deps", "auth", "app", "repo", "db", "serialize"):
+        assert stages[name].startswith("dur="), name
+    assert float(stages["total"][4:]) >= float(stages["app"][4:])
+
+    [(message, trace_id)] = [seen for seen in recorder.seen if seen[0].startswith("request.timing")]
+    assert trace_id == "timed-write"
+    assert "path=/books status=201" in message and "db_count=" in message
+
+
+def test_rejected_request_is_timed_as_dependencies(client, timed):
+    response = client.post("/books", json={"title": "x"}, headers=_opt_in("editor", "admin"))
+    assert response.status_code == 422
+    stages = _stages(response)
+    assert "deps" in stages and "app" not in stages
+
+
+def test_server_timing_header_is_for_admins_who_ask(client, timed):
+    assert "Server-Timing" not in client.get("/livez").headers
+    assert "Server-Timing" not in client.get("/livez", headers={"X-Server-Timing": "1"}).headers
+    assert "Server-Timing" not in client.get("/livez", headers=_opt_in("editor")).headers
+    assert "Server-Timing" in client.get("/livez", headers=_opt_in("admin")).headers
+
+
+def test_auth_routes_are_timed(client, timed):
+    response = client.post("/token", json={"username": "teacher", "password": "classroom"}, headers=_opt_in("admin"))
+    assert response.status_code == 200
+    assert {"deps", "app", "serialize"} <= set(_stages(response))
+
+
+def test_server_timing_is_off_by_default(client):
+    assert not Settings().server_timing_enabled
+    response = client.get("/livez", headers=_opt_in("admin"))
+    assert "Server-Timing" not in response.headers
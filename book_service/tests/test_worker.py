@@ -0,0 +1,224 @@
+# filepath: book_service/tests/test_worker.py
+"""
+Tests for the worker job runtime using the in-memory queue backend.
+"""
+import asyncio
+
+import pytest
+import redis
+
+from book_service.worker import main as worker_main
+from book_service.worker.queue import InMemoryQueue, Job
+from book_service.worker.runtime import JobRuntime
+
+
+def _runtime(**kwargs) -> JobRuntime:
+    kwargs.setdefault("poll_timeout", 0.05)
+    return JobRuntime(InMemoryQueue(), **kwargs)
+
+
+@pytest.mark.anyio
+async def test_jobs_run_by_priority_lane():
+    runtime = _runtime(concurrency=1)
+    order = []
+
+    @runtime.handler("record")
+    async def record(job):
+        order.append(job.payload["n"])
+
+    await runtime.queue.enqueue(Job("record", {"n": 1}, priority="low"))
+    await runtime.queue.enqueue(Job("record", {"n": 2}))
+    await runtime.queue.enqueue(Job("record", {"n": 3}, priority="high"))
+
+    await runtime.run(until=lambda: len(order) == 3)
+    assert order == [3, 2, 1]
+
+
+@pytest.mark.anyio
+async def test_failed_job_is_retried_with_backoff_then_succeeds():
+    runtime = _runtime(backoff_base=0.01, backoff_max=0.02)
+    attempts = []
+
+    @runtime.handler("flaky")
+    async def flaky(job):
+        attempts.append(job.attempts)
+        if job.attempts < 3:
+            raise RuntimeError("boom")
+
+    await runtime.queue.enqueue(Job("flaky"))
+    await runtime.run(until=lambda: runtime.metrics.snapshot().get("flaky", {}).get("succeeded") == 1)
+
+    assert attempts == [1, 2, 3]
+    stats = runtime.metrics.snapshot()["flaky"]
+    assert stats["failed"] == 2
+    assert stats["retried"] == 2
+    assert stats["duration"]["count"] == 3
+    assert stats["queue_lag"]["count"] == 3
+
+
+@pytest.mark.anyio
+async def test_job_is_dead_lettered_after_max_attempts():
+    runtime = _runtime(max_attempts=2, backoff_base=0.01)
+
+    @runtime.handler("broken")
+    async def broken(job):
+        raise ValueError("always")
+
+    await runtime.queue.enqueue(Job("broken"))
+    await runtime.queue.enqueue(Job("unknown"))
+    await runtime.run(until=lambda: len(runtime.queue._dead) == 2)
+
+    dead = {job.name: job for job in await runtime.queue.dead_letters()}
+    assert dead["broken"].attempts == 2
+    assert "ValueError" in dead["broken"].last_error
+    assert "no handler" in dead["unknown"].last_error
+
+
+@pytest.mark.anyio
+async def test_workers_run_jobs_concurrently():
+    runtime = _runtime(concurrency=4)
+    running = 0
+    peak = 0
+    done = 0
+
+    @runtime.handler("slow")
+    async def slow(job):
+        nonlocal running, peak, done
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        done += 1
+
+    for _ in range(8):
+        await runtime.queue.enqueue(Job("slow"))
+    await runtime.run(until=lambda: done == 8)
+    assert peak == 4
+
+
+@pytest.mark.anyio
+async def test_jobs_stay_in_flight_until_routed():
+    runtime = _runtime(max_attempts=2, backoff_base=0.01)
+    done = []
+
+    @runtime.handler("ok")
+    async def ok(job):
+        done.append(job.id)
+
+    @runtime.handler("broken")
+    async def broken(job):
+        raise ValueError("always")
+
+    await runtime.queue.enqueue(Job("ok"))
+    await runtime.queue.enqueue(Job("broken"))
+    taken = await runtime.queue.dequeue(timeout=0.05)
+    assert list(runtime.queue.in_flight) == [taken.id]
+    await runtime.queue.enqueue(taken)
+
+    await runtime.run(until=lambda: done and len(runtime.queue._dead) == 1)
+    assert runtime.queue.in_flight == {}
+    assert (await runtime.queue.size())["processing"] == 0
+
+
+@pytest.mark.anyio
+async def test_promoter_survives_a_queue_error():
+    runtime = _runtime()
+    failures = []
+    heartbeat = runtime.queue.heartbeat
+
+    async def flaky_heartbeat():
+        if not failures:
+            failures.append(1)
+            raise redis.ConnectionError("down")
+        await heartbeat()
+
+    runtime.queue.heartbeat = flaky_heartbeat
+    await runtime.queue.enqueue(Job("late"), delay=0.01)
+    # The promoted job has no handler, so a worker dead-letters it.
+    await runtime.run(until=lambda: runtime.queue._dead)
+    assert failures == [1]
+
+
+@pytest.mark.anyio
+async def test_workers_survive_queue_errors_without_losing_jobs():
+    runtime = _runtime(concurrency=1, backoff_base=0.01, backoff_max=0.02)
+    queue = runtime.queue
+    done = []
+    failing = {"dequeue": 1, "enqueue": 1, "ack": 1}
+
+    def flaky(name, call):
+        async def wrapper(*args, **kwargs):
+            if failing[name]:
+                failing[name] -= 1
+                raise redis.ConnectionError("down")
+            return await call(*args, **kwargs)
+
+        return wrapper
+
+    @runtime.handler("once_failing")
+    async def once_failing(job):
+        if job.attempts == 1:
+            raise ValueError("boom")
+        done.append(job.id)
+
+    await queue.enqueue(Job("once_failing"))
+    queue.dequeue = flaky("dequeue", queue.dequeue)
+    queue.enqueue = flaky("enqueue", queue.enqueue)  # the retry of attempt 1
+    queue.ack = flaky("ack", queue.ack)
+
+    await runtime.run(until=lambda: done and not queue.in_flight)
+    assert failing == {"dequeue": 0, "enqueue": 0, "ack": 0}
+    assert len(done) == 1
+    assert (await queue.size())["processing"] == 0
+
+
+@pytest.mark.anyio
+async def test_schedule_survives_redis_errors(monkeypatch):
+    runtime = _runtime()
+    settings = worker_main.Settings(worker_queue_backend="memory", worker_refresh_interval=0, worker_refresh_fanout=1)
+    calls = []
+    enqueue = runtime.queue.enqueue
+
+    async def flaky_enqueue(job, **kwargs):
+        calls.append(job.name)
+        if len(calls) == 1:
+            raise redis.ConnectionError("down")
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+        await enqueue(job, **kwargs)
+
+    runtime.queue.enqueue = flaky_enqueue
+    with pytest.raises(asyncio.CancelledError):
+        await worker_main.schedule(runtime, settings, "refresh_books")
+    assert len(calls) == 3 and (await runtime.queue.size())["low"] == 1
+
+
+@pytest.mark.anyio
+async def test_publish_metrics_survives_redis_errors(monkeypatch):
+    runtime = _runtime()
+    calls = []
+
+    async def size():
+        calls.append(1)
+        if len(calls) == 1:
+            raise redis.ConnectionError("down")
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+        return {}
+
+    monkeypatch.setattr(worker_main, "METRICS_INTERVAL", 0)
+    runtime.queue.size = size
+    with pytest.raises(asyncio.CancelledError):
+        await worker_main.publish_metrics(runtime)
+    assert len(calls) == 3
+
+
+def test_backoff_is_capped_full_jitter():
+    runtime = _runtime(backoff_base=1.0, backoff_max=4.0)
+    assert all(0 <= runtime.backoff(1) <= 1.0 for _ in range(50))
+    assert all(0 <= runtime.backoff(10) <= 4.0 for _ in range(50))
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        Job("x", priority="urgent")
@@ -0,0 +1,196 @@
+# book_service/worker/leases.py
+"""
+Token-fenced, renewable leases.
+
+A lease is a key holding a random token with a TTL. Only the holder of the
+token can renew or release it (compare-and-set), so a worker whose lease
+expired can never free or extend somebody else's. Every acquisition also
+gets a strictly increasing fencing number. `LeaseKeeper.check` only knows
+what the last renewal saw, so writers must also enforce the fence where
+they commit (see BookRepository.refresh_range).
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+import redis.asyncio as redis
+
+
+class LeaseLost(RuntimeError):
+    """Raised when a lease expired or was taken over while work was running."""
+
+
+@dataclass(frozen=True)
+class Lease:
+    key: str
+    token: str
+    fence: int
+
+
+class LeaseStore(Protocol):
+    async def acquire(self, key: str, ttl: float) -> Optional[Lease]: ...
+    async def renew(self, lease: Lease, ttl: float) -> bool: ...
+    async def release(self, lease: Lease) -> bool: ...
+    async def is_held(self, lease: Lease) -> bool: ...
+    async def mark_done(self, run: str, shard: int, ttl: float) -> None: ...
+    async def done(self, run: str) -> set[int]: ...
+    async def publish_plan(self, run: str, plan: list, ttl: float) -> list: ...
+
+
+class InMemoryLeaseStore:
+    """Single-process lease store used by tests."""
+
+    def __init__(self) -> None:
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._fences: dict[str, int] = {}
+        self._done: dict[str, set[int]] = {}
+        self._plans: dict[str, list] = {}
+
+    def _current(self, key: str) -> Optional[str]:
+        entry = self._leases.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self._leases.pop(key, None)
+            return None
+        return entry[0]
+
+    async def acquire(self, key: str, ttl: float) -> Optional[Lease]:
+        if self._current(key) is not None:
+            return None
+        token = uuid.uuid4().hex
+        self._fences[key] = self._fences.get(key, 0) + 1
+        self._leases[key] = (token, time.monotonic() + ttl)
+        return Lease(key, token, self._fences[key])
+
+    async def renew(self, lease: Lease, ttl: float) -> bool:
+        if self._current(lease.key) != lease.token:
+            return False
+        self._leases[lease.key] = (lease.token, time.monotonic() + ttl)
+        return True
+
+    async def release(self, lease: Lease) -> bool:
+        if self._current(lease.key) != lease.token:
+            return False
+        del self._leases[lease.key]
+        return True
+
+    async def is_held(self, lease: Lease) -> bool:
+        return self._current(lease.key) == lease.token
+
+    async def mark_done(self, run: str, shard: int, ttl: float) -> None:
+        self._done.setdefault(run, set()).add(shard)
+
+    async def done(self, run: str) -> set[int]:
+        return set(self._done.get(run, set()))
+
+    async def publish_plan(self, run: str, plan: list, ttl: float) -> list:
+        return self._plans.setdefault(run, plan)
+
+
+# SET NX and the fence increment in one step: a crash in between would
+# otherwise leave a lease without a fence (or a fence without a holder).
+_ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return redis.call('INCR', KEYS[2])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaseStore:
+    """Lease store shared by all worker replicas."""
+
+    def __init__(self, client: redis.Redis) -> None:
+        self.client = client
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._renew = client.register_script(_RENEW_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    async def acquire(self, key: str, ttl: float) -> Optional[Lease]:
+        token = uuid.uuid4().hex
+        fence = await self._acquire(keys=[key, f"{key}:fence"], args=[token, int(ttl * 1000)])
+        if not fence:
+            return None
+        return Lease(key, token, int(fence))
+
+    async def renew(self, lease: Lease, ttl: float) -> bool:
+        return bool(await self._renew(keys=[lease.key], args=[lease.token, int(ttl * 1000)]))
+
+    async def release(self, lease: Lease) -> bool:
+        return bool(await self._release(keys=[lease.key], args=[lease.token]))
+
+    async def is_held(self, lease: Lease) -> bool:
+        return await self.client.get(lease.key) == lease.token
+
+    async def mark_done(self, run: str, shard: int, ttl: float) -> None:
+        key = f"{run}:done"
+        await self.client.sadd(key, shard)
+        await self.client.expire(key, max(1, int(ttl)))
+
+    async def done(self, run: str) -> set[int]:
+        return {int(shard) for shard in await self.client.smembers(f"{run}:done")}
+
+    async def publish_plan(self, run: str, plan: list, ttl: float) -> list:
+        """Store `plan` unless another replica already did; return the winner."""
+        key = f"{run}:plan"
+        await self.client.set(key, json.dumps(plan), nx=True, ex=max(1, int(ttl)))
+        return json.loads(await self.client.get(key))
+
+
+class LeaseKeeper:
+    """
+    Keep `lease` alive while the body runs, renewing every ttl/3.
+
+        async with LeaseKeeper(store, lease, ttl) as keeper:
+            ...
+            keeper.check()   # raises LeaseLost if renewal failed
+
+    The lease is released (compare-and-delete) on exit.
+    """
+
+    def __init__(self, store: LeaseStore, lease: Lease, ttl: float) -> None:
+        self.store = store
+        self.lease = lease
+        self.ttl = ttl
+        self.lost = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _keepalive(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            if not await self.store.renew(self.lease, self.ttl):
+                self.lost = True
+                return
+
+    def check(self) -> None:
+        if self.lost:
+            raise LeaseLost(f"lease {self.lease.key} (fence {self.lease.fence}) was lost")
+
+    async def __aenter__(self) -> "LeaseKeeper":
+        self._task = asyncio.create_task(self._keepalive())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.store.release(self.lease)
@@ -1,12 +1,96 @@
 # book_service/worker/main.py
 import asyncio
-from worker.tasks import refresh_books
+import json
+import logging
+import uuid
 
+import redis
 
-async def main():
+from book_service.app.config import Settings
+from book_service.app.database import get_settings
+from book_service.worker import tasks
+from book_service.worker.queue import InMemoryQueue, Job, RedisQueue
+from book_service.worker.runtime import JobRuntime
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "jobs:metrics"
+SCHEDULE_KEY = "jobs:schedule:{name}"
+METRICS_INTERVAL = 10.0
+
+
+def build_runtime(settings: Settings) -> JobRuntime:
+    if settings.worker_queue_backend == "memory":
+        queue = InMemoryQueue()
+    elif settings.worker_queue_backend == "redis":
+        queue = RedisQueue(tasks.redis_client, visibility_timeout=settings.worker_visibility_timeout)
+    else:
+        raise ValueError(f"Invalid BOOK_WORKER_QUEUE_BACKEND: {settings.worker_queue_backend}")
+
+    runtime = JobRuntime(
+        queue,
+        concurrency=settings.worker_concurrency,
+        max_attempts=settings.worker_max_attempts,
+        backoff_base=settings.worker_backoff_base,
+        backoff_max=settings.worker_backoff_max,
+    )
+    tasks.register(runtime)
+    return runtime
+
+
+async def schedule(runtime: JobRuntime, settings: Settings, name: str, priority: str = "low") -> None:
+    """
+    Enqueue a refresh run once per interval across all replicas.
+    Only enqueueing is periodic; workers pick jobs up as soon as they land.
+    The run is fanned out into several jobs sharing one run id, so workers
+    on every replica join the same sharded refresh. A failed tick (e.g.
+    Redis unreachable) is logged and the next interval tries again.
+    """
+    shared = settings.worker_queue_backend == "redis"
+    interval = settings.worker_refresh_interval
     while True:
-        await refresh_books()
-        await asyncio.sleep(10)
+        try:
+            claimed = True
+            if shared:
+                claimed = await tasks.redis_client.set(
+                    SCHEDULE_KEY.format(name=name), "1", nx=True, ex=max(1, int(interval))
+                )
+            if claimed:
+                run = f"books:refresh:{uuid.uuid4().hex[:12]}"
+                for _ in range(settings.worker_refresh_fanout):
+                    await runtime.queue.enqueue(Job(name, {"run": run}, priority=priority))
+        except Exception:
+            logger.warning("jobs.schedule_failed name=%s", name, exc_info=True)
+        await asyncio.sleep(interval)
+
+
+async def publish_metrics(runtime: JobRuntime) -> None:
+    """Expose duration / queue-lag metrics and lane sizes under jobs:metrics."""
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        try:
+            snapshot = {"jobs": runtime.metrics.snapshot(), "queue": await runtime.queue.size()}
+            logger.info("jobs.metrics %s", json.dumps(snapshot))
+            if isinstance(runtime.queue, RedisQueue):
+                await tasks.redis_client.set(METRICS_KEY, json.dumps(snapshot))
+        except redis.RedisError:
+            logger.warning("jobs.metrics_failed", exc_info=True)
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    settings = get_settings()
+    runtime = build_runtime(settings)
+
+    background = [
+        asyncio.create_task(schedule(runtime, settings, "refresh_books")),
+        asyncio.create_task(publish_metrics(runtime)),
+    ]
+    try:
+        await runtime.run()
+    finally:
+        for task in background:
+            task.cancel()
 
 
 if __name__ == "__main__":
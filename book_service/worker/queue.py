@@ -0,0 +1,311 @@
+# book_service/worker/queue.py
+"""
+Job queues for the worker runtime.
+
+Two backends share one interface:
+- RedisQueue: one list per priority lane, a sorted set for delayed (retry)
+  jobs and a dead-letter list. Works across any number of worker replicas.
+  A dequeued job is moved into the worker's own processing list and stays
+  there until it is acked, so a crash or deploy mid-job does not lose it.
+- InMemoryQueue: same semantics inside one process, used by tests.
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional, Protocol
+
+import redis.asyncio as redis
+
+# Highest priority first.
+LANES = ("high", "default", "low")
+
+
+@dataclass
+class Job:
+    name: str
+    payload: dict[str, Any] = field(default_factory=dict)
+    priority: str = "default"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    # When the job became runnable; queue lag is measured from here.
+    available_at: float = field(default_factory=time.time)
+    last_error: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.priority not in LANES:
+            raise ValueError(f"Unknown priority lane: {self.priority}")
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, raw: str) -> "Job":
+        return cls(**json.loads(raw))
+
+
+class JobQueue(Protocol):
+    async def enqueue(self, job: Job, *, delay: float = 0.0) -> None: ...
+    async def dequeue(self, timeout: float = 1.0) -> Optional[Job]: ...
+    async def promote_due(self) -> int: ...
+    async def ack(self, job: Job) -> None: ...
+    async def heartbeat(self) -> None: ...
+    async def requeue_lost(self, max_attempts: int) -> int: ...
+    async def dead_letter(self, job: Job) -> None: ...
+    async def dead_letters(self) -> list[Job]: ...
+    async def size(self) -> dict[str, int]: ...
+
+
+class InMemoryQueue:
+    """Process-local queue with priority lanes and delayed jobs."""
+
+    def __init__(self) -> None:
+        self._lanes: dict[str, deque[Job]] = {lane: deque() for lane in LANES}
+        self._delayed: list[tuple[float, int, Job]] = []
+        self._dead: list[Job] = []
+        self.in_flight: dict[str, Job] = {}
+        self._counter = 0
+        self._ready = asyncio.Event()
+
+    async def enqueue(self, job: Job, *, delay: float = 0.0) -> None:
+        if delay > 0:
+            job.available_at = time.time() + delay
+            self._counter += 1
+            heapq.heappush(self._delayed, (job.available_at, self._counter, job))
+            return
+        job.available_at = time.time()
+        self._lanes[job.priority].append(job)
+        self._ready.set()
+
+    async def promote_due(self) -> int:
+        now = time.time()
+        moved = 0
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            self._lanes[job.priority].append(job)
+            moved += 1
+        if moved:
+            self._ready.set()
+        return moved
+
+    def _pop(self) -> Optional[Job]:
+        for lane in LANES:
+            if self._lanes[lane]:
+                job = self._lanes[lane].popleft()
+                self.in_flight[job.id] = job
+                return job
+        self._ready.clear()
+        return None
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[Job]:
+        job = self._pop()
+        if job is not None:
+            return job
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._pop()
+
+    async def ack(self, job: Job) -> None:
+        self.in_flight.pop(job.id, None)
+
+    async def heartbeat(self) -> None:
+        pass
+
+    async def requeue_lost(self, max_attempts: int) -> int:
+        # In-flight jobs only die with the process, and the queue with them.
+        return 0
+
+    async def dead_letter(self, job: Job) -> None:
+        self._dead.append(job)
+
+    async def dead_letters(self) -> list[Job]:
+        return list(self._dead)
+
+    async def size(self) -> dict[str, int]:
+        sizes = {lane: len(jobs) for lane, jobs in self._lanes.items()}
+        sizes["delayed"] = len(self._delayed)
+        sizes["dead"] = len(self._dead)
+        sizes["processing"] = len(self.in_flight)
+        return sizes
+
+
+# Move due jobs from the delayed set to their lanes atomically, so two
+# replicas promoting at once never duplicate a job.
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, raw in ipairs(due) do
+    redis.call('ZREM', KEYS[1], raw)
+    local job = cjson.decode(raw)
+    job['available_at'] = tonumber(ARGV[1])
+    redis.call('RPUSH', ARGV[3] .. job['priority'], cjson.encode(job))
+end
+return #due
+"""
+
+
+# Claim the next job: move the head of the first non-empty lane into this
+# worker's processing list and refresh its heartbeat in the same step, so the
+# job is never in neither list and never looks abandoned.
+# LMOVE rather than BLMOVE: BLMOVE blocks on a single source list, which
+# would give up strict lane priority; RedisQueue.dequeue polls instead.
+_CLAIM_SCRIPT = """
+redis.call('SET', KEYS[1], '1', 'PX', ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+for i = 4, #KEYS do
+    local raw = redis.call('LMOVE', KEYS[i], KEYS[3], 'LEFT', 'RIGHT')
+    if raw then
+        return raw
+    end
+end
+return false
+"""
+
+# Return the processing lists of workers whose heartbeat expired to the front
+# of their lanes (or dead-letter them once they have used up their attempts:
+# a job that kills its worker every time must not loop forever).
+_REQUEUE_SCRIPT = """
+local moved = 0
+for _, consumer in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if redis.call('EXISTS', ARGV[1] .. 'consumer:' .. consumer) == 0 then
+        local processing = ARGV[1] .. 'processing:' .. consumer
+        local lost = redis.call('LRANGE', processing, 0, -1)
+        for i = #lost, 1, -1 do
+            local job = cjson.decode(lost[i])
+            job['attempts'] = job['attempts'] + 1
+            job['available_at'] = tonumber(ARGV[3])
+            job['last_error'] = 'worker lost while running the job'
+            if job['attempts'] >= tonumber(ARGV[2]) then
+                redis.call('RPUSH', ARGV[1] .. 'dead', cjson.encode(job))
+            else
+                redis.call('LPUSH', ARGV[1] .. 'lane:' .. job['priority'], cjson.encode(job))
+            end
+            moved = moved + 1
+        end
+        redis.call('DEL', processing)
+        redis.call('SREM', KEYS[1], consumer)
+    end
+end
+return moved
+"""
+
+
+class RedisQueue:
+    """
+    Redis-backed queue shared by every worker replica.
+
+    Each RedisQueue is one consumer with its own processing list
+    (`<prefix>:processing:<consumer>`) and a heartbeat key that expires after
+    `visibility_timeout` seconds. The runtime refreshes the heartbeat while
+    the process is alive, acks each job once it has been routed (done, retry
+    scheduled or dead-lettered) and periodically calls requeue_lost(), which
+    puts the jobs of consumers whose heartbeat expired back on their lanes.
+    Delivery is at-least-once: a job whose worker died may run again.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        *,
+        prefix: str = "jobs",
+        consumer: Optional[str] = None,
+        visibility_timeout: float = 30.0,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.visibility_timeout = visibility_timeout
+        self._claimed: dict[str, str] = {}  # job id -> raw entry in the processing list
+        self._promote = client.register_script(_PROMOTE_SCRIPT)
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+        self._requeue = client.register_script(_REQUEUE_SCRIPT)
+
+    def _lane(self, lane: str) -> str:
+        return f"{self.prefix}:lane:{lane}"
+
+    @property
+    def _delayed(self) -> str:
+        return f"{self.prefix}:delayed"
+
+    @property
+    def _dead(self) -> str:
+        return f"{self.prefix}:dead"
+
+    @property
+    def _consumers(self) -> str:
+        return f"{self.prefix}:consumers"
+
+    @property
+    def _heartbeat(self) -> str:
+        return f"{self.prefix}:consumer:{self.consumer}"
+
+    @property
+    def _processing(self) -> str:
+        return f"{self.prefix}:processing:{self.consumer}"
+
+    async def enqueue(self, job: Job, *, delay: float = 0.0) -> None:
+        if delay > 0:
+            job.available_at = time.time() + delay
+            await self.client.zadd(self._delayed, {job.dumps(): job.available_at})
+            return
+        job.available_at = time.time()
+        await self.client.rpush(self._lane(job.priority), job.dumps())
+
+    async def promote_due(self, batch: int = 100) -> int:
+        return await self._promote(
+            keys=[self._delayed], args=[time.time(), batch, f"{self.prefix}:lane:"]
+        )
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[Job]:
+        keys = [self._heartbeat, self._consumers, self._processing, *(self._lane(lane) for lane in LANES)]
+        args = [self.consumer, int(self.visibility_timeout * 1000)]
+        deadline = time.monotonic() + timeout
+        pause = 0.01
+        while True:
+            raw = await self._claim(keys=keys, args=args)
+            if raw is not None:
+                job = Job.loads(raw)
+                self._claimed[job.id] = raw
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(pause, remaining))
+            pause = min(pause * 2, 0.25)
+
+    async def ack(self, job: Job) -> None:
+        raw = self._claimed.pop(job.id, None)
+        if raw is not None:
+            await self.client.lrem(self._processing, 1, raw)
+
+    async def heartbeat(self) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self._heartbeat, "1", px=int(self.visibility_timeout * 1000))
+            pipe.sadd(self._consumers, self.consumer)
+            await pipe.execute()
+
+    async def requeue_lost(self, max_attempts: int) -> int:
+        return await self._requeue(
+            keys=[self._consumers], args=[f"{self.prefix}:", max_attempts, time.time()]
+        )
+
+    async def dead_letter(self, job: Job) -> None:
+        await self.client.rpush(self._dead, job.dumps())
+
+    async def dead_letters(self) -> list[Job]:
+        return [Job.loads(raw) for raw in await self.client.lrange(self._dead, 0, -1)]
+
+    async def size(self) -> dict[str, int]:
+        sizes = {lane: await self.client.llen(self._lane(lane)) for lane in LANES}
+        sizes["delayed"] = await self.client.zcard(self._delayed)
+        sizes["dead"] = await self.client.llen(self._dead)
+        sizes["processing"] = await self.client.llen(self._processing)
+        return sizes
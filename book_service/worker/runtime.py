@@ -0,0 +1,225 @@
+# book_service/worker/runtime.py
+"""
+Small asyncio job runtime: N concurrent workers pull jobs from a JobQueue,
+retry failures with exponential backoff + full jitter, dead-letter jobs that
+keep failing, and record per-job duration / queue-lag metrics. A job is acked
+once it has been routed; jobs left behind by a crashed replica are put back
+by requeue_lost() from the promoter loop.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .queue import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Job], Awaitable[Any]]
+
+
+@dataclass
+class _Series:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict[str, float]:
+        mean = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "mean": round(mean, 6), "max": round(self.max, 6)}
+
+
+class JobMetrics:
+    """Per-job-name counters plus duration and queue-lag series (seconds)."""
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, dict[str, Any]] = {}
+
+    def _entry(self, name: str) -> dict[str, Any]:
+        return self._jobs.setdefault(
+            name,
+            {"succeeded": 0, "failed": 0, "retried": 0, "dead": 0,
+             "duration": _Series(), "queue_lag": _Series()},
+        )
+
+    def started(self, job: Job, lag: float) -> None:
+        self._entry(job.name)["queue_lag"].observe(lag)
+
+    def finished(self, job: Job, duration: float, outcome: str) -> None:
+        entry = self._entry(job.name)
+        entry["duration"].observe(duration)
+        entry[outcome] += 1
+
+    def count(self, job: Job, outcome: str) -> None:
+        self._entry(job.name)[outcome] += 1
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                key: value.snapshot() if isinstance(value, _Series) else value
+                for key, value in entry.items()
+            }
+            for name, entry in self._jobs.items()
+        }
+
+
+class JobRuntime:
+    """
+    Runs registered handlers for jobs pulled from `queue`.
+
+        runtime = JobRuntime(queue, concurrency=4)
+
+        @runtime.handler("refresh_books")
+        async def refresh(job): ...
+
+        await runtime.run()
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        *,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 60.0,
+        poll_timeout: float = 1.0,
+        requeue_interval: float = 5.0,
+    ) -> None:
+        self.queue = queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_timeout = poll_timeout
+        self.requeue_interval = requeue_interval
+        self.metrics = JobMetrics()
+        self._handlers: dict[str, Handler] = {}
+        self._stopping = asyncio.Event()
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self._handlers[name] = func
+            return func
+
+        return register
+
+    def backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff for the given attempt number (1-based)."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return random.uniform(0, cap)
+
+    async def execute(self, job: Job) -> None:
+        """Run one job and route it to success, retry or dead-letter."""
+        handler = self._handlers.get(job.name)
+        started = time.time()
+        self.metrics.started(job, max(0.0, started - job.available_at))
+        job.attempts += 1
+
+        if handler is None:
+            job.last_error = f"no handler registered for {job.name!r}"
+            logger.error("job.dead id=%s name=%s error=%s", job.id, job.name, job.last_error)
+            self.metrics.count(job, "dead")
+            await self.queue.dead_letter(job)
+            return
+
+        try:
+            await handler(job)
+        except Exception as exc:
+            duration = time.time() - started
+            job.last_error = f"{type(exc).__name__}: {exc}"
+            self.metrics.finished(job, duration, "failed")
+            if job.attempts >= self.max_attempts:
+                logger.error("job.dead id=%s name=%s attempts=%s error=%s",
+                             job.id, job.name, job.attempts, job.last_error)
+                self.metrics.count(job, "dead")
+                await self.queue.dead_letter(job)
+                return
+            delay = self.backoff(job.attempts)
+            logger.warning("job.retry id=%s name=%s attempt=%s delay=%.2fs error=%s",
+                           job.id, job.name, job.attempts, delay, job.last_error)
+            self.metrics.count(job, "retried")
+            await self.queue.enqueue(job, delay=delay)
+            return
+
+        self.metrics.finished(job, time.time() - started, "succeeded")
+
+    async def _worker(self, idx: int) -> None:
+        # A queue error (dequeue, routing or ack) is logged and the step is
+        # retried after a backoff instead of ending this worker. A job stays
+        # claimed until it has been routed and acked; routing again re-runs
+        # it, which at-least-once delivery allows.
+        job: Optional[Job] = None
+        routed = False
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                if job is None:
+                    job = await self.queue.dequeue(timeout=self.poll_timeout)
+                    routed = False
+                if job is not None:
+                    if not routed:
+                        await self.execute(job)
+                        routed = True
+                    await self.queue.ack(job)
+                    job = None
+                failures = 0
+            except Exception:
+                failures += 1
+                logger.warning("jobs.worker_failed worker=%s job=%s failures=%s",
+                               idx, job.id if job else None, failures, exc_info=True)
+                await self._pause(self.backoff(failures))
+
+    async def _promoter(self) -> None:
+        # Also keeps this replica's heartbeat alive, so a failed tick is
+        # logged and retried rather than ending the loop.
+        requeued_at = 0.0
+        while not self._stopping.is_set():
+            try:
+                await self.queue.heartbeat()
+                await self.queue.promote_due()
+                if time.monotonic() - requeued_at >= self.requeue_interval:
+                    requeued_at = time.monotonic()
+                    lost = await self.queue.requeue_lost(self.max_attempts)
+                    if lost:
+                        logger.warning("jobs.requeued_lost count=%s", lost)
+            except Exception:
+                logger.warning("jobs.promoter_failed", exc_info=True)
+            await self._pause(min(self.poll_timeout, 0.5))
+
+    async def _pause(self, seconds: float) -> None:
+        """Sleep for `seconds`, or less if stop() is called meanwhile."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self, *, until: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Process jobs until stop() is called (or `until()` becomes true,
+        checked between polls; handy for tests and one-shot drains).
+        """
+        self._stopping.clear()
+        tasks = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        tasks.append(asyncio.create_task(self._promoter()))
+        try:
+            if until is None:
+                await self._stopping.wait()
+            else:
+                while not until() and not self._stopping.is_set():
+                    await asyncio.sleep(0.01)
+                self.stop()
+        finally:
+            await asyncio.gather(*tasks, return_exceptions=True)
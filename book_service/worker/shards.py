@@ -0,0 +1,91 @@
+# book_service/worker/shards.py
+"""
+Sharded catalogue work distributed over worker replicas with leases.
+
+The catalogue is split into id-range shards. Every participant (any number
+of replicas, each with several concurrent slots) claims unfinished shards
+one lease at a time, so shards are processed in parallel and a shard whose
+holder crashed is picked up again once its lease expires.
+"""
+
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+
+from .leases import LeaseKeeper, LeaseStore
+
+logger = logging.getLogger(__name__)
+
+Shard = tuple[int, int]  # [lo, hi) id range
+ShardHandler = Callable[[int, int, LeaseKeeper], Awaitable[None]]
+
+# How long a run's plan and completion markers are kept.
+RUN_TTL = 24 * 3600
+
+
+def plan_shards(min_id: int | None, max_id: int | None, shard_size: int) -> list[Shard]:
+    """Split [min_id, max_id] into contiguous ranges of `shard_size` ids."""
+    if min_id is None or max_id is None:
+        return []
+    return [(lo, min(lo + shard_size, max_id + 1)) for lo in range(min_id, max_id + 1, shard_size)]
+
+
+async def run_sharded(
+    store: LeaseStore,
+    run: str,
+    shards: list[Shard],
+    handler: ShardHandler,
+    *,
+    parallelism: int = 4,
+    lease_ttl: float = 30.0,
+    poll_interval: float = 1.0,
+) -> int:
+    """
+    Process every shard of `run` exactly once across all participants.
+
+    Returns when all shards are done (by anyone); the result is the number
+    of shards this call processed itself.
+    """
+    processed = 0
+
+    async def claim_and_process() -> bool:
+        nonlocal processed
+        done = await store.done(run)
+        remaining = [i for i in range(len(shards)) if i not in done]
+        if not remaining:
+            return False
+        # Start at a random shard so participants don't all contend on shard 0.
+        offset = random.randrange(len(remaining))
+        for idx in remaining[offset:] + remaining[:offset]:
+            lease = await store.acquire(f"{run}:shard:{idx}", lease_ttl)
+            if lease is None:
+                continue
+            async with LeaseKeeper(store, lease, lease_ttl) as keeper:
+                if idx in await store.done(run):
+                    return True
+                lo, hi = shards[idx]
+                await handler(lo, hi, keeper)
+                keeper.check()
+                await store.mark_done(run, idx, RUN_TTL)
+            processed += 1
+            logger.info("shard.done run=%s shard=%s ids=[%s, %s) fence=%s", run, idx, lo, hi, lease.fence)
+            return True
+        # Everything left is leased by someone else: wait for them to finish
+        # or for a crashed holder's lease to expire.
+        await asyncio.sleep(poll_interval)
+        return True
+
+    async def slot() -> None:
+        while await claim_and_process():
+            pass
+
+    # A failing slot cancels its siblings (and releases their leases) instead
+    # of leaving them running after the call has already raised.
+    try:
+        async with asyncio.TaskGroup() as group:
+            for _ in range(parallelism):
+                group.create_task(slot())
+    except ExceptionGroup as failed:
+        raise failed.exceptions[0]
+    return processed
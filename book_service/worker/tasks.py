@@ -18,41 +18,113 @@
 import asyncio
 import redis.asyncio as redis
 import logging
+import uuid
+from collections.abc import Callable
+
+from sqlmodel import Session
+
+from book_service.app.database import engine, get_settings
+from book_service.app.repository_db import BookRepository, StaleFence
+
+from .leases import Lease, LeaseKeeper, LeaseLost, LeaseStore, RedisLeaseStore
+from .queue import Job
+from .runtime import JobRuntime
+from .shards import RUN_TTL, plan_shards, run_sharded
 
 logger = logging.getLogger(__name__)
 
-redis_client = redis.Redis(host="redis", port=6379, decode_responses=True)
+redis_client = redis.from_url(get_settings().redis_url, decode_responses=True)
+
+
+def rebuild_book_stats() -> int:
+    """Recompute the book_stats aggregates from the books table (drift correction)."""
+    with Session(engine) as session:
+        return BookRepository(session).rebuild_stats()
+
+
+def catalogue_id_bounds() -> tuple[int | None, int | None]:
+    with Session(engine) as session:
+        return BookRepository(session).id_bounds()
+
 
-async def refresh_books():
-   
-    lock_key = "refresh_lock"
- 
-    lock_acquired = await redis_client.set(lock_key, "1", nx=True, ex=30)
-    
-    if not lock_acquired:
-        logger.info("Refresh process skipped: Another instance is already running.")
-        return {"status": "skipped", "reason": "already_running"}
+def refresh_shard(lo: int, hi: int, check: Callable[[], None], lease: Lease) -> int:
+    """
+    Normalize books in [lo, hi) in one transaction. `check` aborts early if
+    the keeper saw the lease lost; the lease's fence is checked by the
+    database at commit, which also catches an expiry the keeper missed.
+    """
+    with Session(engine) as session:
+        try:
+            return BookRepository(session).refresh_range(
+                lo, hi, before_commit=check, fence=(lease.key, lease.fence)
+            )
+        except StaleFence as exc:
+            raise LeaseLost(str(exc)) from exc
+
+
+async def refresh_books(
+    run: str | None = None,
+    *,
+    store: LeaseStore | None = None,
+) -> dict:
+    """
+    Take part in the sharded catalogue refresh identified by `run`.
+
+    Every job (on any replica) that joins the same run claims id-range
+    shards through leases and processes them in parallel; the first
+    participant to find all shards done rebuilds the stats once.
+    """
+    settings = get_settings()
+    if settings.db_mode == "memory":
+        return {"status": "skipped", "reason": "memory_mode"}
+
+    store = store or RedisLeaseStore(redis_client)
+    run = run or f"books:refresh:{uuid.uuid4().hex[:12]}"
+    ttl = settings.refresh_lease_ttl
+
+    lo, hi = await asyncio.to_thread(catalogue_id_bounds)
+    plan = await store.publish_plan(run, plan_shards(lo, hi, settings.refresh_shard_size), RUN_TTL)
+    shards = [tuple(shard) for shard in plan]
+
+    async def handle(lo: int, hi: int, keeper: LeaseKeeper) -> None:
+        changed = await asyncio.to_thread(refresh_shard, lo, hi, keeper.check, keeper.lease)
+        if changed:
+            logger.info("refresh.shard run=%s ids=[%s, %s) changed=%s", run, lo, hi, changed)
 
     try:
-        logger.info("Starting book catalogue refresh...")
-        
         await redis_client.set("books_last_refresh_status", "running")
+        mine = await run_sharded(
+            store, run, shards, handle,
+            parallelism=settings.refresh_parallelism,
+            lease_ttl=ttl,
+        )
 
-        await asyncio.sleep(5) 
-        
-        await redis_client.set("books_last_refresh_status", "completed")
-        logger.info("Refresh completed successfully.")
-        
-        return {"status": "success"}
+        final = await store.acquire(f"{run}:finalize", ttl)
+        if final is not None and not await store.done(f"{run}:finalize"):
+            async with LeaseKeeper(store, final, ttl):
+                groups = await asyncio.to_thread(rebuild_book_stats)
+                await store.mark_done(f"{run}:finalize", 0, RUN_TTL)
+            logger.info("Rebuilt book stats (%s groups).", groups)
+            await redis_client.set("books_last_refresh_status", "completed")
+
+        logger.info("Refresh run %s: processed %s of %s shards here.", run, mine, len(shards))
+        return {"status": "success", "run": run, "shards": len(shards), "processed": mine}
 
     except Exception as e:
         logger.error(f"Error during refresh: {str(e)}")
         await redis_client.set("books_last_refresh_status", "failed")
         raise e
 
-    finally:
-     
-        await redis_client.delete(lock_key)
-        logger.info("Refresh lock released.")
 
+def register(runtime: JobRuntime) -> None:
+    """Register catalogue maintenance handlers on the job runtime."""
+
+    @runtime.handler("refresh_books")
+    async def _refresh(job: Job) -> None:
+        result = await refresh_books(job.payload.get("run"))
+        logger.info("job.done id=%s name=%s result=%s", job.id, job.name, result)
 
+    @runtime.handler("rebuild_stats")
+    async def _rebuild_stats(job: Job) -> None:
+        groups = await asyncio.to_thread(rebuild_book_stats)
+        logger.info("job.done id=%s name=%s groups=%s", job.id, job.name, groups)
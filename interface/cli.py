@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import json
+from pathlib import Path
+
 import typer
 from typing import Optional
 from . import client
@@ -31,39 +34,60 @@ def health():
 # List books
 # -----------------------
 @app.command(name="list")
-def list_books():
-    """List all books."""
-    try:
-        token = load_token()
-        books = client.list_books(token)
-    except client.ClientError as exc:
-        typer.echo(str(exc), err=True)
-        raise typer.Exit(code=1)
+def list_books(
+    limit: Optional[int] = typer.Option(
+        None, "--limit", min=1, help="Stop after this many books"
+    ),
+    page_size: int = typer.Option(
+        client.DEFAULT_PAGE_SIZE, "--page-size", min=1, help="Books fetched per request"
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print one JSON object per line (NDJSON)"
+    ),
+):
+    """List all books, streaming page by page."""
+    token = load_token()
+    books = client.iter_books(token, page_size=page_size, limit=limit)
 
-    if not books:
-        typer.echo("No books found.")
-        return
+    from itertools import batched
 
     from rich.console import Console
     from rich.table import Table
 
-    table = Table(title="Books")
-    table.add_column("ID", justify="right")
-    table.add_column("Title")
-    table.add_column("Author")
-    table.add_column("Year", justify="right")
-    table.add_column("Genre")
-
-    for b in books:
-        table.add_row(
-            str(b["id"]),
-            b["title"],
-            b["author"],
-            str(b["year"]),
-            b["genre"],
-        )
+    console = Console()
+    shown = 0
 
-    Console().print(table)
+    try:
+        # Render each page as soon as it arrives; fixed column widths keep
+        # the per-page tables aligned into one continuous listing.
+        for page in batched(books, page_size):
+            if as_json:
+                for b in page:
+                    typer.echo(json.dumps(b))
+            else:
+                table = Table(title="Books" if shown == 0 else None, show_header=shown == 0)
+                table.add_column("ID", justify="right", width=8)
+                table.add_column("Title", width=40, no_wrap=True)
+                table.add_column("Author", width=24, no_wrap=True)
+                table.add_column("Year", justify="right", width=6)
+                table.add_column("Genre", width=16, no_wrap=True)
+
+                for b in page:
+                    table.add_row(
+                        str(b["id"]),
+                        b["title"],
+                        b["author"],
+                        str(b["year"]),
+                        b["genre"],
+                    )
+                console.print(table)
+            shown += len(page)
+    except client.ClientError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=1)
+
+    if not shown and not as_json:
+        typer.echo("No books found.")
 
 
 # -----------------------
@@ -103,6 +127,116 @@ def add(
         raise typer.Exit(code=1)
 
 
+# -----------------------
+# Bulk import (protected)
+# -----------------------
+@app.command(name="import")
+def import_books(
+    filepath: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV or NDJSON file"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="csv | ndjson (default: from file extension)"
+    ),
+    chunk_size: int = typer.Option(500, "--chunk-size", min=1, max=1000, help="Books per request"),
+    concurrency: int = typer.Option(4, "--concurrency", min=1, help="Parallel uploads"),
+    rejects: Optional[Path] = typer.Option(
+        None, "--rejects", help="Where to write rejected rows (default: FILE.rejects.ndjson)"
+    ),
+):
+    """Bulk import books from a CSV/NDJSON file (resumable, requires login)."""
+    import asyncio
+    import time
+
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+    from . import importer
+
+    token = load_token()
+    if not token:
+        typer.echo("❌ No token found. Please login.")
+        raise typer.Exit(code=1)
+
+    if fmt is not None and fmt not in importer.FORMATS:
+        typer.echo(f"Unknown format '{fmt}'. Use one of: {', '.join(importer.FORMATS)}", err=True)
+        raise typer.Exit(code=2)
+
+    started = time.perf_counter()
+
+    async def run():
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("{task.description}"),
+            TimeElapsedColumn(),
+        ) as progress:
+            task = progress.add_task("Importing…")
+
+            def on_progress(uploaded: int, rejected: int) -> None:
+                rate = uploaded / max(time.perf_counter() - started, 1e-6)
+                progress.update(
+                    task,
+                    description=f"{uploaded:,} uploaded · {rejected:,} rejected · {rate:,.0f} rows/s",
+                )
+
+            async with client.AsyncBookClient(token, concurrency=concurrency) as api:
+                return await importer.import_file(
+                    filepath,
+                    api,
+                    fmt=fmt,
+                    chunk_size=chunk_size,
+                    concurrency=concurrency,
+                    rejects_path=rejects,
+                    on_progress=on_progress,
+                )
+
+    try:
+        result = asyncio.run(run())
+    except ValueError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=2)
+    except client.ClientError as exc:
+        typer.echo(str(exc), err=True)
+        typer.echo("Progress was checkpointed; rerun the same command to resume.", err=True)
+        raise typer.Exit(code=1)
+
+    resumed = " (resumed)" if result.resumed else ""
+    typer.echo(
+        f"✅ Imported {result.uploaded} books, rejected {result.rejected}{resumed} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+# -----------------------
+# Incremental mirror sync
+# -----------------------
+@app.command()
+def sync(
+    db: Path = typer.Option(Path("books-mirror.db"), "--db", help="Local SQLite mirror file"),
+    page_size: int = typer.Option(
+        client.DEFAULT_CHANGES_PAGE, "--page-size", min=1, max=5000, help="Changes per request"
+    ),
+):
+    """Bring a local SQLite mirror up to date by applying catalogue changes."""
+    from . import mirror
+
+    token = load_token()
+    with mirror.Mirror(db) as local:
+        start = local.since
+        try:
+            applied = mirror.sync(
+                local,
+                lambda since: client.list_changes(token, since, page_size),
+                on_page=lambda n, seq: typer.echo(f"… applied {n} changes (seq {seq})"),
+                fetch_books=lambda: client.iter_books(token),
+            )
+        except client.ClientError as exc:
+            typer.echo(str(exc), err=True)
+            raise typer.Exit(code=1)
+
+        typer.echo(
+            f"🔁 Synced {db}: {applied} changes applied (seq {start} → {local.since}), "
+            f"{local.count()} books in mirror"
+        )
+
+
 # -----------------------
 # Read a book
 # -----------------------
@@ -147,21 +281,27 @@ def delete(book_id: int):
 
 
 # -----------------------
-# Export books to CSV
+# Export books (CSV / Arrow / Parquet)
 # -----------------------
 @app.command()
 def export(
     filepath: Optional[str] = typer.Option(
-        "books.csv", help="CSV file path to export books"
-    )
+        "books.csv", help="File path to export books to"
+    ),
+    format: str = typer.Option(
+        "csv", "--format", "-f", help="csv | arrow | parquet"
+    ),
 ):
-    """Export all books to CSV."""
+    """Export all books to CSV, or stream a typed Arrow/Parquet export."""
     token = load_token()
     if not token:
         typer.echo("❌ No token found. Please login.")
         raise typer.Exit(code=1)
     try:
-        client.export_books_csv(filepath, token)
+        if format == "csv":
+            client.export_books_csv(filepath, token)
+        else:
+            client.download_export(filepath, token, fmt=format)
         typer.echo(f"📁 Exported books to {filepath}")
     except client.ClientError as exc:
         typer.echo(str(exc), err=True)
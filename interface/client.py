@@ -3,8 +3,14 @@
 # filepath: interface/client.py
 from __future__ import annotations
 
+import asyncio
+import atexit
 import csv
 import os
+import random
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional
 
 import httpx
@@ -14,6 +20,21 @@ import httpx
 # -----------------------
 BASE_URL = os.getenv("BOOK_API_BASE_URL", "http://backend:8000")
 DEFAULT_TIMEOUT = 5.0
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_CHANGES_PAGE = 500
+MAX_BATCH_GET = 1000  # server limit for POST /books/batch-get
+
+# Connection pooling / keep-alive. HTTP/2 needs the optional `h2` package
+# (`pip install httpx[http2]`), so it is opt-in.
+HTTP2 = os.getenv("BOOK_API_HTTP2", "false").lower() in {"1", "true", "yes"}
+MAX_CONNECTIONS = int(os.getenv("BOOK_API_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("BOOK_API_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = 30.0
+
+# Retries / concurrency for the async batch helpers
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.2
 
 
 # -----------------------
@@ -23,6 +44,18 @@ class ClientError(RuntimeError):
     """Friendly client error for network / HTTP failures."""
 
 
+class ChangesExpired(ClientError):
+    """
+    The server no longer keeps the changes after `since` (410): reload the
+    whole catalogue, then continue the feed from `latest_seq`.
+    """
+
+    def __init__(self, since: int, latest_seq: int) -> None:
+        super().__init__(f"Changes after seq={since} are no longer kept; a full resync is needed.")
+        self.since = since
+        self.latest_seq = latest_seq
+
+
 # -----------------------
 # Helpers
 # -----------------------
@@ -37,6 +70,11 @@ def _auth_headers(token: Optional[str]) -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
+def _check_expired(resp: httpx.Response, since: int) -> None:
+    if resp.status_code == 410:
+        raise ChangesExpired(since, int(resp.headers["X-Latest-Seq"]))
+
+
 def _handle_http_errors(exc: Exception, context: str) -> None:
     raise ClientError(
         f"{context}\n"
@@ -47,15 +85,75 @@ def _handle_http_errors(exc: Exception, context: str) -> None:
     ) from exc
 
 
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _check_http2(http2: bool) -> bool:
+    if not http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError as exc:
+        raise ClientError(
+            "BOOK_API_HTTP2 is enabled but the 'h2' package is missing.\n"
+            "Install it with: pip install 'httpx[http2]'"
+        ) from exc
+    return True
+
+
+# -----------------------
+# Pooled client
+# -----------------------
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    """
+    Return the shared, lazily created `httpx.Client`.
+
+    Connections are kept alive between calls, so scripts that call the API
+    in a loop only pay the TCP/TLS handshake once. Connection failures are
+    retried by the transport.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                transport = httpx.HTTPTransport(
+                    retries=DEFAULT_RETRIES,
+                    limits=_limits(),
+                    http2=_check_http2(HTTP2),
+                )
+                _client = httpx.Client(timeout=DEFAULT_TIMEOUT, transport=transport)
+    return _client
+
+
+def close_client() -> None:
+    """Close the shared client (also called at interpreter exit)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
+
+
 # -----------------------
 # Public API
 # -----------------------
 def health() -> dict[str, Any]:
     try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.get(f"{BASE_URL}/healthz")
-            resp.raise_for_status()
-            return resp.json()
+        resp = get_client().get(f"{BASE_URL}/healthz")
+        resp.raise_for_status()
+        return resp.json()
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, "Unable to contact backend health endpoint.")
 
@@ -63,83 +161,166 @@ def health() -> dict[str, Any]:
 def login(username: str, password: str) -> str:
     """Login to the backend and return JWT token."""
     try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.post(
-                f"{BASE_URL}/token/login",
-                json={
-                    "username": username,
-                    "password": password,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = get_client().post(
+            f"{BASE_URL}/token/login",
+            json={
+                "username": username,
+                "password": password,
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
 
-            token = data.get("access_token")
-            if not token:
-                raise ClientError("Login succeeded but no access_token returned")
+        token = data.get("access_token")
+        if not token:
+            raise ClientError("Login succeeded but no access_token returned")
 
-            return token
+        return token
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, f"Unable to login user '{username}'.")
 
 
 def list_books(token: Optional[str]) -> list[dict[str, Any]]:
     try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.get(
-                f"{BASE_URL}/books",
-                headers=_auth_headers(token),
-            )
-            resp.raise_for_status()
-            return resp.json()
+        resp = get_client().get(
+            f"{BASE_URL}/books",
+            headers=_auth_headers(token),
+        )
+        resp.raise_for_status()
+        return resp.json()
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, "Unable to fetch books.")
 
 
+def _fetch_page(token: Optional[str], after_id: int, page_size: int) -> list[dict[str, Any]]:
+    try:
+        resp = get_client().get(
+            f"{BASE_URL}/books",
+            params={"after_id": after_id, "limit": page_size},
+            headers=_auth_headers(token),
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except (httpx.RequestError, httpx.HTTPStatusError) as exc:
+        _handle_http_errors(exc, f"Unable to fetch books after id={after_id}.")
+
+
+def iter_books(
+    token: Optional[str],
+    *,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    limit: Optional[int] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Lazily walk the whole catalogue page by page (keyset pagination).
+
+    While the caller consumes one page the next one is fetched in the
+    background, so at most two pages are held in memory.
+    """
+    remaining = limit
+
+    def next_size() -> int:
+        return page_size if remaining is None else min(page_size, remaining)
+
+    if next_size() <= 0:
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(_fetch_page, token, 0, next_size())
+        while pending is not None:
+            page = pending.result()
+            requested = next_size()
+            if remaining is not None:
+                remaining -= len(page)
+            pending = None
+            if len(page) == requested and next_size() > 0:
+                pending = pool.submit(_fetch_page, token, page[-1]["id"], next_size())
+            yield from page
+
+
 def read_book(book_id: int, token: Optional[str]) -> dict[str, Any]:
     try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.get(
-                f"{BASE_URL}/books/{book_id}",
-                headers=_auth_headers(token),
-            )
-            if resp.status_code == 404:
-                return {}
-            resp.raise_for_status()
-            return resp.json()
+        resp = get_client().get(
+            f"{BASE_URL}/books/{book_id}",
+            headers=_auth_headers(token),
+        )
+        if resp.status_code == 404:
+            return {}
+        resp.raise_for_status()
+        return resp.json()
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, f"Unable to read book with id={book_id}.")
 
 
-def add_book(book: dict[str, Any], token: Optional[str]) -> dict[str, Any]:
-    try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.post(
-                f"{BASE_URL}/books",
-                json=book,
+def read_books(ids: Iterable[int], token: Optional[str]) -> list[dict[str, Any]]:
+    """
+    Fetch many books with one request per MAX_BATCH_GET ids (POST /books/batch-get).
+    Results follow `ids` order, with {} for ids that do not exist.
+    """
+    ids = list(ids)
+    found: dict[int, dict[str, Any]] = {}
+    for start in range(0, len(ids), MAX_BATCH_GET):
+        chunk = ids[start : start + MAX_BATCH_GET]
+        try:
+            resp = get_client().post(
+                f"{BASE_URL}/books/batch-get",
+                json={"ids": chunk},
                 headers=_auth_headers(token),
             )
             resp.raise_for_status()
-            return resp.json()
+        except (httpx.RequestError, httpx.HTTPStatusError) as exc:
+            _handle_http_errors(exc, f"Unable to read {len(chunk)} books.")
+        found.update((book["id"], book) for book in resp.json()["books"])
+    return [found.get(book_id, {}) for book_id in ids]
+
+
+def add_book(book: dict[str, Any], token: Optional[str]) -> dict[str, Any]:
+    try:
+        resp = get_client().post(
+            f"{BASE_URL}/books",
+            json=book,
+            headers=_auth_headers(token),
+        )
+        resp.raise_for_status()
+        return resp.json()
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, "Unable to add new book.")
 
 
 def delete_book(book_id: int, token: Optional[str]) -> bool:
     try:
-        with httpx.Client(timeout=DEFAULT_TIMEOUT) as client:
-            resp = client.delete(
-                f"{BASE_URL}/books/{book_id}",
-                headers=_auth_headers(token),
-            )
-            if resp.status_code == 404:
-                return False
-            resp.raise_for_status()
-            return True
+        resp = get_client().delete(
+            f"{BASE_URL}/books/{book_id}",
+            headers=_auth_headers(token),
+        )
+        if resp.status_code == 404:
+            return False
+        resp.raise_for_status()
+        return True
     except (httpx.RequestError, httpx.HTTPStatusError) as exc:
         _handle_http_errors(exc, f"Unable to delete book with id={book_id}.")
 
 
+def list_changes(
+    token: Optional[str], since: int, limit: int = DEFAULT_CHANGES_PAGE
+) -> dict[str, Any]:
+    """
+    Fetch one page of the change feed after sequence number `since`.
+    Raises ChangesExpired when the server has compacted those changes away.
+    """
+    try:
+        resp = get_client().get(
+            f"{BASE_URL}/books/changes",
+            params={"since": since, "limit": limit},
+            headers=_auth_headers(token),
+        )
+        _check_expired(resp, since)
+        resp.raise_for_status()
+        return resp.json()
+    except (httpx.RequestError, httpx.HTTPStatusError) as exc:
+        _handle_http_errors(exc, f"Unable to fetch changes since seq={since}.")
+
+
 def export_books_csv(filepath: str, token: Optional[str]) -> None:
     books = list_books(token)
     if not books:
@@ -151,3 +332,171 @@ def export_books_csv(filepath: str, token: Optional[str]) -> None:
         writer.writerows(books)
 
 
+def download_export(filepath: str, token: Optional[str], fmt: str = "parquet", compression: str = "zstd") -> int:
+    """
+    Stream GET /books/export to `filepath` without buffering it in memory.
+    Returns the number of bytes written.
+    """
+    written = 0
+    try:
+        with get_client().stream(
+            "GET",
+            f"{BASE_URL}/books/export",
+            params={"format": fmt, "compression": compression},
+            headers=_auth_headers(token),
+            timeout=None,
+        ) as resp:
+            resp.raise_for_status()
+            with open(filepath, "wb") as f:
+                for chunk in resp.iter_bytes():
+                    written += f.write(chunk)
+    except (httpx.RequestError, httpx.HTTPStatusError) as exc:
+        _handle_http_errors(exc, f"Unable to export books as {fmt}.")
+    return written
+
+
+# -----------------------
+# Async client
+# -----------------------
+# Errors raised before the request reached the server; safe to retry for
+# any method. Other transport errors are only retried for idempotent calls.
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_IDEMPOTENT = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+class AsyncBookClient:
+    """
+    Async client sharing one connection pool across many concurrent calls.
+
+    Batch helpers run with bounded concurrency, and connection errors are
+    retried with exponential backoff and jitter.
+
+        async with AsyncBookClient(token) as api:
+            books = await api.read_books(range(1, 500))
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        *,
+        base_url: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.base_url = base_url or BASE_URL
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=_auth_headers(token),
+            timeout=DEFAULT_TIMEOUT,
+            limits=_limits(),
+            http2=_check_http2(HTTP2 if http2 is None else http2),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncBookClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        retryable = httpx.TransportError if method in _IDEMPOTENT else _CONNECT_ERRORS
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._client.request(method, path, **kwargs)
+            except retryable as exc:
+                if attempt == self.retries:
+                    _handle_http_errors(exc, f"{method} {path} failed after {attempt + 1} attempts.")
+                delay = self.backoff * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+            except httpx.RequestError as exc:
+                _handle_http_errors(exc, f"{method} {path} failed.")
+
+    async def _bounded(self, func, items: Iterable, concurrency: Optional[int]) -> list:
+        """Run `func` over `items` with at most `concurrency` calls in flight."""
+        items = list(items)
+        results: list = [None] * len(items)
+        pending = iter(enumerate(items))
+
+        async def worker() -> None:
+            for idx, item in pending:
+                results[idx] = await func(item)
+
+        workers = min(concurrency or self.concurrency, len(items))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def read_book(self, book_id: int) -> dict[str, Any]:
+        resp = await self._request("GET", f"/books/{book_id}")
+        if resp.status_code == 404:
+            return {}
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            _handle_http_errors(exc, f"Unable to read book with id={book_id}.")
+        return resp.json()
+
+    async def add_book(self, book: dict[str, Any]) -> dict[str, Any]:
+        resp = await self._request("POST", "/books", json=book)
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            _handle_http_errors(exc, "Unable to add new book.")
+        return resp.json()
+
+    async def add_books_bulk(self, books: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Create a chunk of books with one request (POST /books/bulk)."""
+        resp = await self._request("POST", "/books/bulk", json=books)
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            _handle_http_errors(exc, f"Unable to add {len(books)} books.")
+        return resp.json()
+
+    async def list_changes(self, since: int, limit: int = DEFAULT_CHANGES_PAGE) -> dict[str, Any]:
+        """
+        One page of the change feed after `since`; `latest_seq` is added from
+        the X-Latest-Seq header. Raises ChangesExpired like `list_changes`.
+        """
+        resp = await self._request("GET", "/books/changes", params={"since": since, "limit": limit})
+        _check_expired(resp, since)
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            _handle_http_errors(exc, f"Unable to fetch changes since seq={since}.")
+        page = resp.json()
+        page["latest_seq"] = int(resp.headers.get("X-Latest-Seq", page["next_since"]))
+        return page
+
+    async def latest_seq(self) -> int:
+        """Sequence number of the newest catalogue change."""
+        try:
+            page = await self.list_changes(0, 1)
+        except ChangesExpired as exc:
+            return exc.latest_seq
+        return page["latest_seq"]
+
+    async def read_books(
+        self, ids: Iterable[int], *, concurrency: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch many books concurrently, one request per id; results follow
+        `ids` order ({} if missing). The module-level `read_books` does the
+        same in one request per MAX_BATCH_GET ids.
+        """
+        return await self._bounded(self.read_book, ids, concurrency)
+
+    async def add_books(
+        self, books: Iterable[dict[str, Any]], *, concurrency: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """Create many books concurrently; results follow input order."""
+        return await self._bounded(self.add_book, books, concurrency)
@@ -0,0 +1,343 @@
+# filepath: interface/importer.py
+"""
+Bulk import of books from CSV or NDJSON files.
+
+Rows are streamed from disk, validated locally with the backend's
+`BookCreate` rules and uploaded in chunks over several concurrent
+connections. Progress is checkpointed so an interrupted import resumes
+where it stopped instead of starting over.
+
+A chunk whose upload failed without a response (a timeout, a dropped
+connection) may still have been committed. On resume, such chunks are
+looked up in the change feed before they are sent again, so they are not
+imported twice. This relies on POST /books/bulk being atomic: every
+repository's `create_many` commits a chunk whole, with consecutive
+sequence numbers, or not at all.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import os
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from pydantic import ValidationError
+
+from book_service.app.models import BookCreate
+
+from .client import AsyncBookClient, ChangesExpired, ClientError
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_CONCURRENCY = 4
+CHANGES_PAGE = 5000  # server limit for GET /books/changes
+_FIELDS = tuple(BookCreate.model_fields)
+
+
+def detect_format(path: Path) -> str:
+    """Guess the input format from the file extension."""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in {".ndjson", ".jsonl"}:
+        return "ndjson"
+    raise ValueError(f"Cannot detect format of {path.name}; pass --format csv|ndjson")
+
+
+def iter_rows(path: Path, fmt: str) -> Iterator[dict[str, Any]]:
+    """Yield raw rows one at a time without loading the file into memory."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield {"__error__": f"invalid JSON: {exc.msg}", "__raw__": line}
+
+
+def validate_row(row: dict[str, Any]) -> tuple[Optional[dict[str, Any]], Optional[str]]:
+    """Return (normalized payload, None) or (None, error message)."""
+    if "__error__" in row:
+        return None, row["__error__"]
+    try:
+        book = BookCreate.model_validate(row)
+    except ValidationError as exc:
+        errors = "; ".join(
+            f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors()
+        )
+        return None, errors
+    return book.model_dump(), None
+
+
+def _fingerprint(book: dict[str, Any]) -> tuple:
+    return tuple(book.get(name) for name in _FIELDS)
+
+
+def source_identity(path: Path) -> dict[str, int]:
+    """Size and mtime of the input; a checkpoint only applies to the file it was written for."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@dataclass
+class Chunk:
+    """Row range [start, end) of the input with its valid and rejected rows."""
+
+    index: int
+    start: int
+    end: int
+    books: list[dict[str, Any]] = field(default_factory=list)
+    rejects: list[dict[str, Any]] = field(default_factory=list)
+
+
+def iter_chunks(
+    rows: Iterator[dict[str, Any]], chunk_size: int, skip: Callable[[int], bool]
+) -> Iterator[Chunk]:
+    """
+    Group rows into fixed row-index ranges so chunk boundaries are stable
+    across runs; chunks for which `skip(index)` is true are not validated.
+    """
+    chunk: Optional[Chunk] = None
+    for row_no, row in enumerate(rows):
+        index = row_no // chunk_size
+        if chunk is None or chunk.index != index:
+            if chunk is not None and not skip(chunk.index):
+                yield chunk
+            chunk = Chunk(index=index, start=index * chunk_size, end=index * chunk_size)
+        chunk.end = row_no + 1
+        if skip(index):
+            continue
+        payload, error = validate_row(row)
+        if error:
+            chunk.rejects.append({"row": row_no + 1, "error": error, "data": row})
+        else:
+            chunk.books.append(payload)
+    if chunk is not None and not skip(chunk.index):
+        yield chunk
+
+
+class Checkpoint:
+    """
+    Persisted import progress.
+
+    `watermark` is the number of leading chunks that are fully done;
+    `done` holds finished chunks beyond it (concurrent uploads complete
+    out of order). `pending` maps chunks that were sent but not confirmed
+    to the change-feed sequence number from before they were sent. Writes
+    are atomic so a crash never corrupts the file.
+    """
+
+    def __init__(self, path: Path, chunk_size: int, source: Optional[dict[str, int]] = None) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.source = source
+        self.watermark = 0
+        self.done: set[int] = set()
+        self.pending: dict[int, int] = {}
+        self.uploaded = 0
+        self.rejected = 0
+        self.resumed = False
+
+    @classmethod
+    def load(cls, path: Path, chunk_size: int, source: Optional[dict[str, int]] = None) -> "Checkpoint":
+        """Resume from `path` unless it is missing or was written for a different input file."""
+        checkpoint = cls(path, chunk_size, source)
+        if path.exists():
+            data = json.loads(path.read_text())
+            if data.get("source") != source:
+                return checkpoint
+            checkpoint.chunk_size = data["chunk_size"]
+            checkpoint.watermark = data["watermark"]
+            checkpoint.done = set(data["done"])
+            checkpoint.pending = {int(index): seq for index, seq in data.get("pending", {}).items()}
+            checkpoint.uploaded = data["uploaded"]
+            checkpoint.rejected = data["rejected"]
+            checkpoint.resumed = True
+        return checkpoint
+
+    def is_done(self, index: int) -> bool:
+        return index < self.watermark or index in self.done
+
+    def mark_sent(self, chunk: Chunk, seq: int) -> None:
+        # Keep the oldest: an earlier attempt may still be the one that committed.
+        self.pending.setdefault(chunk.index, seq)
+        self.save()
+
+    def mark_done(self, chunk: Chunk, uploaded: int) -> None:
+        self.pending.pop(chunk.index, None)
+        self.done.add(chunk.index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+        self.uploaded += uploaded
+        self.rejected += len(chunk.rejects)
+        self.save()
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "source": self.source,
+                    "chunk_size": self.chunk_size,
+                    "watermark": self.watermark,
+                    "done": sorted(self.done),
+                    "pending": {str(index): seq for index, seq in sorted(self.pending.items())},
+                    "uploaded": self.uploaded,
+                    "rejected": self.rejected,
+                }
+            )
+        )
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class ImportResult:
+    uploaded: int
+    rejected: int
+    resumed: bool
+
+
+async def committed_chunks(api: AsyncBookClient, chunks: list[Chunk], since: int) -> list[Chunk]:
+    """
+    The chunks among `chunks` that were committed after change `since`.
+
+    Every backend commits a bulk upload all or nothing with consecutive
+    sequence numbers (`create_many`), so a committed chunk is one unbroken
+    run of creates matching its books in order. Identical books created by
+    other clients land outside such a run and are not mistaken for it;
+    only someone posting the same rows in the same order at the same time
+    could be.
+    """
+    pending: dict[tuple, list[Chunk]] = {}
+    for chunk in chunks:
+        if chunk.books:
+            pending.setdefault(tuple(map(_fingerprint, chunk.books)), []).append(chunk)
+    runs: list[tuple[tuple, int]] = []  # (chunk key, books matched so far)
+    committed = []
+    try:
+        while True:
+            page = await api.list_changes(since, CHANGES_PAGE)
+            for change in page["changes"]:
+                book = change["book"] if change["op"] == "create" else None
+                key = _fingerprint(book) if book else None
+                runs = [(run, matched + 1) for run, matched in runs if run[matched] == key]
+                runs += [(run, 1) for run in pending if run[0] == key]
+                done = next((run for run, matched in runs if matched == len(run)), None)
+                if done is not None:
+                    committed.append(pending[done].pop(0))
+                    if not pending[done]:
+                        del pending[done]
+                    runs = []  # every other run overlaps this one
+            since = page["next_since"]
+            if not page["has_more"]:
+                return committed
+    except ChangesExpired as exc:
+        raise ClientError(
+            f"Cannot tell which unconfirmed chunks were committed: the server no longer keeps "
+            f"changes after seq={exc.since}. Check the catalogue, then delete the checkpoint to start over."
+        ) from exc
+
+
+def _is_client_side_rejection(exc: ClientError) -> bool:
+    cause = exc.__cause__
+    return (
+        isinstance(cause, httpx.HTTPStatusError)
+        and 400 <= cause.response.status_code < 500
+        and cause.response.status_code not in (401, 403, 429)
+    )
+
+
+async def import_file(
+    path: Path,
+    api: AsyncBookClient,
+    *,
+    fmt: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    checkpoint_path: Optional[Path] = None,
+    rejects_path: Optional[Path] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> ImportResult:
+    """
+    Stream `path` into the backend. At most `concurrency` chunks are in
+    flight, so memory stays bounded by concurrency * chunk_size rows.
+
+    Network failures abort the import with the checkpoint intact; rerunning
+    the same command resumes (a changed input file starts over). Rows rejected locally or by the server (4xx)
+    are appended to the rejects file as NDJSON.
+    """
+    fmt = fmt or detect_format(path)
+    checkpoint_path = checkpoint_path or path.with_name(path.name + ".checkpoint")
+    rejects_path = rejects_path or path.with_name(path.name + ".rejects.ndjson")
+
+    checkpoint = Checkpoint.load(checkpoint_path, chunk_size, source_identity(path))
+    resumed = checkpoint.resumed
+
+    with open(rejects_path, "a" if resumed else "w", encoding="utf-8") as rejects_file:
+
+        def finish(chunk: Chunk, uploaded: int) -> None:
+            for reject in chunk.rejects:
+                rejects_file.write(json.dumps(reject) + "\n")
+            rejects_file.flush()
+            checkpoint.mark_done(chunk, uploaded)
+            if on_progress:
+                on_progress(checkpoint.uploaded, checkpoint.rejected)
+
+        if checkpoint.pending:
+            unconfirmed = list(
+                iter_chunks(iter_rows(path, fmt), checkpoint.chunk_size, lambda index: index not in checkpoint.pending)
+            )
+            for chunk in await committed_chunks(api, unconfirmed, min(checkpoint.pending.values())):
+                finish(chunk, len(chunk.books))
+        seq = await api.latest_seq()
+
+        async def upload(chunk: Chunk) -> None:
+            uploaded = 0
+            if chunk.books:
+                checkpoint.mark_sent(chunk, seq)
+                try:
+                    uploaded = len(await api.add_books_bulk(chunk.books))
+                except ClientError as exc:
+                    if not _is_client_side_rejection(exc):
+                        raise
+                    chunk.rejects.extend(
+                        {"chunk": chunk.index, "error": str(exc).splitlines()[0], "data": book}
+                        for book in chunk.books
+                    )
+            finish(chunk, uploaded)
+
+        in_flight: set[asyncio.Task] = set()
+        try:
+            for chunk in iter_chunks(iter_rows(path, fmt), checkpoint.chunk_size, checkpoint.is_done):
+                if len(in_flight) >= concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.create_task(upload(chunk)))
+            if in_flight:
+                done, _ = await asyncio.wait(in_flight)
+                for task in done:
+                    task.result()
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            raise
+
+    result = ImportResult(uploaded=checkpoint.uploaded, rejected=checkpoint.rejected, resumed=resumed)
+    checkpoint.clear()
+    return result
@@ -0,0 +1,126 @@
+# filepath: interface/mirror.py
+"""
+Local SQLite mirror of the catalogue, kept current from the change feed.
+
+Only changes after the last applied sequence number are fetched, so a sync
+costs O(churn) rather than O(catalogue size). When the server no longer
+keeps those changes, the mirror is reloaded from a full listing first.
+"""
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from .client import ChangesExpired
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    description TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    genre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO books (id, title, author, description, year, genre)
+VALUES (:id, :title, :author, :description, :year, :genre)
+ON CONFLICT(id) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    description = excluded.description,
+    year = excluded.year,
+    genre = excluded.genre
+"""
+
+
+class Mirror:
+    """A SQLite file holding a copy of the catalogue plus the last applied seq."""
+
+    def __init__(self, path: Path) -> None:
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "Mirror":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def since(self) -> int:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = 'since'").fetchone()
+        return row[0] if row else 0
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def _set_since(self, since: int) -> None:
+        self.conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES ('since', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (since,),
+        )
+
+    def apply(self, changes: list[dict[str, Any]], next_since: int) -> None:
+        """Apply one page of changes and advance `since` atomically."""
+        with self.conn:
+            for change in changes:
+                if change["op"] == "delete":
+                    self.conn.execute("DELETE FROM books WHERE id = ?", (change["book_id"],))
+                else:
+                    self.conn.execute(UPSERT, change["book"])
+            self._set_since(next_since)
+
+    def reload(self, books: Iterable[dict[str, Any]], since: int) -> None:
+        """
+        Replace every book with `books` (listed after change `since` was
+        made) in one transaction. Changes after `since` that the listing
+        already saw are re-applied harmlessly by the next sync.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM books")
+            self.conn.executemany(UPSERT, books)
+            self._set_since(since)
+
+
+def sync(
+    mirror: Mirror,
+    fetch_page: Callable[[int], dict[str, Any]],
+    on_page: Optional[Callable[[int, int], None]] = None,
+    fetch_books: Optional[Callable[[], Iterable[dict[str, Any]]]] = None,
+) -> int:
+    """
+    Pull pages from `fetch_page(since)` until caught up.
+    Returns the number of changes applied.
+
+    If the feed no longer reaches back to the mirror's `since`, the mirror
+    is reloaded from `fetch_books()` (without it, ChangesExpired is raised).
+    """
+    applied = 0
+    while True:
+        try:
+            page = fetch_page(mirror.since)
+        except ChangesExpired as exc:
+            if fetch_books is None:
+                raise
+            mirror.reload(fetch_books(), exc.latest_seq)
+            continue
+        changes = page["changes"]
+        if changes:
+            mirror.apply(changes, page["next_since"])
+            applied += len(changes)
+            if on_page:
+                on_page(applied, page["next_since"])
+        if not page["has_more"]:
+            return applied
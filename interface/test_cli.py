@@ -1,4 +1,6 @@
 
+import json
+
 from typer.testing import CliRunner
 from interface.cli import app
 
@@ -31,9 +33,101 @@ def test_cli_list_books(monkeypatch):
             "genre": "Fiction",
         }
     ]
-    monkeypatch.setattr("interface.client.list_books", lambda: sample)
+    monkeypatch.setattr("interface.client.iter_books", lambda token, **kw: iter(sample))
     result = runner.invoke(app, ["list"])
     assert result.exit_code == 0
     assert "Books" in result.stdout
 
 
+def test_cli_list_books_json_streams_ndjson(monkeypatch):
+    """--json prints one JSON object per line and forwards paging options."""
+    calls = {}
+
+    def fake_iter_books(token, *, page_size, limit):
+        calls.update(page_size=page_size, limit=limit)
+        return iter([{"id": i, "title": f"B{i}"} for i in range(1, 4)])
+
+    monkeypatch.setattr("interface.client.iter_books", fake_iter_books)
+    result = runner.invoke(app, ["list", "--json", "--page-size", "2", "--limit", "3"])
+    assert result.exit_code == 0
+    lines = result.stdout.strip().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+    assert calls == {"page_size": 2, "limit": 3}
+
+
+
+
+def test_cli_sync_applies_deltas_to_local_mirror(monkeypatch, tmp_path):
+    """sync replays change pages into SQLite and resumes from the stored seq."""
+    import sqlite3
+
+    def book(book_id, title):
+        return {"id": book_id, "title": title, "author": "A", "description": "d", "year": 2000, "genre": "G"}
+
+    log = [
+        {"seq": 1, "op": "create", "book_id": 1, "book": book(1, "One")},
+        {"seq": 2, "op": "create", "book_id": 2, "book": book(2, "Two")},
+        {"seq": 3, "op": "update", "book_id": 1, "book": book(1, "One v2")},
+        {"seq": 4, "op": "delete", "book_id": 2, "book": None},
+    ]
+    requested = []
+
+    def fake_list_changes(token, since, limit):
+        requested.append(since)
+        page = [c for c in log if c["seq"] > since][:limit]
+        return {
+            "changes": page,
+            "next_since": page[-1]["seq"] if page else since,
+            "has_more": len([c for c in log if c["seq"] > since]) > limit,
+        }
+
+    monkeypatch.setattr("interface.client.list_changes", fake_list_changes)
+    db = tmp_path / "mirror.db"
+
+    result = runner.invoke(app, ["sync", "--db", str(db), "--page-size", "3"])
+    assert result.exit_code == 0, result.stdout
+    assert requested == [0, 3]
+    rows = sqlite3.connect(db).execute("SELECT id, title FROM books").fetchall()
+    assert rows == [(1, "One v2")]
+
+    log.append({"seq": 5, "op": "create", "book_id": 3, "book": book(3, "Three")})
+    requested.clear()
+    result = runner.invoke(app, ["sync", "--db", str(db)])
+    assert result.exit_code == 0
+    assert requested == [4]
+    assert "1 changes applied" in result.stdout
+
+
+def test_cli_sync_reloads_the_mirror_when_its_changes_are_gone(monkeypatch, tmp_path):
+    """A 410 from the change feed replaces the mirror with a full listing."""
+    import sqlite3
+
+    from interface import client as client_module
+
+    db = tmp_path / "mirror.db"
+    conn = sqlite3.connect(db)
+    conn.executescript(
+        "CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT NOT NULL, author TEXT NOT NULL, "
+        "description TEXT NOT NULL, year INTEGER NOT NULL, genre TEXT NOT NULL);"
+        "CREATE TABLE sync_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        "INSERT INTO books VALUES (9, 'Deleted long ago', 'A', 'd', 2000, 'G');"
+        "INSERT INTO sync_state VALUES ('since', 2);"
+    )
+    conn.commit()
+    conn.close()
+    requested = []
+
+    def fake_list_changes(token, since, limit):
+        requested.append(since)
+        if since < 10:
+            raise client_module.ChangesExpired(since, 12)
+        return {"changes": [], "next_since": since, "has_more": False}
+
+    listing = [{"id": 1, "title": "One", "author": "A", "description": "d", "year": 2000, "genre": "G"}]
+    monkeypatch.setattr("interface.client.list_changes", fake_list_changes)
+    monkeypatch.setattr("interface.client.iter_books", lambda token: iter(listing))
+
+    result = runner.invoke(app, ["sync", "--db", str(db)])
+    assert result.exit_code == 0, result.stdout
+    assert requested == [2, 12]
+    assert sqlite3.connect(db).execute("SELECT id, title FROM books").fetchall() == [(1, "One")]
@@ -0,0 +1,156 @@
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from interface import client
+
+
+def test_get_client_is_shared(monkeypatch):
+    """Module functions reuse one pooled client instead of opening a new one."""
+    monkeypatch.setattr(client, "_client", None)
+    first = client.get_client()
+    try:
+        assert client.get_client() is first
+    finally:
+        client.close_client()
+    assert client._client is None
+
+
+def test_module_functions_use_pooled_client(monkeypatch):
+    """read_book goes through the shared client and maps 404 to {}."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        if request.url.path == "/books/2":
+            return httpx.Response(404, json={"detail": "Book not found"})
+        return httpx.Response(200, json={"id": 1, "title": "Dune"})
+
+    pooled = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client, "_client", pooled)
+
+    assert client.read_book(1, None)["title"] == "Dune"
+    assert client.read_book(2, None) == {}
+    assert seen == ["/books/1", "/books/2"]
+
+
+def test_read_books_uses_one_batch_request_per_chunk(monkeypatch):
+    """read_books resolves ids with POST /books/batch-get, keeping input order."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = json.loads(request.content)["ids"]
+        seen.append(ids)
+        return httpx.Response(200, json={"books": [{"id": i} for i in ids if i != 3], "missing": [3]})
+
+    pooled = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client, "_client", pooled)
+    monkeypatch.setattr(client, "MAX_BATCH_GET", 3)
+
+    assert client.read_books([5, 3, 1, 4], None) == [{"id": 5}, {}, {"id": 1}, {"id": 4}]
+    assert seen == [[5, 3, 1], [4]]
+
+
+def test_iter_books_walks_pages_with_keyset_cursor(monkeypatch):
+    """iter_books follows after_id cursors and honours the overall limit."""
+    catalogue = [{"id": i} for i in range(1, 8)]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        after_id = int(request.url.params["after_id"])
+        size = int(request.url.params["limit"])
+        requests.append((after_id, size))
+        page = [b for b in catalogue if b["id"] > after_id][:size]
+        return httpx.Response(200, json=page)
+
+    monkeypatch.setattr(client, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    assert [b["id"] for b in client.iter_books(None, page_size=3)] == list(range(1, 8))
+    assert requests == [(0, 3), (3, 3), (6, 3)]
+
+    requests.clear()
+    assert [b["id"] for b in client.iter_books(None, page_size=3, limit=4)] == [1, 2, 3, 4]
+    assert requests == [(0, 3), (3, 1)]
+
+
+def test_async_read_books_preserves_order_and_bounds_concurrency():
+    """Batch helper returns results in request order with limited parallelism."""
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        book_id = int(request.url.path.rsplit("/", 1)[1])
+        if book_id == 3:
+            return httpx.Response(404)
+        return httpx.Response(200, json={"id": book_id})
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.AsyncBookClient(base_url="http://test", transport=transport) as api:
+            return await api.read_books([5, 3, 1, 4, 2], concurrency=2)
+
+    books = asyncio.run(run())
+    assert books == [{"id": 5}, {}, {"id": 1}, {"id": 4}, {"id": 2}]
+    assert peak <= 2
+
+
+def test_async_client_retries_connection_errors():
+    """Connection errors are retried with backoff before giving up."""
+    attempts = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(201, json={"id": 7})
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.AsyncBookClient(
+            base_url="http://test", transport=transport, backoff=0
+        ) as api:
+            return await api.add_book({"title": "x"})
+
+    assert asyncio.run(run()) == {"id": 7}
+    assert attempts == 3
+
+
+def test_async_client_raises_client_error_after_retries():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with client.AsyncBookClient(
+            base_url="http://test", transport=transport, retries=1, backoff=0
+        ) as api:
+            await api.read_book(1)
+
+    with pytest.raises(client.ClientError):
+        asyncio.run(run())
+
+
+def test_download_export_streams_to_file(monkeypatch, tmp_path):
+    """download_export writes the /books/export body to disk as it arrives."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, dict(request.url.params)))
+        return httpx.Response(200, content=b"PAR1" + b"x" * 100)
+
+    pooled = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client, "_client", pooled)
+    target = tmp_path / "books.parquet"
+
+    assert client.download_export(str(target), None, fmt="parquet") == 104
+    assert target.read_bytes().startswith(b"PAR1")
+    assert seen == [("/books/export", {"format": "parquet", "compression": "zstd"})]
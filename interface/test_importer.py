@@ -0,0 +1,163 @@
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from interface import importer
+from interface.client import AsyncBookClient, ClientError
+
+CSV_HEADER = "title,author,description,year,genre\n"
+
+
+def _write_csv(path, rows):
+    path.write_text(CSV_HEADER + "".join(f"{r}\n" for r in rows), encoding="utf-8")
+
+
+def _bulk_handler(received, fail_on=(), commit_then_fail_on=()):
+    """Fake backend: POST /books/bulk appends to `received`, which GET /books/changes replays."""
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        if request.method == "GET":
+            since, limit = int(request.url.params["since"]), int(request.url.params["limit"])
+            feed = [
+                {"seq": seq, "book_id": seq, "op": "create", "book": {**book, "id": seq}}
+                for seq, book in enumerate(received[since : since + limit], since + 1)
+            ]
+            page = {"changes": feed, "next_since": feed[-1]["seq"] if feed else since,
+                    "has_more": since + limit < len(received)}
+            return httpx.Response(200, json=page, headers={"X-Latest-Seq": str(len(received))})
+        calls += 1
+        if calls in fail_on:
+            raise httpx.ConnectError("refused", request=request)
+        books = json.loads(request.content)
+        received.extend(books)
+        if calls in commit_then_fail_on:
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(201, json=[{"id": len(received)} for _ in books])
+
+    return handler
+
+
+def _run(path, handler, **kwargs):
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with AsyncBookClient(base_url="http://test", transport=transport, retries=0) as api:
+            return await importer.import_file(path, api, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_import_csv_validates_locally_and_writes_rejects(tmp_path):
+    """Valid rows are normalized and uploaded in chunks; invalid rows are rejected."""
+    source = tmp_path / "books.csv"
+    _write_csv(
+        source,
+        [
+            "Dune,Frank Herbert,Classic,1965,sci-fi",
+            "Old,Anon,Too old,1800,fiction",
+            " Emma ,Jane Austen,Novel,1915,romance",
+        ],
+    )
+    received = []
+
+    result = _run(source, _bulk_handler(received), chunk_size=2, concurrency=2)
+
+    assert (result.uploaded, result.rejected) == (2, 1)
+    assert [b["title"] for b in received] == ["Dune", "Emma"]
+    assert received[0]["genre"] == "Sci-Fi"
+
+    rejects = [json.loads(line) for line in (tmp_path / "books.csv.rejects.ndjson").read_text().splitlines()]
+    assert rejects[0]["row"] == 2
+    assert "year" in rejects[0]["error"]
+    assert not (tmp_path / "books.csv.checkpoint").exists()
+
+
+def test_import_resumes_from_checkpoint(tmp_path):
+    """An interrupted import resumes without re-uploading finished chunks."""
+    source = tmp_path / "books.ndjson"
+    source.write_text(
+        "".join(
+            json.dumps(
+                {"title": f"T{i}", "author": "A", "description": "d", "year": 2000, "genre": "g"}
+            )
+            + "\n"
+            for i in range(6)
+        ),
+        encoding="utf-8",
+    )
+    received = []
+
+    with pytest.raises(ClientError):
+        _run(source, _bulk_handler(received, fail_on={2}), chunk_size=2, concurrency=1)
+    assert [b["title"] for b in received] == ["T0", "T1"]
+    assert (tmp_path / "books.ndjson.checkpoint").exists()
+
+    result = _run(source, _bulk_handler(received), chunk_size=2, concurrency=1)
+    assert result.resumed
+    assert result.uploaded == 6
+    assert [b["title"] for b in received] == [f"T{i}" for i in range(6)]
+
+
+def _write_ndjson(path, count):
+    path.write_text(
+        "".join(
+            json.dumps({"title": f"T{i}", "author": "A", "description": "d", "year": 2000, "genre": "g"}) + "\n"
+            for i in range(count)
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_resume_skips_a_chunk_committed_without_a_response(tmp_path):
+    """A bulk POST that timed out after the server committed is not sent again."""
+    source = tmp_path / "books.ndjson"
+    _write_ndjson(source, 6)
+    received = []
+
+    with pytest.raises(ClientError):
+        _run(source, _bulk_handler(received, commit_then_fail_on={2}), chunk_size=2, concurrency=1)
+    assert len(received) == 4
+
+    result = _run(source, _bulk_handler(received), chunk_size=2, concurrency=1)
+    assert result.resumed
+    assert result.uploaded == 6
+    assert [b["title"] for b in received] == [f"T{i}" for i in range(6)]
+
+
+def test_resume_does_not_count_identical_books_from_other_clients(tmp_path):
+    """Only an unbroken run of creates matching the chunk counts as the chunk."""
+    source = tmp_path / "books.ndjson"
+    _write_ndjson(source, 6)
+    received = []
+
+    with pytest.raises(ClientError):
+        _run(source, _bulk_handler(received, fail_on={2}), chunk_size=2, concurrency=1)
+    t2, t3 = ({"title": f"T{i}", "author": "A", "description": "d", "year": 2000, "genre": "G"} for i in (2, 3))
+    received += [t2, {**t2, "title": "Other"}, t3]  # someone else's writes
+
+    result = _run(source, _bulk_handler(received), chunk_size=2, concurrency=1)
+    assert result.uploaded == 6
+    assert [b["title"] for b in received] == ["T0", "T1", "T2", "Other", "T3", "T2", "T3", "T4", "T5"]
+
+
+def test_checkpoint_of_another_file_is_ignored(tmp_path):
+    source = tmp_path / "books.ndjson"
+    _write_ndjson(source, 4)
+    received = []
+    with pytest.raises(ClientError):
+        _run(source, _bulk_handler(received, fail_on={2}), chunk_size=2, concurrency=1)
+
+    _write_ndjson(source, 5)
+    result = _run(source, _bulk_handler(received), chunk_size=2, concurrency=1)
+    assert not result.resumed
+    assert result.uploaded == 5
+    assert [b["title"] for b in received] == ["T0", "T1", "T0", "T1", "T2", "T3", "T4"]
+
+
+def test_detect_format_rejects_unknown_extension(tmp_path):
+    with pytest.raises(ValueError):
+        importer.detect_format(tmp_path / "books.xlsx")
@@ -6,7 +6,7 @@ from sqlmodel import SQLModel
 from alembic import context
 
 from book_service.app.config import Settings
-from book_service.app.models import Book  # noqa: F401
+from book_service.app.models import Book, BookChange, BookStat  # noqa: F401
 
 config = context.config
 settings = Settings()
@@ -0,0 +1,41 @@
+"""create book_stats
+
+Revision ID: 3b9d4c71a2e5
+Revises: e06320fc2b30
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d4c71a2e5'
+down_revision: Union[str, Sequence[str], None] = 'e06320fc2b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_stats',
+    sa.Column('dimension', sqlmodel.sql.sqltypes.AutoString(length=16), nullable=False),
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=200), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'key')
+    )
+
+    # Backfill aggregates for books that already exist.
+    op.execute("INSERT INTO book_stats (dimension, key, count) SELECT 'total', '', COUNT(*) FROM books")
+    for dimension in ("genre", "author", "year"):
+        op.execute(
+            f"INSERT INTO book_stats (dimension, key, count) "
+            f"SELECT '{dimension}', CAST({dimension} AS VARCHAR(200)), COUNT(*) FROM books GROUP BY {dimension}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('book_stats')
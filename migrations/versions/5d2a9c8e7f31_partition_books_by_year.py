@@ -0,0 +1,49 @@
+"""partition books by year
+
+Postgres only, and only with BOOK_PG_PARTITION_BY_YEAR=true; otherwise a
+no-op. Copies the table inside the migration's transaction (books is
+locked meanwhile), so for a large catalogue run
+`python -m scripts.partition_books` instead, which moves the rows while
+the service keeps writing; this revision then finds the work done.
+
+Revision ID: 5d2a9c8e7f31
+Revises: 8f1e27c4d6b0
+Create Date: 2026-10-19 15:02:47.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from book_service.app import partitions
+from book_service.app.config import Settings
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a9c8e7f31'
+down_revision: Union[str, Sequence[str], None] = '8f1e27c4d6b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    settings = Settings()
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql" or not settings.pg_partition_by_year:
+        return
+    if partitions.is_partitioned(connection):
+        partitions.ensure_partitions(connection, span=settings.pg_partition_span)
+        return
+    partitions.create_shadow(connection, settings.pg_partition_span)
+    # The trigger's lock also holds off writers until this transaction ends.
+    partitions.install_mirror(connection)
+    op.execute(f"INSERT INTO {partitions.SHADOW} SELECT * FROM books")
+    partitions.swap(connection)
+    op.execute(f"DROP TABLE {partitions.RETIRED}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    connection = op.get_bind()
+    if connection.dialect.name == "postgresql" and partitions.is_partitioned(connection):
+        partitions.unpartition(connection)
@@ -0,0 +1,59 @@
+"""create book_changes
+
+Revision ID: 8f1e27c4d6b0
+Revises: 3b9d4c71a2e5
+Create Date: 2026-10-19 11:40:05.118734
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1e27c4d6b0'
+down_revision: Union[str, Sequence[str], None] = '3b9d4c71a2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('op', sqlmodel.sql.sqltypes.AutoString(length=8), nullable=False),
+    sa.Column('book', sa.JSON(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True,
+    )
+    op.create_index(op.f('ix_book_changes_book_id'), 'book_changes', ['book_id'], unique=False)
+
+    # Seed the log with a "create" per existing book so a mirror syncing
+    # from seq 0 reproduces the current catalogue.
+    books = sa.table(
+        'books',
+        sa.column('id'), sa.column('title'), sa.column('author'),
+        sa.column('description'), sa.column('year'), sa.column('genre'),
+    )
+    changes = sa.table(
+        'book_changes',
+        sa.column('book_id'), sa.column('op'), sa.column('book', sa.JSON()), sa.column('changed_at'),
+    )
+    connection = op.get_bind()
+    now = datetime.now(timezone.utc)
+    result = connection.execute(sa.select(books).order_by(books.c.id)).mappings()
+    for batch in result.partitions(1000):
+        connection.execute(
+            changes.insert(),
+            [{"book_id": row["id"], "op": "create", "book": dict(row), "changed_at": now} for row in batch],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_book_changes_book_id'), table_name='book_changes')
+    op.drop_table('book_changes')
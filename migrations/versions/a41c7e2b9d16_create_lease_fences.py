@@ -0,0 +1,32 @@
+"""create lease_fences
+
+Revision ID: a41c7e2b9d16
+Revises: 5d2a9c8e7f31
+Create Date: 2026-10-19 20:10:42.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e2b9d16'
+down_revision: Union[str, Sequence[str], None] = '5d2a9c8e7f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lease_fences',
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=200), nullable=False),
+    sa.Column('fence', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('lease_fences')
@@ -0,0 +1,114 @@
+# filepath: scripts/bench_memory_repo.py
+"""
+Benchmark of the in-memory repository: bytes per book and list/get latency.
+
+Compares the compact record store (`BookRepository`) with the previous
+layout, which kept one `Book` instance per row plus a `BookChange` (with
+a dumped copy of the book) per write.
+
+    python -m scripts.bench_memory_repo --books 100000
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+import typer
+
+from book_service.app.models import Book, BookChange, BookCreate
+from book_service.app.repository import BookRepository
+
+app = typer.Typer(help="In-memory repository benchmark")
+
+GENRES = ["Fantasy", "Sci-Fi", "Romance", "Mystery", "Horror", "History", "Poetry", "Biography"]
+
+
+def _payloads(count: int) -> list[BookCreate]:
+    rng = random.Random(42)
+    authors = [f"Author {i}" for i in range(max(count // 20, 1))]
+    return [
+        BookCreate(
+            title=f"Book title number {i}",
+            author=rng.choice(authors),
+            description="A short description of the book.",
+            year=rng.randint(1900, 2024),
+            genre=rng.choice(GENRES).lower(),
+        )
+        for i in range(count)
+    ]
+
+
+class LegacyStore:
+    """The previous layout: Book instances in a dict, full copies in the change log."""
+
+    def __init__(self) -> None:
+        self.items: dict[int, Book] = {}
+        self.changes: list[BookChange] = []
+
+    def create(self, payload: BookCreate) -> None:
+        book = Book(id=len(self.items) + 1, **payload.model_dump())
+        self.items[book.id] = book
+        self.changes.append(
+            BookChange(seq=len(self.changes) + 1, book_id=book.id, op="create", book=book.model_dump(mode="json"))
+        )
+
+    def get(self, book_id: int):
+        return self.items.get(book_id)
+
+    def list(self, *, after_id: int, limit: int):
+        return [book for book in self.items.values() if book.id > after_id][:limit]
+
+
+def _measure_bytes(build: Callable[[], object]) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    store = build()
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, used
+
+
+def _per_call_us(fn: Callable[[], object], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+@app.command()
+def run(books: int = 100_000, calls: int = 2_000, page: int = 100) -> None:
+    """Print bytes/book and get/list latency for both layouts."""
+    payloads = _payloads(books)
+    rng = random.Random(7)
+    ids = [rng.randint(1, books) for _ in range(calls)]
+    cursor = books // 2
+
+    def build_legacy() -> LegacyStore:
+        store = LegacyStore()
+        for payload in payloads:
+            store.create(payload)
+        return store
+
+    def build_compact() -> BookRepository:
+        store = BookRepository()
+        for payload in payloads:
+            store.create(payload)
+        return store
+
+    typer.echo(f"{books} books, {calls} calls per operation, page size {page}")
+    typer.echo(f"{'layout':<10}{'bytes/book':>12}{'get µs':>10}{'list µs':>12}")
+    for name, build in (("legacy", build_legacy), ("compact", build_compact)):
+        store, used = _measure_bytes(build)
+        it = iter(ids * 2)
+        get_us = _per_call_us(lambda: store.get(next(it)), calls)
+        list_us = _per_call_us(lambda: store.list(after_id=cursor, limit=page), max(calls // 100, 5))
+        typer.echo(f"{name:<10}{used / books:>12.0f}{get_us:>10.2f}{list_us:>12.1f}")
+        del store
+        gc.collect()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,124 @@
+# filepath: scripts/bench_workers.py
+"""
+Throughput of `python -m book_service.serve` with 1..N worker processes.
+
+For each worker count the server is started against a throwaway SQLite
+catalogue, then client processes hammer GET /books/{id} for a fixed time
+and the requests/second are reported.
+
+    python -m scripts.bench_workers --workers 1,2,4 --seconds 10
+
+Run it on a machine with at least as many idle cores as the largest
+worker count plus the client processes, or the numbers mostly measure
+contention with the load generator.
+"""
+
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import typer
+
+from book_service.app.config import Settings
+from book_service.app.security import create_access_token
+
+app = typer.Typer(help="Multi-process serving benchmark")
+
+
+def _seed(url: str, books: int) -> None:
+    env = {**os.environ, "BOOK_DB_MODE": "sqlite", "BOOK_DATABASE_URL_SQLITE": url}
+    subprocess.run([sys.executable, "-m", "scripts.db", "bootstrap", "--sample", str(books)], env=env, check=True)
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def _client(base: str, token: str, books: int, seconds: float, results) -> None:
+    rng = random.Random(os.getpid())
+    done = errors = 0
+    headers = {"Authorization": f"Bearer {token}"}
+    with httpx.Client(base_url=base, headers=headers) as client:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                response = client.get(f"/books/{rng.randint(1, books)}")
+                done += response.status_code == 200
+                errors += response.status_code != 200
+            except httpx.HTTPError:
+                errors += 1
+    results.put((done, errors))
+
+
+def _measure(workers: int, url: str, port: int, clients: int, books: int, seconds: float) -> tuple[float, int]:
+    env = {
+        **os.environ,
+        "BOOK_DB_MODE": "sqlite",
+        "BOOK_DATABASE_URL_SQLITE": url,
+        "BOOK_WEB_WORKERS": str(workers),
+        "BOOK_WEB_BIND": f"127.0.0.1:{port}",
+        "BOOK_WEB_MAX_REQUESTS": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "book_service.serve"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base)
+        token = create_access_token(subject="bench", roles=["editor"], settings=Settings())
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_client, args=(base, token, books, seconds, results))
+            for _ in range(clients)
+        ]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return sum(done for done, _ in totals) / seconds, sum(errors for _, errors in totals)
+
+
+@app.command()
+def run(
+    workers: str = typer.Option("", help="Comma-separated worker counts (default: 1, 2, 4, ... up to the core count)"),
+    clients: int = typer.Option(0, help="Client processes (default: 2 per worker of the largest run)"),
+    books: int = typer.Option(50, help="Books seeded (scripts.db bootstrap caps this at 80)"),
+    seconds: float = 10.0,
+    port: int = 8765,
+) -> None:
+    """Print requests/second and speed-up per worker count."""
+    counts = [int(count) for count in workers.split(",") if count] or [
+        2**i for i in range((os.cpu_count() or 1).bit_length())
+    ]
+    clients = clients or 2 * max(counts)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        _seed(url, books)
+        typer.echo(f"{os.cpu_count()} cores, {clients} client processes, {seconds:.0f}s per run")
+        typer.echo(f"{'workers':>8}{'req/s':>10}{'speed-up':>10}{'errors':>8}")
+        baseline = None
+        for count in counts:
+            rate, errors = _measure(count, url, port, clients, books, seconds)
+            baseline = baseline or rate
+            typer.echo(f"{count:>8}{rate:>10.0f}{rate / baseline:>10.2f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    app()
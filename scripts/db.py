@@ -2,6 +2,10 @@
 from sqlmodel import Session
 from book_service.app.config import Settings
 from book_service.app.database import engine, init_db
+from book_service.app.export import COLUMNS as EXPORT_COLUMNS
+from book_service.app.export import DEFAULT_BATCH_SIZE, ExportUnavailable, write_export
+from book_service.app.memory_store import DurableBookRepository as DurableRepo
+from book_service.app.memory_store import StoreError
 from book_service.app.models import BookCreate
 from book_service.app.repository import BookRepository as MemoryRepo
 from book_service.app.repository_db import BookRepository as DbRepo
@@ -10,6 +14,17 @@ import typer
 
 app = typer.Typer(help="Database utilities for Books Catalogue")
 
+
+def _seed(repo, sample: int) -> None:
+    for idx in range(sample):
+        repo.create(BookCreate(
+            title=f"Sample Book {idx+1}", 
+            author="System", 
+            description="Sample data", 
+            year=2020 + idx, 
+            genre="Fiction"
+        ))
+
 @app.command()
 def bootstrap(sample: int = 5) -> None:
     """
@@ -19,16 +34,25 @@ def bootstrap(sample: int = 5) -> None:
     settings = Settings()
     
     if settings.db_mode == "memory":
-        repo = MemoryRepo()
-        for idx in range(sample):
-            repo.create(BookCreate(
-                title=f"Sample Book {idx+1}", 
-                author="System", 
-                description="Sample data", 
-                year=2020 + idx, 
-                genre="Fiction"
-            ))
-        typer.echo("Seeded in-memory repo (Note: this data will vanish when CLI exits).")
+        if not settings.memory_data_dir:
+            repo = MemoryRepo()
+            _seed(repo, sample)
+            typer.echo("Seeded in-memory repo (Note: this data will vanish when CLI exits; "
+                       "set BOOK_MEMORY_DATA_DIR to keep it).")
+            return
+        try:
+            repo = DurableRepo(settings.memory_data_dir)
+        except StoreError as exc:
+            typer.echo(str(exc), err=True)
+            raise typer.Exit(code=1)
+        try:
+            if len(repo):
+                typer.echo(f"{settings.memory_data_dir} already contains data; skipping seed.")
+                return
+            _seed(repo, sample)
+        finally:
+            repo.close()
+        typer.echo(f"Seeded {sample} books into {settings.memory_data_dir} (snapshot written).")
         return
 
     #create db table if isn't exist
@@ -40,17 +64,42 @@ def bootstrap(sample: int = 5) -> None:
         if repo.list():
             typer.echo(f"Database ({settings.db_mode}) already contains data; skipping seed.")
             return  
-        for idx in range(sample):
-            repo.create(BookCreate(
-                title=f"Sample Book {idx+1}", 
-                author="System", 
-                description="Sample data", 
-                year=2020 + idx, 
-                genre="Fiction"
-            ))
+        _seed(repo, sample)
         session.commit()
         
     typer.echo(f"Successfully seeded {sample} books in {settings.db_mode} mode.")
 
+
+@app.command()
+def export(
+    path: str = typer.Argument(..., help="Output file, e.g. books.parquet or books.arrows"),
+    format: str = typer.Option("parquet", "--format", "-f", help="arrow | parquet"),
+    compression: str = typer.Option("zstd", help="zstd | lz4 | none (none: zero-copy mmap-able Arrow)"),
+    batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help="Rows per record batch / cursor fetch"),
+) -> None:
+    """
+    Export the catalogue as typed, compressed Arrow IPC or Parquet,
+    streaming record batches straight from a database cursor.
+    """
+    settings = Settings()
+    if settings.db_mode == "memory" and not settings.memory_data_dir:
+        typer.echo("Nothing to export in memory mode (the data lives in the API process).")
+        raise typer.Exit(code=1)
+    try:
+        if settings.db_mode == "memory":
+            # Read-only: safe while the API owns the data directory.
+            repo = DurableRepo(settings.memory_data_dir, readonly=True)
+            batches = repo.iter_batches(EXPORT_COLUMNS, batch_size=batch_size)
+            rows = write_export(batches, format, path, compression=compression)
+        else:
+            with Session(engine) as session:
+                batches = DbRepo(session).iter_batches(EXPORT_COLUMNS, batch_size=batch_size)
+                rows = write_export(batches, format, path, compression=compression)
+    except (ExportUnavailable, StoreError, ValueError) as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Exported {rows} books to {path} ({format}, {compression}).")
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,82 @@
+# filepath: scripts/partition_books.py
+"""
+Convert the Postgres `books` table to year-range partitions while the
+service keeps running.
+
+    BOOK_DB_MODE=postgres python -m scripts.partition_books --batch-size 10000
+
+Creates the partitioned copy, mirrors live writes into it with a trigger,
+moves existing rows in id batches (one short transaction each), then swaps
+the tables under a brief exclusive lock. The old table is kept as
+`books_unpartitioned` unless --drop-old is given. Safe to re-run: copying
+is idempotent, and on an already partitioned table it only adds missing
+partitions.
+"""
+
+import time
+
+import typer
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from book_service.app import partitions
+from book_service.app.config import Settings
+from book_service.app.database import engine
+
+app = typer.Typer(help="Online year-range partitioning of the books table")
+
+
+@app.command()
+def run(
+    batch_size: int = typer.Option(10_000, help="Rows moved per transaction"),
+    pause: float = typer.Option(0.0, help="Seconds to sleep between batches (throttle)"),
+    lock_timeout: str = typer.Option("5s", help="Give up waiting for the swap lock after this long, then retry"),
+    drop_old: bool = typer.Option(False, "--drop-old", help="Drop books_unpartitioned after the swap"),
+) -> None:
+    """Partition `books` by year without taking the service down."""
+    settings = Settings()
+    if engine.dialect.name != "postgresql":
+        typer.echo("Partitioning needs Postgres (BOOK_DB_MODE=postgres).", err=True)
+        raise typer.Exit(code=1)
+    span = settings.pg_partition_span
+
+    with engine.begin() as connection:
+        if partitions.is_partitioned(connection):
+            added = partitions.ensure_partitions(connection, span=span)
+            typer.echo(f"books is already partitioned; added {added} missing partition(s).")
+            return
+        partitions.create_shadow(connection, span)
+        partitions.install_mirror(connection)
+
+    # Writes from here on are mirrored by the trigger. Batches already copied
+    # by an interrupted run are skipped by ON CONFLICT, so always start at 0.
+    after_id, moved, started = 0, 0, time.perf_counter()
+    while True:
+        with engine.begin() as connection:
+            upto = partitions.copy_batch(connection, after_id, batch_size)
+        if upto is None:
+            break
+        moved += 1
+        after_id = upto
+        if moved % 10 == 0:
+            typer.echo(f"  copied through id {after_id}")
+        if pause:
+            time.sleep(pause)
+    typer.echo(f"Copied {moved} batch(es) in {time.perf_counter() - started:.1f}s; swapping.")
+
+    while True:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+                partitions.swap(connection)
+                if drop_old:
+                    connection.execute(text(f"DROP TABLE {partitions.RETIRED}"))
+            break
+        except OperationalError as exc:
+            typer.echo(f"Swap lock not acquired ({exc.orig}); retrying.", err=True)
+            time.sleep(1)
+    typer.echo("books is now partitioned by year" + ("." if drop_old else f"; old table kept as {partitions.RETIRED}."))
+
+
+if __name__ == "__main__":
+    app()
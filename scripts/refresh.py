@@ -6,12 +6,22 @@
 import asyncio
 import redis.asyncio as redis
 import logging
+import uuid
 
 logger = logging.getLogger("refresh")
 
 LOCK_KEY = "books:refresh:lock"
 RESULT_KEY = "books:last_refresh"
 
+# Delete the lock only if we still own it; a plain DELETE could free a lock
+# that expired and was taken by another worker in the meantime.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
 
 async def refresh_books(
     redis_client: redis.Redis,
@@ -22,15 +32,19 @@ async def refresh_books(
 ) -> None:
     """
     Refresh books metadata.
-    - Idempotent via Redis lock
+    - Idempotent via Redis lock (token-fenced release)
     - Retries on failure
     - Bounded concurrency
+
+    The worker runs the sharded, lease-based refresh
+    (book_service/worker/tasks.py); this script is the standalone variant.
     """
 
     for attempt in range(1, retries + 1):
+        token = uuid.uuid4().hex
         acquired = await redis_client.set(
             LOCK_KEY,
-            "1",
+            token,
             ex=lock_ttl,
             nx=True,
         )
@@ -62,7 +76,7 @@ async def refresh_books(
             await asyncio.sleep(1)
 
         finally:
-            await redis_client.delete(LOCK_KEY)
+            await redis_client.eval(RELEASE_SCRIPT, 1, LOCK_KEY, token)
 
 
 async def main():